@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import redis
+import redis.asyncio
 
 from app.settings import settings
 
@@ -10,3 +11,15 @@ _redis_pool = redis.ConnectionPool.from_url(settings.redis_url, decode_responses
 
 def get_redis() -> redis.Redis:
     return redis.Redis(connection_pool=_redis_pool)
+
+
+_binary_redis_pool = redis.ConnectionPool.from_url(settings.redis_url, decode_responses=False)
+
+
+def get_binary_redis() -> redis.Redis:
+    return redis.Redis(connection_pool=_binary_redis_pool)
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    # Bound to the running event loop, so it is created inside it.
+    return redis.asyncio.Redis.from_url(settings.redis_url, decode_responses=True)
@@ -1,31 +1,240 @@
 from __future__ import annotations
 
-from app.database import get_redis
-from app.services import JobProcessingService, JobQueryService, JobSubmissionService
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.database import get_async_redis, get_binary_redis, get_redis
+from app.services import (
+    JobCancellationService,
+    JobProcessingService,
+    JobQueryService,
+    JobReaperService,
+    JobRetentionService,
+    JobSubmissionService,
+)
 from app.settings import settings
+from core.admission import AdmissionController
+from core.contracts import (
+    AdmissionStoreContract,
+    CompletionNotifierContract,
+    JobQueueContract,
+    JobRepositoryContract,
+    StageMetricsContract,
+)
+from core.excel_readers import parse_readers
 from core.executors import PipelineExecutor
+from core.routing import QueueRouter
+from infrastructure.admission import RedisAdmissionStore
+from infrastructure.checkpoints import JobCheckpointStore
 from infrastructure.file_storage import LocalFileStorage
-from infrastructure.notifier import HttpCallbackNotifier
-from infrastructure.queue import RQJobQueue
+from infrastructure.job_events import JobEventHub, RedisJobEventHub
+from infrastructure.memory import (
+    InMemoryAdmissionStore,
+    InMemoryJobEventHub,
+    InMemoryJobQueue,
+    InMemoryJobRepository,
+    InMemoryStageMetrics,
+)
+from infrastructure.metrics import RedisStageMetrics
+from infrastructure.notifier import CALLBACK_MODES, HttpCallbackNotifier, QueuedCallbackNotifier
+from infrastructure.queue import RQJobQueue, parse_weights
 from infrastructure.repository import RedisJobRepository
+from infrastructure.stage_cache import LocalStageResultCache
+
+
+def get_job_repository() -> JobRepositoryContract:
+    if settings.job_backend == "memory":
+        return get_memory_repository()
+    if settings.job_encoding == "msgpack":
+        return RedisJobRepository(get_binary_redis(), "msgpack", settings.job_events_channel)
+    return RedisJobRepository(get_redis(), "json", settings.job_events_channel)
+
+
+@lru_cache(maxsize=1)
+def get_memory_repository() -> InMemoryJobRepository:
+    return InMemoryJobRepository(events=get_memory_event_hub().publish)
+
+
+@lru_cache(maxsize=1)
+def get_memory_event_hub() -> InMemoryJobEventHub:
+    return InMemoryJobEventHub()
+
+
+@lru_cache(maxsize=1)
+def get_memory_stage_metrics() -> InMemoryStageMetrics:
+    return InMemoryStageMetrics()
+
+
+@lru_cache(maxsize=1)
+def get_memory_queue() -> InMemoryJobQueue:
+    # Jobs run on threads of this process, against the same in-memory repository.
+    queue = InMemoryJobQueue(settings.memory_workers, parse_weights(settings.queue_weights))
+    return queue.start(lambda job_id: _memory_processing_service().process(job_id))
+
+
+@lru_cache(maxsize=1)
+def _memory_processing_service() -> JobProcessingService:
+    return get_processing_service()
+
+
+def get_job_queue() -> JobQueueContract:
+    if settings.job_backend == "memory":
+        return get_memory_queue()
+    return RQJobQueue(settings.queue_name, get_redis(), settings.worker_task_path)
+
+
+def admission_enabled() -> bool:
+    return bool(
+        settings.admission_max_queue_depth
+        or settings.admission_max_backlog_seconds
+        or settings.admission_min_free_bytes
+        or settings.client_max_jobs
+    )
+
+
+def get_admission_store() -> Optional[AdmissionStoreContract]:
+    # None with every threshold off: no per-job bookkeeping nobody would read.
+    if not admission_enabled():
+        return None
+    if settings.job_backend == "memory":
+        return get_memory_admission_store()
+    return RedisAdmissionStore(get_redis())
+
+
+@lru_cache(maxsize=1)
+def get_memory_admission_store() -> InMemoryAdmissionStore:
+    return InMemoryAdmissionStore()
+
+
+@lru_cache(maxsize=1)
+def get_admission_controller() -> Optional[AdmissionController]:
+    # One per process, so its cached load signals are shared by every request.
+    store = get_admission_store()
+    if store is None:
+        return None
+    return AdmissionController(
+        store,
+        get_job_queue(),
+        LocalFileStorage(settings.storage_dir),
+        max_queue_depth=settings.admission_max_queue_depth or None,
+        max_backlog_seconds=settings.admission_max_backlog_seconds or None,
+        min_free_bytes=settings.admission_min_free_bytes or None,
+        client_quota=settings.client_max_jobs or None,
+        overload=settings.admission_overload,
+        parallelism=settings.admission_parallelism,
+        retry_after_seconds=settings.admission_retry_after_seconds,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_job_event_hub() -> JobEventHub:
+    if settings.job_backend == "memory":
+        return get_memory_event_hub()
+    return RedisJobEventHub(get_async_redis, settings.job_events_channel)
 
 
 def get_submission_service() -> JobSubmissionService:
-    redis_client = get_redis()
-    repository = RedisJobRepository(redis_client)
+    repository = get_job_repository()
     storage = LocalFileStorage(settings.storage_dir)
-    queue = RQJobQueue(settings.queue_name, redis_client, settings.worker_task_path)
-    return JobSubmissionService(repository, storage, queue)
+    queue = get_job_queue()
+    router = QueueRouter(settings.queue_routing, settings.small_job_bytes, settings.large_job_bytes)
+    return JobSubmissionService(
+        repository,
+        storage,
+        queue,
+        max_upload_bytes=settings.max_upload_bytes,
+        router=router,
+        dedup_ttl_seconds=settings.dedup_ttl_seconds or None,
+        admission=get_admission_controller(),
+    )
 
 
 def get_query_service() -> JobQueryService:
-    repository = RedisJobRepository(get_redis())
-    return JobQueryService(repository)
+    return JobQueryService(get_job_repository())
+
+
+def get_cancellation_service() -> JobCancellationService:
+    return JobCancellationService(get_job_repository(), get_admission_store())
+
+
+def get_stage_metrics() -> StageMetricsContract:
+    if settings.job_backend == "memory":
+        return get_memory_stage_metrics()
+    return RedisStageMetrics(get_redis())
 
 
 def get_processing_service() -> JobProcessingService:
-    repository = RedisJobRepository(get_redis())
+    if settings.callback_mode not in CALLBACK_MODES:
+        raise ValueError(f"Unknown callback mode '{settings.callback_mode}'")
+    repository = get_job_repository()
     storage = LocalFileStorage(settings.storage_dir)
-    executor = PipelineExecutor()
-    notifier = HttpCallbackNotifier()
-    return JobProcessingService(repository, storage, executor, notifier)
+    result_cache = None
+    if settings.stage_cache_enabled:
+        result_cache = LocalStageResultCache(
+            str(storage.base_dir / "stage_cache"),
+            settings.stage_cache_max_bytes,
+        )
+    executor = PipelineExecutor(
+        result_cache=result_cache,
+        # Memory-backend jobs share this process's pool, so killing it would hit them all.
+        overrun="abandon" if settings.job_backend == "memory" else settings.stage_overrun,
+        default_timeout=settings.stage_timeout_seconds or None,
+        min_partition_rows=settings.min_partition_rows or None,
+    )
+    precompress = tuple(filter(None, (part.strip() for part in settings.result_precompress.split(","))))
+    checkpoints = None
+    if settings.checkpoints_enabled:
+        checkpoint_dir = storage.checkpoint_dir()
+
+        def checkpoints(job_id: str, saved: Optional[Dict[str, Any]]) -> JobCheckpointStore:
+            return JobCheckpointStore(repository, checkpoint_dir, job_id, saved)
+
+    options: Dict[str, Any] = {
+        "precompress": precompress,
+        "checkpoints": checkpoints,
+        "heartbeat_seconds": settings.heartbeat_seconds or None,
+        "stale_seconds": settings.stale_job_seconds,
+        "excel_readers": parse_readers(settings.excel_readers),
+        "cancel_poll_seconds": settings.cancel_poll_seconds,
+        "admission": get_admission_store(),
+    }
+    if settings.job_backend == "memory":
+        # No Redis: callbacks are posted inline; stage metrics stay in this process.
+        return JobProcessingService(repository, storage, executor, HttpCallbackNotifier(), get_stage_metrics(), **options)
+    notifier: CompletionNotifierContract
+    if settings.callback_mode == "inline":
+        notifier = HttpCallbackNotifier()
+    else:
+        notifier = QueuedCallbackNotifier(get_redis(), settings.callback_queue)
+    return JobProcessingService(repository, storage, executor, notifier, get_stage_metrics(), **options)
+
+
+def parse_retention(spec: str) -> Dict[str, int]:
+    ttls = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        status, _, seconds = item.partition("=")
+        ttls[status.strip().upper()] = int(seconds)
+    return ttls
+
+
+def get_reaper_service() -> Optional[JobReaperService]:
+    # Without heartbeats a long job looks exactly like a dead one, so nothing is reaped.
+    if not settings.heartbeat_seconds:
+        return None
+    return JobReaperService(
+        get_job_repository(),
+        get_job_queue(),
+        settings.stale_job_seconds,
+        settings.max_job_attempts,
+        settings.retention_batch_size,
+        get_admission_store(),
+    )
+
+
+def get_retention_service() -> JobRetentionService:
+    return JobRetentionService(
+        get_job_repository(),
+        LocalFileStorage(settings.storage_dir),
+        parse_retention(settings.job_retention),
+        settings.retention_batch_size,
+    )
@@ -1,22 +1,112 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    WebSocket,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
-from app.dependencies import get_query_service, get_submission_service
-from app.models import JobCreateResponse, JobStatusResponse, PipelineConfig
+from app.dependencies import (
+    get_cancellation_service,
+    get_job_event_hub,
+    get_query_service,
+    get_stage_metrics,
+    get_submission_service,
+)
+from app.models import (
+    JobBatchCreateResponse,
+    JobCancelResponse,
+    JobCreateResponse,
+    JobStatusResponse,
+    JobSummaryListResponse,
+    JobSummaryResponse,
+    PipelineConfig,
+)
 from app.services import (
+    JobCancellationService,
+    JobNotCancellableError,
     JobNotCompletedError,
     JobNotFoundError,
     JobOutputMissingError,
     JobQueryService,
     JobSubmissionService,
 )
+from app.responses import ranged_file_response
+from app.settings import settings
+from core.admission import AdmissionRejected
+from core.contracts import StageMetricsContract, UploadTooLargeError
+from core.encodings import COMPRESSIBLE_FORMATS, compress_output, negotiate_encoding
+from core.formats import MEDIA_TYPES, OUTPUT_SUFFIXES, OutputFormatError, negotiate_format
+from core.process_pool import shutdown_process_pool
+from infrastructure.job_events import TERMINAL_STATUSES, JobEventHub, JobEventSubscription
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    await get_job_event_hub().close()
+    # Only the memory backend runs pipelines here; otherwise there is no pool to stop.
+    await run_in_threadpool(shutdown_process_pool)
+
+
+app = FastAPI(title="Excel Pipeline API", lifespan=lifespan)
+
+EVENT_KEEPALIVE_SECONDS = 15.0
+
+# Room for the multipart boundaries and the config/callback fields around the file.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _upload_limit(path: str) -> Optional[int]:
+    if path == "/upload":
+        return settings.max_upload_bytes
+    if path == "/upload/batch":
+        return settings.max_batch_upload_bytes
+    return None
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Runs before the multipart body is read, so a declared oversized upload is
+    # refused without receiving it; chunked uploads are cut off by the storage copy.
+    limit = _upload_limit(request.url.path)
+    if limit is not None:
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit + MULTIPART_OVERHEAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": "Upload too large"})
+    return await call_next(request)
+
+
+def _parse_config(config: Optional[str]) -> Optional[dict]:
+    if not config:
+        return None
+    try:
+        return PipelineConfig(**json.loads(config)).model_dump()
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=400, detail=f"Invalid config: {exc}") from exc
+
+
+def _client_id(request: Request) -> Optional[str]:
+    # Whoever the quota is counted against: the declared client, else the peer address.
+    return request.headers.get(settings.admission_client_header) or (request.client.host if request.client else None)
 
-app = FastAPI(title="Excel Pipeline API")
+
+def _too_busy(exc: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=exc.reason, headers={"Retry-After": str(exc.retry_after)})
 
 
 @app.get("/health")
@@ -24,8 +114,14 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(stage_metrics: StageMetricsContract = Depends(get_stage_metrics)) -> PlainTextResponse:
+    return PlainTextResponse(stage_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/upload", response_model=JobCreateResponse)
 async def upload_excel(
+    request: Request,
     file: UploadFile = File(...),
     config: Optional[str] = Form(default=None),
     callback_url: Optional[str] = Form(default=None),
@@ -34,21 +130,200 @@ async def upload_excel(
     if not file.filename:
         raise HTTPException(status_code=400, detail="Missing filename")
 
-    pipeline_config = None
-    if config:
+    pipeline_config = _parse_config(config)
+
+    # The spooled upload is copied to storage in chunks on a worker thread, never
+    # read whole into memory or written from the event loop.
+    try:
+        job_id, existing_status = await run_in_threadpool(
+            submission_service.submit_coalesced,
+            filename=file.filename,
+            file_stream=file.file,
+            pipeline_config=pipeline_config,
+            callback_url=callback_url,
+            client_id=_client_id(request),
+        )
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail="Upload too large") from exc
+    except AdmissionRejected as exc:
+        raise _too_busy(exc) from exc
+    return JobCreateResponse(
+        job_id=job_id,
+        status=existing_status or "QUEUED",
+        deduplicated=existing_status is not None,
+    )
+
+
+@app.post("/upload/batch", response_model=JobBatchCreateResponse)
+async def upload_excel_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    config: Optional[str] = Form(default=None),
+    callback_url: Optional[str] = Form(default=None),
+    submission_service: JobSubmissionService = Depends(get_submission_service),
+) -> JobBatchCreateResponse:
+    if len(files) > settings.max_batch_files:
+        raise HTTPException(status_code=400, detail=f"At most {settings.max_batch_files} files per batch")
+    if any(not file.filename for file in files):
+        raise HTTPException(status_code=400, detail="Missing filename")
+
+    pipeline_config = _parse_config(config)
+    try:
+        job_ids = await run_in_threadpool(
+            submission_service.submit_many,
+            uploads=[(file.filename, file.file) for file in files],
+            pipeline_config=pipeline_config,
+            callback_url=callback_url,
+            client_id=_client_id(request),
+        )
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail="Upload too large") from exc
+    except AdmissionRejected as exc:
+        raise _too_busy(exc) from exc
+    return JobBatchCreateResponse(job_ids=job_ids, status="QUEUED")
+
+
+@app.get("/jobs", response_model=JobSummaryListResponse)
+def get_jobs(
+    ids: Optional[str] = Query(default=None, description="Comma-separated job ids; omit to list jobs."),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1),
+    query_service: JobQueryService = Depends(get_query_service),
+) -> JobSummaryListResponse:
+    if ids is None:
+        # Paginated listing, most recently updated first.
+        limit = min(limit, settings.max_bulk_job_ids)
+        jobs, total = query_service.list_jobs(offset, limit)
+        return JobSummaryListResponse(
+            jobs=[JobSummaryResponse(job_id=job_id, **job) for job_id, job in jobs],
+            total=total,
+            next_offset=offset + limit if offset + limit < total else None,
+        )
+
+    job_ids = [job_id for job_id in (part.strip() for part in ids.split(",")) if job_id]
+    if len(job_ids) > settings.max_bulk_job_ids:
+        raise HTTPException(status_code=400, detail=f"At most {settings.max_bulk_job_ids} ids per request")
+
+    summaries = query_service.get_job_summaries(job_ids)
+    return JobSummaryListResponse(
+        jobs=[
+            JobSummaryResponse(job_id=job_id, **job) if job else JobSummaryResponse(job_id=job_id, status="NOT_FOUND")
+            for job_id, job in zip(job_ids, summaries)
+        ]
+    )
+
+
+def _summary_event(job_id: str, job: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not job:
+        return {"job_id": job_id, "status": "NOT_FOUND"}
+    return {"job_id": job_id, **{key: value for key, value in job.items() if value is not None}}
+
+
+def _socket_command(text: str) -> Tuple[List[str], List[str]]:
+    # (subscribe, unsubscribe) job ids from one client message; ValueError if malformed.
+    message = json.loads(text)
+    if not isinstance(message, dict):
+        raise ValueError("expected a JSON object")
+    ids = []
+    for action in ("subscribe", "unsubscribe"):
+        job_ids = message.get(action) or []
+        if not isinstance(job_ids, list) or not all(isinstance(job_id, (str, int)) for job_id in job_ids):
+            raise ValueError(f"'{action}' must be a list of job ids")
+        ids.append([str(job_id) for job_id in job_ids])
+    return ids[0], ids[1]
+
+
+async def _subscribe(hub: JobEventHub, job_ids: List[str]) -> JobEventSubscription:
+    try:
+        return await hub.subscribe(job_ids)
+    except asyncio.TimeoutError as exc:
+        raise HTTPException(status_code=503, detail="Job events unavailable") from exc
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    query_service: JobQueryService = Depends(get_query_service),
+    hub: JobEventHub = Depends(get_job_event_hub),
+) -> StreamingResponse:
+    # Subscribe before reading the snapshot so no transition falls in between.
+    subscription = await _subscribe(hub, [job_id])
+    try:
+        job = (await run_in_threadpool(query_service.get_job_summaries, [job_id]))[0]
+    except BaseException:
+        subscription.close()
+        raise
+    if job is None:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream() -> AsyncIterator[str]:
         try:
-            pipeline_config = PipelineConfig(**json.loads(config)).model_dump()
-        except Exception as exc:  # noqa: BLE001
-            raise HTTPException(status_code=400, detail=f"Invalid config: {exc}") from exc
-
-    file_content = await file.read()
-    job_id = submission_service.submit(
-        filename=file.filename,
-        file_content=file_content,
-        pipeline_config=pipeline_config,
-        callback_url=callback_url,
+            event: Optional[Dict[str, Any]] = _summary_event(job_id, job)
+            while True:
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: status\ndata: {json.dumps(event)}\n\n"
+                    if event["status"] in TERMINAL_STATUSES:
+                        return
+                event = await subscription.get(EVENT_KEEPALIVE_SECONDS)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return JobCreateResponse(job_id=job_id, status="QUEUED")
+
+
+@app.websocket("/jobs/events")
+async def job_events_socket(
+    websocket: WebSocket,
+    query_service: JobQueryService = Depends(get_query_service),
+    hub: JobEventHub = Depends(get_job_event_hub),
+) -> None:
+    # Client sends {"subscribe": [ids]} / {"unsubscribe": [ids]}; every subscribe is
+    # answered with a snapshot per id, then status events stream for all of them.
+    await websocket.accept()
+    try:
+        subscription = await hub.subscribe()
+    except asyncio.TimeoutError:
+        await websocket.close(code=1013)
+        return
+
+    async def receive_commands() -> None:
+        while True:
+            try:
+                add, remove = _socket_command(await websocket.receive_text())
+            except ValueError as exc:
+                # A bad message is answered, not fatal: the subscription stays open.
+                await websocket.send_json({"error": f"Invalid message: {exc}"})
+                continue
+            subscription.remove(remove)
+            add = add[: settings.max_bulk_job_ids]
+            if not add:
+                continue
+            subscription.add(add)
+            summaries = await run_in_threadpool(query_service.get_job_summaries, add)
+            for job_id, job in zip(add, summaries):
+                await websocket.send_json(_summary_event(job_id, job))
+
+    async def send_events() -> None:
+        while True:
+            event = await subscription.get()
+            if event is not None:
+                await websocket.send_json(event)
+
+    tasks = [asyncio.create_task(receive_commands()), asyncio.create_task(send_events())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        subscription.close()
 
 
 @app.get("/jobs/{job_id}", response_model=JobStatusResponse)
@@ -71,18 +346,61 @@ def get_job(
     )
 
 
+@app.delete("/jobs/{job_id}", response_model=JobCancelResponse, status_code=202)
+def cancel_job(
+    job_id: str,
+    cancellation_service: JobCancellationService = Depends(get_cancellation_service),
+) -> JobCancelResponse:
+    # A queued job is cancelled at once; a running one stops at its next check and
+    # then reports CANCELLED.
+    try:
+        status = cancellation_service.cancel(job_id)
+    except JobNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Job not found") from exc
+    except JobNotCancellableError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return JobCancelResponse(job_id=job_id, status=status)
+
+
 @app.get("/jobs/{job_id}/result")
 def download_result(
     job_id: str,
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    range_header: Optional[str] = Header(default=None, alias="Range"),
+    if_range: Optional[str] = Header(default=None),
     query_service: JobQueryService = Depends(get_query_service),
 ):
     try:
-        output_path = query_service.get_result_path(job_id)
+        output_format = negotiate_format(accept)
+    except OutputFormatError as exc:
+        raise HTTPException(
+            status_code=406,
+            detail=f"Supported result types: {', '.join(MEDIA_TYPES.values())}",
+        ) from exc
+
+    try:
+        output_path, output_format = query_service.get_result(job_id, output_format)
+        # Served from a compressed copy made once and kept; ranges then apply to the
+        # compressed bytes, so an interrupted download resumes where it stopped.
+        encoding = negotiate_encoding(accept_encoding) if output_format in COMPRESSIBLE_FORMATS else None
+        if encoding is not None:
+            output_path = compress_output(output_path, encoding)
     except JobNotFoundError as exc:
         raise HTTPException(status_code=404, detail="Job not found") from exc
     except JobNotCompletedError as exc:
         raise HTTPException(status_code=400, detail="Job not completed") from exc
-    except JobOutputMissingError as exc:
+    except (JobOutputMissingError, FileNotFoundError) as exc:
         raise HTTPException(status_code=404, detail="Output not found") from exc
 
-    return FileResponse(output_path, filename="output.csv")
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return ranged_file_response(
+        output_path,
+        MEDIA_TYPES[output_format],
+        f"output{OUTPUT_SUFFIXES[output_format]}",
+        headers,
+        range_header,
+        if_range,
+    )
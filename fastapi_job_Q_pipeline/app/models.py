@@ -1,8 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from core.expressions import compile_expression
+
+
+class ColumnTransform(BaseModel):
+    column: str = Field(min_length=1, description="Column to create or overwrite.")
+    expression: str = Field(
+        min_length=1,
+        description="Column expression, e.g. \"price * qty if qty > 0 else 0\".",
+    )
+
+    @field_validator("expression")
+    @classmethod
+    def expression_compiles(cls, value: str) -> str:
+        compile_expression(value)
+        return value
 
 
 class PipelineConfig(BaseModel):
@@ -18,11 +34,65 @@ class PipelineConfig(BaseModel):
         default=None,
         description="List of parallel stage groups run in order.",
     )
+    execution_modes: Optional[Dict[str, Literal["thread", "process", "inline"]]] = Field(
+        default=None,
+        description="Per-stage execution mode overrides.",
+    )
+    stage_timeouts: Optional[Dict[str, float]] = Field(
+        default=None,
+        description="Seconds each named stage may run before the job fails; overrides STAGE_TIMEOUT_SECONDS.",
+    )
+    chunk_size: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Stream the workbook through row-wise stages in chunks of this many rows.",
+    )
+    ingest: Literal["first_sheet", "all_sheets"] = Field(
+        default="first_sheet",
+        description=(
+            "Read only the first sheet, or every sheet concatenated and tagged with _source_sheet. "
+            "A .zip upload reads every workbook inside it and also tags rows with _source_file."
+        ),
+    )
+    transforms: Optional[List[ColumnTransform]] = Field(
+        default=None,
+        description="Column expressions applied by stage2, in order, over whole columns.",
+    )
+    priority: Optional[Literal["high", "default", "low"]] = Field(
+        default=None,
+        description="Queue priority; overrides size/cost based routing.",
+    )
+    output_format: Literal["csv", "parquet", "arrow"] = Field(
+        default="csv",
+        description="Format stage3 writes the result in; others are converted on download.",
+    )
+
+    @field_validator("stage_timeouts")
+    @classmethod
+    def timeouts_positive(cls, value: Optional[Dict[str, float]]) -> Optional[Dict[str, float]]:
+        invalid = [name for name, seconds in (value or {}).items() if seconds <= 0]
+        if invalid:
+            raise ValueError(f"Stage timeouts must be positive: {invalid}")
+        return value
 
 
 class JobCreateResponse(BaseModel):
     job_id: str
     status: str
+    # True when an identical in-flight or recent job was returned instead of a new one.
+    deduplicated: bool = False
+
+
+class JobBatchCreateResponse(BaseModel):
+    job_ids: List[str]
+    status: str
+
+
+class JobCancelResponse(BaseModel):
+    job_id: str
+    # CANCELLED when the job had not started; RUNNING until its worker notices otherwise.
+    status: str
+    cancel_requested: bool = True
 
 
 class JobStatusResponse(BaseModel):
@@ -32,3 +102,18 @@ class JobStatusResponse(BaseModel):
     updated_at: Optional[int] = None
     error: Optional[str] = None
     result: Optional[Dict[str, Any]] = None
+
+
+class JobSummaryResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: Optional[int] = None
+    updated_at: Optional[int] = None
+    error: Optional[str] = None
+
+
+class JobSummaryListResponse(BaseModel):
+    jobs: List[JobSummaryResponse]
+    # Listing only: jobs in the index, and where the next page starts (None on the last).
+    total: Optional[int] = None
+    next_offset: Optional[int] = None
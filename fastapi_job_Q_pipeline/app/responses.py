@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from email.utils import formatdate
+from typing import Dict, Iterator, Optional, Tuple
+
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+RANGE_CHUNK_BYTES = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # One "bytes=" range as inclusive (start, end). Multiple or malformed ranges are
+    # ignored (None), which RFC 9110 allows: the whole file is served instead.
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, sep, end_text = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not start_text:
+            suffix = int(end_text)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = f.read(min(RANGE_CHUNK_BYTES, remaining))
+            if not block:
+                return
+            remaining -= len(block)
+            yield block
+
+
+def ranged_file_response(
+    path: str,
+    media_type: str,
+    filename: str,
+    headers: Dict[str, str],
+    range_header: Optional[str] = None,
+    if_range: Optional[str] = None,
+) -> Response:
+    stat = os.stat(path)
+    # Same validator Starlette's FileResponse would send, so 200s and 206s agree.
+    etag = '"' + hashlib.md5(f"{stat.st_mtime}-{stat.st_size}".encode(), usedforsecurity=False).hexdigest() + '"'
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    headers = {**headers, "Accept-Ranges": "bytes", "ETag": etag, "Last-Modified": last_modified}
+
+    # A resumed download only gets a range if the file is still the one it started on.
+    if if_range is not None and if_range not in (etag, last_modified):
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, stat.st_size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers, stat_result=stat)
+
+    start, end = byte_range
+    headers.update(
+        {
+            "Content-Range": f"bytes {start}-{end}/{stat.st_size}",
+            "Content-Length": str(end - start + 1),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        }
+    )
+    return StreamingResponse(_read_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
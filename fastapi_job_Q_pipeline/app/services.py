@@ -1,16 +1,29 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import threading
+import time
 import traceback
 import uuid
-from typing import Any, Callable, Dict, Optional
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
 
+from core.admission import DEFERRED_PRIORITY, AdmissionController
+from core.cancellation import CancellationToken, JobCancelled
 from core.contracts import (
+    AdmissionStoreContract,
     CompletionNotifierContract,
     FileStorageContract,
     JobQueueContract,
     JobRepositoryContract,
     PipelineExecutorContract,
+    StageCheckpointContract,
+    StageMetricsContract,
 )
+from core.excel_readers import DEFAULT_READERS
+from core.formats import DEFAULT_OUTPUT_FORMAT, convert_output
+from core.routing import QueueRouter
 
 
 class JobNotFoundError(Exception):
@@ -25,6 +38,46 @@ class JobOutputMissingError(Exception):
     pass
 
 
+class JobNotCancellableError(Exception):
+    pass
+
+
+# Statuses a duplicate submission can attach to; a FAILED job is run again.
+COALESCE_STATUSES = {"QUEUED", "RUNNING", "COMPLETED"}
+
+CANCELLABLE_STATUSES = {"QUEUED", "RUNNING"}
+
+
+def submission_fingerprint(input_hash: str, pipeline_config: Optional[Dict[str, Any]], callback_url: Optional[str]) -> str:
+    # The callback is part of the identity: a job notifies exactly one URL.
+    canonical = json.dumps(
+        {"input": input_hash, "config": pipeline_config or {}, "callback_url": callback_url},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def settle_admission(
+    admission: AdmissionStoreContract,
+    job_id: str,
+    job: Dict[str, Any],
+    seconds: Optional[float] = None,
+    release: bool = True,
+) -> None:
+    # The job left the queue; with release it is also finished, freeing its client's
+    # slot, and a successful run's seconds feed the backlog estimate. Bookkeeping only,
+    # so like telemetry it never fails a job.
+    try:
+        admission.remove_queued(job_id)
+        if release and job.get("client_id"):
+            admission.release_client_slot(job["client_id"], job_id)
+        if seconds is not None and job.get("input_size"):
+            admission.record_processed(job["input_size"], seconds)
+    except Exception:  # noqa: BLE001
+        return
+
+
 class JobSubmissionService:
     def __init__(
         self,
@@ -32,31 +85,140 @@ class JobSubmissionService:
         storage: FileStorageContract,
         queue: JobQueueContract,
         job_id_provider: Optional[Callable[[], str]] = None,
+        max_upload_bytes: Optional[int] = None,
+        router: Optional[QueueRouter] = None,
+        dedup_ttl_seconds: Optional[int] = None,
+        admission: Optional[AdmissionController] = None,
     ):
         self.repository = repository
         self.storage = storage
         self.queue = queue
         self.job_id_provider = job_id_provider or (lambda: uuid.uuid4().hex)
+        self.max_upload_bytes = max_upload_bytes
+        self.router = router or QueueRouter(policy="priority")
+        # How long a submission can be coalesced into an identical one; None disables it.
+        self.dedup_ttl_seconds = dedup_ttl_seconds
+        # Consulted before anything is stored; None admits every submission.
+        self.admission = admission
+
+    def _job_data(
+        self,
+        upload: Dict[str, Any],
+        pipeline_config: Optional[Dict[str, Any]],
+        callback_url: Optional[str],
+        client_id: Optional[str] = None,
+        deferred: bool = False,
+    ) -> Dict[str, Any]:
+        data = {
+            "input_path": upload["path"],
+            "input_hash": upload["sha256"],
+            "input_size": upload["size"],
+            "pipeline_config": pipeline_config,
+            "callback_url": callback_url,
+        }
+        data["priority"] = self.router.route(data)
+        if deferred:
+            # Overload outranks even an explicit priority; the job waits behind the rest.
+            data["priority"] = DEFERRED_PRIORITY
+            data["deferred"] = True
+        if client_id:
+            # The worker frees the client's quota slot when the job finishes.
+            data["client_id"] = client_id
+        return data
+
+    def _admit(self, client_id: Optional[str], job_ids: List[str]) -> bool:
+        # True when the jobs go to the low lane; raises AdmissionRejected.
+        return self.admission.admit(client_id, job_ids) if self.admission is not None else False
+
+    def _track_queued(self, jobs: Dict[str, Dict[str, Any]]) -> None:
+        # Counted before the enqueue, so a worker's removal can never come first.
+        if self.admission is not None:
+            for job_id, data in jobs.items():
+                self.admission.store.add_queued(job_id, data["input_size"])
+
+    def _withdraw(self, client_id: Optional[str], job_ids: List[str]) -> None:
+        if self.admission is not None:
+            self.admission.release(client_id, job_ids)
+            for job_id in job_ids:
+                self.admission.store.remove_queued(job_id)
 
     def submit(
         self,
         filename: str,
-        file_content: bytes,
+        file_stream: BinaryIO,
         pipeline_config: Optional[Dict[str, Any]],
         callback_url: Optional[str],
+        client_id: Optional[str] = None,
     ) -> str:
+        return self.submit_coalesced(filename, file_stream, pipeline_config, callback_url, client_id)[0]
+
+    def submit_coalesced(
+        self,
+        filename: str,
+        file_stream: BinaryIO,
+        pipeline_config: Optional[Dict[str, Any]],
+        callback_url: Optional[str],
+        client_id: Optional[str] = None,
+    ) -> Tuple[str, Optional[str]]:
+        # Returns (job_id, status of the existing job it was attached to, or None if new).
         job_id = self.job_id_provider()
-        input_path = self.storage.save_upload(filename, file_content)
-        self.repository.create_job(
-            job_id,
-            {
-                "input_path": input_path,
-                "pipeline_config": pipeline_config,
-                "callback_url": callback_url,
-            },
-        )
-        self.queue.enqueue(job_id)
-        return job_id
+        deferred = self._admit(client_id, [job_id])
+        try:
+            upload = self.storage.save_upload(filename, file_stream, self.max_upload_bytes)
+            data = self._job_data(upload, pipeline_config, callback_url, client_id, deferred)
+            self._track_queued({job_id: data})
+            # The job hash exists before its fingerprint is published, so a concurrent
+            # duplicate that claims second always finds a job to attach to; a missing
+            # one really was deleted.
+            self.repository.create_job(job_id, data)
+
+            if self.dedup_ttl_seconds:
+                fingerprint = submission_fingerprint(upload["sha256"], pipeline_config, callback_url)
+                existing_id = self.repository.claim_fingerprint(fingerprint, job_id, self.dedup_ttl_seconds)
+                if existing_id is not None:
+                    existing = self.repository.get_jobs([existing_id], summary=True)[0]
+                    if existing and existing.get("status") in COALESCE_STATUSES:
+                        # Never enqueued, so nothing but its hash and upload to take back.
+                        self.repository.delete_jobs([job_id])
+                        self.storage.delete_upload(upload["path"])
+                        self._withdraw(client_id, [job_id])
+                        return existing_id, existing["status"]
+                    # Failed or deleted: this submission takes the fingerprint over.
+                    self.repository.set_fingerprint(fingerprint, job_id, self.dedup_ttl_seconds)
+
+            self.queue.enqueue(job_id, data["priority"])
+        except Exception:
+            self._withdraw(client_id, [job_id])
+            raise
+        return job_id, None
+
+    def submit_many(
+        self,
+        uploads: List[Tuple[str, BinaryIO]],
+        pipeline_config: Optional[Dict[str, Any]],
+        callback_url: Optional[str],
+        client_id: Optional[str] = None,
+    ) -> List[str]:
+        # Files are stored first; every job hash and queue entry then goes out in one
+        # Redis transaction, so a batch is either fully queued or not at all. A batch is
+        # admitted or rejected as a whole.
+        job_ids = [self.job_id_provider() for _ in uploads]
+        deferred = self._admit(client_id, job_ids)
+        try:
+            jobs: Dict[str, Dict[str, Any]] = {}
+            for job_id, (filename, file_stream) in zip(job_ids, uploads):
+                upload = self.storage.save_upload(filename, file_stream, self.max_upload_bytes)
+                jobs[job_id] = self._job_data(upload, pipeline_config, callback_url, client_id, deferred)
+
+            self._track_queued(jobs)
+            pipeline = self.repository.pipeline()
+            self.repository.create_jobs(jobs, pipeline)
+            self.queue.enqueue_many(job_ids, pipeline, [jobs[job_id]["priority"] for job_id in job_ids])
+            pipeline.execute()
+        except Exception:
+            self._withdraw(client_id, job_ids)
+            raise
+        return job_ids
 
 
 class JobQueryService:
@@ -69,16 +231,62 @@ class JobQueryService:
             raise JobNotFoundError(f"Job '{job_id}' not found")
         return job
 
-    def get_result_path(self, job_id: str) -> str:
+    def get_job_summaries(self, job_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return self.repository.get_jobs(job_ids, summary=True)
+
+    def list_jobs(self, offset: int = 0, limit: int = 100) -> Tuple[List[Tuple[str, Dict[str, Any]]], int]:
+        # Newest first; a job deleted between the two reads is skipped.
+        job_ids, total = self.repository.list_job_ids(offset, limit)
+        summaries = self.repository.get_jobs(job_ids, summary=True)
+        return [(job_id, job) for job_id, job in zip(job_ids, summaries) if job], total
+
+    def _completed_result(self, job_id: str) -> Dict[str, Any]:
         job = self.get_job(job_id)
         if job.get("status") != "COMPLETED":
             raise JobNotCompletedError(f"Job '{job_id}' is not completed")
 
         result = job.get("result") or {}
-        output_path = result.get("output_path")
-        if not output_path:
+        if not result.get("output_path"):
             raise JobOutputMissingError(f"Output for job '{job_id}' not found")
-        return output_path
+        return result
+
+    def get_result_path(self, job_id: str) -> str:
+        return self._completed_result(job_id)["output_path"]
+
+    def get_result(self, job_id: str, output_format: Optional[str] = None) -> Tuple[str, str]:
+        # Returns (path, format); other formats are converted on first request and kept.
+        result = self._completed_result(job_id)
+        stored_format = result.get("output_format") or DEFAULT_OUTPUT_FORMAT
+        output_format = output_format or stored_format
+        try:
+            return convert_output(result["output_path"], stored_format, output_format), output_format
+        except FileNotFoundError as exc:
+            raise JobOutputMissingError(f"Output for job '{job_id}' not found") from exc
+
+
+class JobCancellationService:
+    def __init__(self, repository: JobRepositoryContract, admission: Optional[AdmissionStoreContract] = None):
+        self.repository = repository
+        self.admission = admission
+
+    def cancel(self, job_id: str) -> str:
+        # Returns the job's status after the request. The flag is raised first, so a
+        # worker that picks a QUEUED job up in the meantime still stops it.
+        job = self.repository.get_jobs([job_id], summary=True)[0]
+        if not job:
+            raise JobNotFoundError(f"Job '{job_id}' not found")
+        status = job.get("status")
+        if status not in CANCELLABLE_STATUSES:
+            raise JobNotCancellableError(f"Job '{job_id}' is already {status}")
+        self.repository.request_cancel(job_id)
+        if status == "QUEUED":
+            # Its queue entry stays behind; the worker that dequeues it skips it.
+            self.repository.update_job(job_id, {"status": "CANCELLED", "error": "Cancelled before it started"})
+            if self.admission is not None:
+                # Frees the backlog and the client's slot now, not when a worker gets to it.
+                settle_admission(self.admission, job_id, self.repository.get_job(job_id) or {})
+            return "CANCELLED"
+        return status
 
 
 class JobProcessingService:
@@ -88,48 +296,64 @@ class JobProcessingService:
         storage: FileStorageContract,
         executor: PipelineExecutorContract,
         notifier: CompletionNotifierContract,
+        metrics: Optional[StageMetricsContract] = None,
+        precompress: Tuple[str, ...] = (),
+        checkpoints: Optional[Callable[[str, Optional[Dict[str, Any]]], StageCheckpointContract]] = None,
+        heartbeat_seconds: Optional[float] = None,
+        excel_readers: Tuple[str, ...] = DEFAULT_READERS,
+        cancel_poll_seconds: float = 1.0,
+        admission: Optional[AdmissionStoreContract] = None,
+        stale_seconds: Optional[float] = None,
     ):
         self.repository = repository
         self.storage = storage
         self.executor = executor
         self.notifier = notifier
+        self.metrics = metrics
+        # Content encodings written next to each output by stage3.
+        self.precompress = precompress
+        # (job_id, saved checkpoint metadata) -> that job's checkpoint store.
+        self.checkpoints = checkpoints
+        self.heartbeat_seconds = heartbeat_seconds
+        # A RUNNING job that beat within this window still has a live worker.
+        self.stale_seconds = stale_seconds
+        self.excel_readers = excel_readers
+        # How often a running job re-reads its cancellation flag.
+        self.cancel_poll_seconds = cancel_poll_seconds
+        # Told when a job leaves the queue and how long it took, for admission control.
+        self.admission = admission
 
     def process(self, job_id: str) -> None:
         job = self.repository.get_job(job_id)
-        if not job:
+        # A reclaimed job can be delivered twice; the second delivery has nothing to do.
+        if not job or job.get("status") in ("COMPLETED", "CANCELLED"):
+            if job and self.admission is not None:
+                settle_admission(self.admission, job_id, job)
+            return
+        # Nor does a delivery of a job another worker is still beating for.
+        if self._held_elsewhere(job):
             return
 
-        self.repository.update_job(job_id, {"status": "RUNNING"})
+        running: Dict[str, Any] = {"status": "RUNNING"}
+        if self.heartbeat_seconds:
+            running["heartbeat_at"] = int(time.time())
+        self.repository.update_job(job_id, running)
 
+        cancellation = CancellationToken(
+            poll=lambda: self.repository.cancel_requested(job_id),
+            poll_seconds=self.cancel_poll_seconds,
+        )
+        started = time.perf_counter()
+        seconds: Optional[float] = None
         try:
-            output_path = self.storage.build_output_path(job_id)
-            self.storage.ensure_path(output_path)
-
-            pipeline_config = job.get("pipeline_config") or {}
-            enabled = pipeline_config.get("enabled_stages")
-            order = pipeline_config.get("order")
-            parallel_groups = pipeline_config.get("parallel_groups")
-
-            context = {
-                "job_id": job_id,
-                "input_path": job["input_path"],
-                "output_path": output_path,
-            }
-
-            results = self.executor.run(
-                context=context,
-                enabled=enabled,
-                order=order,
-                parallel_groups=parallel_groups,
-            )
-
-            result_payload: Dict[str, Any] = {
-                "output_path": output_path,
-                "stages": list(results.keys()),
-            }
-            self.repository.update_job(job_id, {"status": "COMPLETED", "result": result_payload})
-            self.notifier.notify(job.get("callback_url"), job_id, result_payload)
-
+            if self.admission is not None:
+                settle_admission(self.admission, job_id, job, release=False)
+            with self._heartbeat(job_id):
+                self._run(job_id, job, cancellation)
+            seconds = time.perf_counter() - started
+        except JobCancelled as exc:
+            self.repository.update_job(job_id, {"status": "CANCELLED", "error": str(exc)})
+            self.notifier.notify(job.get("callback_url"), job_id, {"status": "CANCELLED", "error": str(exc)})
         except Exception as exc:  # noqa: BLE001 - track worker errors in job metadata
             error_payload = {
                 "status": "FAILED",
@@ -138,3 +362,212 @@ class JobProcessingService:
             }
             self.repository.update_job(job_id, error_payload)
             self.notifier.notify(job.get("callback_url"), job_id, {"status": "FAILED", "error": str(exc)})
+        finally:
+            if self.admission is not None:
+                settle_admission(self.admission, job_id, job, seconds)
+
+    def _held_elsewhere(self, job: Dict[str, Any]) -> bool:
+        # Only a beating job can be told apart from one whose worker died.
+        if not (self.heartbeat_seconds and self.stale_seconds) or job.get("status") != "RUNNING":
+            return False
+        heartbeat_at = job.get("heartbeat_at")
+        return heartbeat_at is not None and time.time() - float(heartbeat_at) < self.stale_seconds
+
+    @contextmanager
+    def _heartbeat(self, job_id: str) -> Iterator[None]:
+        # Every write refreshes the job's updated_at, which is what the reaper watches.
+        if not self.heartbeat_seconds:
+            yield
+            return
+        stop = threading.Event()
+
+        def beat() -> None:
+            while not stop.wait(self.heartbeat_seconds):
+                try:
+                    self.repository.update_job(job_id, {"heartbeat_at": int(time.time())})
+                except Exception:  # noqa: BLE001 - a missed beat only makes the job look older
+                    continue
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def _run(self, job_id: str, job: Dict[str, Any], cancellation: CancellationToken) -> None:
+        pipeline_config = job.get("pipeline_config") or {}
+        output_format = pipeline_config.get("output_format") or DEFAULT_OUTPUT_FORMAT
+        output_path = self.storage.build_output_path(job_id, output_format)
+        self.storage.ensure_path(output_path)
+
+        enabled = pipeline_config.get("enabled_stages")
+        order = pipeline_config.get("order")
+        parallel_groups = pipeline_config.get("parallel_groups")
+        execution_modes = pipeline_config.get("execution_modes")
+
+        context = {
+            "job_id": job_id,
+            "input_path": job["input_path"],
+            "input_hash": job.get("input_hash"),
+            "output_path": output_path,
+            "chunk_size": pipeline_config.get("chunk_size"),
+            "ingest": pipeline_config.get("ingest") or "first_sheet",
+            "excel_readers": self.excel_readers,
+            "transforms": pipeline_config.get("transforms"),
+            "output_format": output_format,
+            "precompress": self.precompress,
+        }
+
+        run_options: Dict[str, Any] = {"cancellation": cancellation}
+        if pipeline_config.get("stage_timeouts"):
+            run_options["timeouts"] = pipeline_config["stage_timeouts"]
+        checkpoint = None
+        if self.checkpoints is not None:
+            # Stages checkpointed by an earlier attempt are restored instead of rerun.
+            checkpoint = self.checkpoints(job_id, job.get("checkpoints"))
+            run_options["checkpoint"] = checkpoint
+
+        results = self.executor.run(
+            context=context,
+            enabled=enabled,
+            order=order,
+            parallel_groups=parallel_groups,
+            execution_modes=execution_modes,
+            **run_options,
+        )
+
+        result_payload: Dict[str, Any] = {
+            "output_path": output_path,
+            "output_format": output_format,
+            "stages": list(results.keys()),
+            "cached_stages": context.get("cached_stages", []),
+            "restored_stages": context.get("restored_stages", []),
+            "stage_metrics": context.get("stage_metrics", {}),
+        }
+        completed: Dict[str, Any] = {"status": "COMPLETED", "result": result_payload}
+        if checkpoint is not None:
+            completed["checkpoints"] = None
+        self.repository.update_job(job_id, completed)
+        if checkpoint is not None:
+            checkpoint.clear()
+        if self.metrics is not None:
+            self._record_metrics(result_payload["stage_metrics"])
+        self.notifier.notify(job.get("callback_url"), job_id, result_payload)
+
+    def _record_metrics(self, stage_metrics: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            self.metrics.record(stage_metrics)
+        except Exception:  # noqa: BLE001 - telemetry must never fail a finished job
+            return
+
+
+class JobRetentionService:
+    # ttls maps a status to how long a job may sit in it, unchanged, before it and its
+    # files are deleted; statuses without a TTL (normally QUEUED and RUNNING) are kept.
+    def __init__(
+        self,
+        repository: JobRepositoryContract,
+        storage: FileStorageContract,
+        ttls: Dict[str, int],
+        batch_size: int = 500,
+    ):
+        self.repository = repository
+        self.storage = storage
+        self.ttls = ttls
+        self.batch_size = batch_size
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        if not self.ttls:
+            return 0
+        now = time.time() if now is None else now
+        cutoff = now - min(self.ttls.values())
+        deleted = 0
+        offset = 0
+        while True:
+            job_ids = self.repository.job_ids_updated_before(cutoff, offset, self.batch_size)
+            if not job_ids:
+                return deleted
+            summaries = self.repository.get_jobs(job_ids, summary=True)
+            expired = [job_id for job_id, job in zip(job_ids, summaries) if self._expired(job, now)]
+            if expired:
+                # Full records only for the jobs being deleted, for their file paths.
+                for job_id, job in zip(expired, self.repository.get_jobs(expired)):
+                    if job:
+                        self.storage.delete_job_files(job_id, job.get("input_path"))
+                self.repository.delete_jobs(expired)
+            deleted += len(expired)
+            # Deleted entries left the index; the kept ones are stepped over.
+            offset += len(job_ids) - len(expired)
+            if len(job_ids) < self.batch_size:
+                return deleted
+
+    def _expired(self, job: Optional[Dict[str, Any]], now: float) -> bool:
+        if job is None:
+            # Index entry whose hash is already gone.
+            return True
+        ttl = self.ttls.get(job.get("status"))
+        return ttl is not None and now - (job.get("updated_at") or 0) >= ttl
+
+
+class JobReaperService:
+    # A RUNNING job whose record has not been written for stale_seconds lost its worker
+    # (killed, deployed over): it is queued again and resumes from its checkpoints, or is
+    # failed once it has been reclaimed max_attempts times.
+    def __init__(
+        self,
+        repository: JobRepositoryContract,
+        queue: JobQueueContract,
+        stale_seconds: float,
+        max_attempts: int = 3,
+        batch_size: int = 500,
+        admission: Optional[AdmissionStoreContract] = None,
+    ):
+        self.repository = repository
+        self.queue = queue
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.admission = admission
+
+    def reap(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        cutoff = now - self.stale_seconds
+        reaped = 0
+        offset = 0
+        while True:
+            job_ids = self.repository.job_ids_updated_before(cutoff, offset, self.batch_size)
+            if not job_ids:
+                return reaped
+            summaries = self.repository.get_jobs(job_ids, summary=True)
+            stale = [job_id for job_id, job in zip(job_ids, summaries) if job and job.get("status") == "RUNNING"]
+            for job_id, job in zip(stale, self.repository.get_jobs(stale)):
+                if job is not None:
+                    self._reclaim(job_id, job)
+            reaped += len(stale)
+            # Reclaimed jobs were just written, so they left the window.
+            offset += len(job_ids) - len(stale)
+            if len(job_ids) < self.batch_size:
+                return reaped
+
+    def _reclaim(self, job_id: str, job: Dict[str, Any]) -> None:
+        if self.repository.cancel_requested(job_id):
+            # Its worker died before it saw the cancellation; nothing to run again.
+            self.repository.update_job(job_id, {"status": "CANCELLED", "error": "Job cancelled"})
+            if self.admission is not None:
+                settle_admission(self.admission, job_id, job)
+            return
+        attempts = (job.get("attempts") or 0) + 1
+        if attempts > self.max_attempts:
+            self.repository.update_job(
+                job_id,
+                {"status": "FAILED", "error": f"Worker lost {attempts - 1} times; giving up", "attempts": attempts},
+            )
+            if self.admission is not None:
+                settle_admission(self.admission, job_id, job)
+            return
+        self.repository.update_job(job_id, {"status": "QUEUED", "attempts": attempts})
+        if self.admission is not None:
+            self.admission.add_queued(job_id, job.get("input_size") or 0)
+        self.queue.enqueue(job_id, job.get("priority") or "default")
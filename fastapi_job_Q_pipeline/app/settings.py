@@ -1,4 +1,6 @@
 import os
+import socket
+
 from pydantic import BaseModel
 
 
@@ -7,6 +9,72 @@ class Settings(BaseModel):
     storage_dir: str = os.getenv("STORAGE_DIR", "./storage")
     queue_name: str = os.getenv("QUEUE_NAME", "pipeline-jobs")
     worker_task_path: str = os.getenv("WORKER_TASK_PATH", "app.tasks.run_pipeline_job")
+    job_events_channel: str = os.getenv("JOB_EVENTS_CHANNEL", "job-events")
+    # "redis" (RQ workers) or "memory": jobs and queue live in the API process, no Redis needed.
+    job_backend: str = os.getenv("JOB_BACKEND", "redis")
+    memory_workers: int = int(os.getenv("MEMORY_WORKERS", "4"))
+    job_encoding: str = os.getenv("JOB_ENCODING", "json")
+    max_bulk_job_ids: int = int(os.getenv("MAX_BULK_JOB_IDS", "1000"))
+    max_upload_bytes: int = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024**2)))
+    # Opt-in: coalescing hands a resubmission the earlier job's result, which is only
+    # right when callers expect it.
+    dedup_ttl_seconds: int = int(os.getenv("DEDUP_TTL_SECONDS", "0"))
+    max_batch_files: int = int(os.getenv("MAX_BATCH_FILES", "500"))
+    # The whole /upload/batch body; each file in it still has MAX_UPLOAD_BYTES.
+    max_batch_upload_bytes: int = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(2 * 1024**3)))
+    queue_routing: str = os.getenv("QUEUE_ROUTING", "size")
+    queue_weights: str = os.getenv("QUEUE_WEIGHTS", "high=6,default=3,low=1")
+    small_job_bytes: int = int(os.getenv("SMALL_JOB_BYTES", str(5 * 1024**2)))
+    large_job_bytes: int = int(os.getenv("LARGE_JOB_BYTES", str(100 * 1024**2)))
+    worker_processes: int = int(os.getenv("WORKER_PROCESSES", "1"))
+    worker_fork_per_job: bool = os.getenv("WORKER_FORK_PER_JOB", "false").lower() == "true"
+    callback_mode: str = os.getenv("CALLBACK_MODE", "queue")
+    callback_queue: str = os.getenv("CALLBACK_QUEUE", "callbacks")
+    # Must be unique per dispatcher and survive its restarts: it names the list of
+    # callbacks that dispatcher has in flight.
+    callback_dispatcher_name: str = os.getenv("CALLBACK_DISPATCHER_NAME", socket.gethostname())
+    callback_concurrency: int = int(os.getenv("CALLBACK_CONCURRENCY", "32"))
+    callback_max_attempts: int = int(os.getenv("CALLBACK_MAX_ATTEMPTS", "6"))
+    callback_timeout_seconds: float = float(os.getenv("CALLBACK_TIMEOUT_SECONDS", "10"))
+    # status=seconds; statuses left out are never swept.
+    job_retention: str = os.getenv("JOB_RETENTION", "COMPLETED=604800,FAILED=604800,CANCELLED=604800")
+    retention_sweep_interval_seconds: float = float(os.getenv("RETENTION_SWEEP_INTERVAL_SECONDS", "300"))
+    retention_batch_size: int = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+    # e.g. "zstd,gzip"; empty compresses results lazily on first download instead.
+    result_precompress: str = os.getenv("RESULT_PRECOMPRESS", "")
+    # Opt-in: every stage output is written as Parquet, which only pays off for long jobs.
+    checkpoints_enabled: bool = os.getenv("CHECKPOINTS_ENABLED", "false").lower() == "true"
+    heartbeat_seconds: float = float(os.getenv("HEARTBEAT_SECONDS", "30"))
+    # Must comfortably exceed HEARTBEAT_SECONDS, or live jobs get reclaimed.
+    stale_job_seconds: float = float(os.getenv("STALE_JOB_SECONDS", "300"))
+    max_job_attempts: int = int(os.getenv("MAX_JOB_ATTEMPTS", "3"))
+    # Applies to every stage without its own stage_timeouts entry; 0 means no limit.
+    stage_timeout_seconds: float = float(os.getenv("STAGE_TIMEOUT_SECONDS", "0"))
+    # "kill" or "abandon" process-pool stages that overrun or belong to a cancelled job.
+    # The memory backend always abandons, since its jobs share one process pool.
+    stage_overrun: str = os.getenv("STAGE_OVERRUN", "kill")
+    cancel_poll_seconds: float = float(os.getenv("CANCEL_POLL_SECONDS", "1"))
+    # Partitionable process stages (stage2) split inputs of at least twice this many rows
+    # across the process pool, one partition per core at most; 0 disables it.
+    min_partition_rows: int = int(os.getenv("MIN_PARTITION_ROWS", "50000"))
+    # Excel readers in preference order; uninstalled ones are skipped and pandas' default
+    # engine is always the last resort. Compare them on real data with benchmark_readers.py.
+    excel_readers: str = os.getenv("EXCEL_READERS", "calamine,pandas")
+    # Admission control on /upload; a 0 threshold is not checked. Past the depth or
+    # backlog threshold uploads get 429 + Retry-After ("reject") or go to the low lane
+    # until twice the threshold ("defer"). Backlog seconds are queued bytes times the
+    # recent seconds per byte, divided by ADMISSION_PARALLELISM (total job workers).
+    admission_max_queue_depth: int = int(os.getenv("ADMISSION_MAX_QUEUE_DEPTH", "0"))
+    admission_max_backlog_seconds: float = float(os.getenv("ADMISSION_MAX_BACKLOG_SECONDS", "0"))
+    admission_min_free_bytes: int = int(os.getenv("ADMISSION_MIN_FREE_BYTES", "0"))
+    admission_overload: str = os.getenv("ADMISSION_OVERLOAD", "reject")
+    admission_parallelism: int = int(os.getenv("ADMISSION_PARALLELISM", "1"))
+    admission_retry_after_seconds: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "30"))
+    # Queued plus running jobs per client, identified by ADMISSION_CLIENT_HEADER or its address.
+    client_max_jobs: int = int(os.getenv("CLIENT_MAX_JOBS", "0"))
+    admission_client_header: str = os.getenv("ADMISSION_CLIENT_HEADER", "X-Client-Id")
+    stage_cache_enabled: bool = os.getenv("STAGE_CACHE_ENABLED", "false").lower() == "true"
+    stage_cache_max_bytes: int = int(os.getenv("STAGE_CACHE_MAX_BYTES", str(2 * 1024**3)))
 
 
 settings = Settings()
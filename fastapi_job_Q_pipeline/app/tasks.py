@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from app.dependencies import get_processing_service
+from app.services import JobProcessingService
+
+
+@lru_cache(maxsize=1)
+def processing_service() -> JobProcessingService:
+    # Built once per worker process (or once before forking) and reused by every job.
+    return get_processing_service()
 
 
 def run_pipeline_job(job_id: str) -> None:
-    processing_service = get_processing_service()
-    processing_service.process(job_id)
+    processing_service().process(job_id)
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.excel_readers import READERS, available_readers
+
+# Excel's sheet limit is 1,048,576 rows including the header; larger workbooks spill
+# onto further sheets, which every reader then parses in turn.
+MAX_SHEET_ROWS = 1_048_575
+WRITE_BATCH_ROWS = 50_000
+
+
+def write_synthetic_workbook(path: Path, rows: int, columns: int, seed: int = 0) -> int:
+    # Streamed through openpyxl's write-only mode so millions of rows never sit in memory
+    # as a DataFrame. Returns the number of sheets written.
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    header = [f"{('num', 'int', 'text', 'date')[index % 4]}_{index}" for index in range(columns)]
+    epoch = datetime(2020, 1, 1)
+    sheets = 0
+    remaining = rows
+    while remaining > 0 or sheets == 0:
+        sheet_rows = min(remaining, MAX_SHEET_ROWS)
+        worksheet = workbook.create_sheet(f"data_{sheets + 1}")
+        worksheet.append(header)
+        for start in range(0, sheet_rows, WRITE_BATCH_ROWS):
+            count = min(WRITE_BATCH_ROWS, sheet_rows - start)
+            values: List[List[Any]] = []
+            for index in range(columns):
+                kind = index % 4
+                if kind == 0:
+                    values.append(rng.normal(size=count).round(4).tolist())
+                elif kind == 1:
+                    values.append(rng.integers(0, 1_000, size=count).tolist())
+                elif kind == 2:
+                    values.append(rng.choice(["alpha", "beta", "gamma", "delta"], size=count).tolist())
+                else:
+                    days = rng.integers(0, 3_650, size=count)
+                    values.append([epoch + timedelta(days=int(day)) for day in days])
+            for row in zip(*values):
+                worksheet.append(row)
+        remaining -= sheet_rows
+        sheets += 1
+    workbook.save(path)
+    return sheets
+
+
+def workbook_for(workdir: Path, rows: int, columns: int) -> Path:
+    # Generating millions of rows is slower than reading them; reuse earlier workbooks.
+    path = workdir / f"synthetic_{rows}x{columns}.xlsx"
+    if not path.exists():
+        tmp_path = path.with_suffix(".tmp.xlsx")
+        write_synthetic_workbook(tmp_path, rows, columns)
+        tmp_path.replace(path)
+    return path
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(reader: str, path: str) -> Dict[str, Any]:
+    # Runs in its own interpreter so the peak RSS belongs to this one read alone.
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    sheets = workbook.sheetnames
+    workbook.close()
+    read = READERS[reader][0]
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    rows = sum(len(read(path, sheet)) for sheet in sheets)
+    return {
+        "seconds": time.perf_counter() - started,
+        "rows": rows,
+        "peak_rss_mb": _peak_rss_mb(),
+        "baseline_rss_mb": baseline,
+    }
+
+
+def run_measurement(reader: str, path: Path, timeout: Optional[float]) -> Dict[str, Any]:
+    try:
+        completed = subprocess.run(
+            [sys.executable, __file__, "--measure", reader, str(path)],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout:g}s"}
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit code {completed.returncode}"}
+    return json.loads(completed.stdout)
+
+
+def run_benchmark(
+    sizes: List[int],
+    readers: List[str],
+    columns: int,
+    repeat: int,
+    workdir: Path,
+    timeout: Optional[float],
+) -> List[Dict[str, Any]]:
+    results = []
+    for rows in sizes:
+        path = workbook_for(workdir, rows, columns)
+        for reader in readers:
+            runs = [run_measurement(reader, path, timeout) for _ in range(repeat)]
+            errors = [run["error"] for run in runs if "error" in run]
+            entry: Dict[str, Any] = {
+                "rows": rows,
+                "reader": reader,
+                "file_mb": round(path.stat().st_size / 1024**2, 2),
+            }
+            if errors:
+                entry["error"] = errors[0]
+            else:
+                seconds = statistics.median(run["seconds"] for run in runs)
+                entry.update(
+                    {
+                        "seconds": round(seconds, 3),
+                        "rows_per_second": round(rows / seconds) if seconds else None,
+                        "peak_rss_mb": round(max(run["peak_rss_mb"] for run in runs), 1),
+                        "read_rss_mb": round(max(run["peak_rss_mb"] - run["baseline_rss_mb"] for run in runs), 1),
+                    }
+                )
+            results.append(entry)
+    return results
+
+
+def recommended_order(results: List[Dict[str, Any]]) -> List[str]:
+    # Fastest first by total time over every size; readers that failed on any size are
+    # left out (pandas' default engine stays the implicit last resort either way).
+    totals: Dict[str, float] = {}
+    failed = set()
+    for entry in results:
+        if "error" in entry:
+            failed.add(entry["reader"])
+        else:
+            totals[entry["reader"]] = totals.get(entry["reader"], 0.0) + entry["seconds"]
+    ranked = sorted((reader for reader in totals if reader not in failed), key=totals.__getitem__)
+    return ranked
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'rows':>10} {'file MB':>8} {'reader':<16} {'seconds':>9} {'rows/s':>10} {'peak MB':>8} {'read MB':>8}"]
+    for entry in results:
+        prefix = f"{entry['rows']:>10} {entry['file_mb']:>8} {entry['reader']:<16}"
+        if "error" in entry:
+            lines.append(f"{prefix} failed: {entry['error']}")
+        else:
+            lines.append(
+                f"{prefix} {entry['seconds']:>9.3f} {entry['rows_per_second']:>10} "
+                f"{entry['peak_rss_mb']:>8.1f} {entry['read_rss_mb']:>8.1f}"
+            )
+    lines.append("")
+    lines.append(f"EXCEL_READERS={','.join(recommended_order(results))}")
+    return "\n".join(lines)
+
+
+def parse_sizes(spec: str) -> List[int]:
+    return [int(part.replace("_", "")) for part in spec.split(",") if part.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares parse time and peak memory of the installed Excel readers on synthetic workbooks"
+    )
+    parser.add_argument(
+        "--rows",
+        default="10000,100000,1000000",
+        help="Comma-separated workbook sizes in rows, e.g. 10000,100000,1000000,5000000.",
+    )
+    parser.add_argument("--columns", type=int, default=8, help="Columns per workbook.")
+    parser.add_argument(
+        "--readers",
+        default=None,
+        help=f"Comma-separated readers to compare (default: every installed one of {', '.join(READERS)}).",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per reader and size; the median time is reported.")
+    parser.add_argument("--workdir", default=None, help="Keeps generated workbooks here for later runs.")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before one read is abandoned.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    parser.add_argument("--measure", nargs=2, metavar=("READER", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        sys.exit(0)
+
+    readers = args.readers.split(",") if args.readers else available_readers()
+    unknown = [reader for reader in readers if reader not in READERS]
+    if unknown:
+        parser.error(f"unknown readers: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        results = run_benchmark(parse_sizes(args.rows), readers, args.columns, args.repeat, workdir, args.timeout)
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import signal
+
+import httpx
+
+from app.database import get_async_redis
+from app.settings import settings
+from infrastructure.callback_dispatcher import CallbackDispatcher
+
+
+async def main(concurrency: int) -> None:
+    # One client for every delivery: keep-alive connections are pooled per host and
+    # reused across callbacks to the same endpoint.
+    limits = httpx.Limits(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        keepalive_expiry=30.0,
+    )
+    timeout = httpx.Timeout(settings.callback_timeout_seconds, connect=5.0)
+    redis_client = get_async_redis()
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as http_client:
+        dispatcher = CallbackDispatcher(
+            redis_client,
+            http_client,
+            settings.callback_queue,
+            name=settings.callback_dispatcher_name,
+            concurrency=concurrency,
+            max_attempts=settings.callback_max_attempts,
+        )
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, dispatcher.stop)
+        try:
+            await dispatcher.run()
+        finally:
+            await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Completion callback dispatcher")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.callback_concurrency,
+        help="Callbacks delivered at the same time.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.concurrency))
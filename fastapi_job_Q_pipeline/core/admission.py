@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from core.contracts import AdmissionStoreContract, FileStorageContract, JobQueueContract
+
+OVERLOAD_POLICIES = ("reject", "defer")
+DEFERRED_PRIORITY = "low"
+
+# In "defer" mode load past this multiple of a threshold is rejected after all, so the
+# low lane cannot grow without bound either.
+DEFER_LIMIT = 2.0
+MAX_RETRY_AFTER_SECONDS = 3600
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    # Decides, before an upload is stored, whether the system can take more work:
+    # queue depth, the queued bytes times the recent seconds-per-byte rate spread over
+    # `parallelism` workers, free disk and the client's in-flight jobs. Thresholds left
+    # as None are not checked. The shared signals are read at most every cache_seconds
+    # per process, so a burst of uploads costs Redis a handful of reads, not one each.
+    def __init__(
+        self,
+        store: AdmissionStoreContract,
+        queue: JobQueueContract,
+        storage: FileStorageContract,
+        max_queue_depth: Optional[int] = None,
+        max_backlog_seconds: Optional[float] = None,
+        min_free_bytes: Optional[int] = None,
+        client_quota: Optional[int] = None,
+        overload: str = "reject",
+        parallelism: int = 1,
+        retry_after_seconds: int = 30,
+        cache_seconds: float = 2.0,
+    ):
+        if overload not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy '{overload}'")
+        self.store = store
+        self.queue = queue
+        self.storage = storage
+        self.max_queue_depth = max_queue_depth
+        self.max_backlog_seconds = max_backlog_seconds
+        self.min_free_bytes = min_free_bytes
+        self.client_quota = client_quota
+        self.overload = overload
+        self.parallelism = max(1, parallelism)
+        self.retry_after_seconds = retry_after_seconds
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._signals: Optional[Tuple[int, Optional[float], Optional[int]]] = None
+        self._read_at = float("-inf")
+
+    def _read_signals(self) -> Tuple[int, Optional[float], Optional[int]]:
+        # (queue depth, backlog seconds or None before any job has finished, free bytes)
+        with self._lock:
+            if self._signals is None or time.monotonic() - self._read_at >= self.cache_seconds:
+                depth = self.queue.depth() if self.max_queue_depth else 0
+                backlog = None
+                if self.max_backlog_seconds:
+                    rate = self.store.seconds_per_byte()
+                    if rate is not None:
+                        backlog = self.store.backlog_bytes() * rate / self.parallelism
+                free = self.storage.free_bytes() if self.min_free_bytes else None
+                self._signals = (depth, backlog, free)
+                self._read_at = time.monotonic()
+            return self._signals
+
+    def _retry_after(self, seconds: Optional[float]) -> int:
+        if seconds is None or seconds <= 0:
+            seconds = self.retry_after_seconds
+        return min(MAX_RETRY_AFTER_SECONDS, max(1, math.ceil(seconds)))
+
+    def check(self, jobs: int = 1) -> bool:
+        # True when the jobs should go to the low lane; raises AdmissionRejected when
+        # they cannot be taken now.
+        depth, backlog, free = self._read_signals()
+        if free is not None and free < self.min_free_bytes:
+            raise AdmissionRejected("Not enough free storage", self._retry_after(None))
+
+        overloads: List[float] = []
+        wait: Optional[float] = None
+        if self.max_queue_depth and depth + jobs > self.max_queue_depth:
+            overloads.append((depth + jobs) / self.max_queue_depth)
+            if backlog is not None and depth:
+                # Time for the excess jobs to drain at the current per-job backlog.
+                wait = (depth + jobs - self.max_queue_depth) * backlog / depth
+        if self.max_backlog_seconds and backlog is not None and backlog > self.max_backlog_seconds:
+            overloads.append(backlog / self.max_backlog_seconds)
+            wait = max(wait or 0.0, backlog - self.max_backlog_seconds)
+        if not overloads:
+            return False
+        if self.overload == "defer" and max(overloads) <= DEFER_LIMIT:
+            return True
+        raise AdmissionRejected("Too much work queued", self._retry_after(wait))
+
+    def reserve(self, client_id: Optional[str], job_ids: List[str]) -> None:
+        # Takes one of the client's quota slots per job; all or none.
+        if not client_id or not self.client_quota:
+            return
+        taken: List[str] = []
+        for job_id in job_ids:
+            if not self.store.acquire_client_slot(client_id, job_id, self.client_quota):
+                self.release(client_id, taken)
+                raise AdmissionRejected(
+                    f"At most {self.client_quota} jobs in flight per client",
+                    self._retry_after(None),
+                )
+            taken.append(job_id)
+
+    def release(self, client_id: Optional[str], job_ids: List[str]) -> None:
+        if client_id and self.client_quota:
+            for job_id in job_ids:
+                self.store.release_client_slot(client_id, job_id)
+
+    def admit(self, client_id: Optional[str], job_ids: List[str]) -> bool:
+        deferred = self.check(len(job_ids))
+        self.reserve(client_id, job_ids)
+        return deferred
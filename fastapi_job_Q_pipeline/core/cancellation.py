@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Stage '{stage}' exceeded its {timeout:g}s timeout")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class CancellationToken:
+    # Handed to every Stage.run as context["cancellation"]. A job's token is cancelled
+    # explicitly or by its poll callback (e.g. a flag in Redis), checked at most every
+    # poll_seconds; each stage gets a child that also carries the stage's deadline.
+    # Deadlines are wall-clock, so a child pickled into a pool worker keeps its deadline
+    # (but no longer sees later cancellations; the parent abandons that worker instead).
+    def __init__(
+        self,
+        poll: Optional[Callable[[], bool]] = None,
+        poll_seconds: float = 1.0,
+        parent: Optional["CancellationToken"] = None,
+        stage: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.parent = parent
+        self.stage = stage
+        self.timeout = timeout
+        self.deadline = time.time() + timeout if timeout else None
+        self.reason: Optional[str] = None
+        self._poll = poll
+        self._poll_seconds = poll_seconds
+        self._polled_at = float("-inf")
+        self._event = threading.Event()
+
+    def cancel(self, reason: str = "Job cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def child(self, stage: str, timeout: Optional[float] = None) -> "CancellationToken":
+        return CancellationToken(parent=self, stage=stage, timeout=timeout)
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.parent is not None and self.parent.cancelled:
+            return True
+        if self._poll is not None and time.monotonic() - self._polled_at >= self._poll_seconds:
+            self._polled_at = time.monotonic()
+            try:
+                requested = self._poll()
+            except Exception:  # noqa: BLE001 - an unreachable flag store is not a cancellation
+                requested = False
+            if requested:
+                self.cancel()
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else max(0.0, self.deadline - time.time())
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise JobCancelled(self._reason())
+        if self.expired:
+            raise StageTimeout(self.stage or "?", self.timeout or 0.0)
+
+    def guard(self, chunks: Iterable[Any]) -> Iterator[Any]:
+        # Checked before every chunk of a streamed input.
+        for chunk in chunks:
+            self.check()
+            yield chunk
+
+    def _reason(self) -> str:
+        token: Optional[CancellationToken] = self
+        while token is not None:
+            if token.reason:
+                return token.reason
+            token = token.parent
+        return "Job cancelled"
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "timeout": self.timeout,
+            "deadline": self.deadline,
+            "reason": self._reason() if self.cancelled else None,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__()  # type: ignore[misc]
+        self.stage = state["stage"]
+        self.timeout = state["timeout"]
+        self.deadline = state["deadline"]
+        if state["reason"]:
+            self.cancel(state["reason"])
+
+
+def check_cancelled(context: Dict[str, Any]) -> None:
+    token = context.get("cancellation")
+    if token is not None:
+        token.check()
@@ -1,32 +1,95 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, Protocol
+from typing import Any, BinaryIO, Dict, List, Optional, Protocol, Tuple
+
+from core.cancellation import CancellationToken
+
+
+class UploadTooLargeError(Exception):
+    pass
 
 
 class JobRepositoryContract(Protocol):
     def create_job(self, job_id: str, data: Dict[str, Any]) -> None:
         ...
 
+    def create_jobs(self, jobs: Dict[str, Dict[str, Any]], pipeline: Optional[Any] = None) -> None:
+        ...
+
+    def pipeline(self) -> Any:
+        # A transaction shared with the queue; nothing is written until execute().
+        ...
+
     def update_job(self, job_id: str, data: Dict[str, Any]) -> None:
         ...
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         ...
 
+    def get_jobs(self, job_ids: List[str], summary: bool = False) -> List[Optional[Dict[str, Any]]]:
+        ...
+
+    def list_job_ids(self, offset: int = 0, limit: int = 100) -> Tuple[List[str], int]:
+        ...
+
+    def job_ids_updated_before(self, cutoff: float, offset: int = 0, limit: int = 500) -> List[str]:
+        ...
+
+    def delete_jobs(self, job_ids: List[str]) -> None:
+        ...
+
+    def claim_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int) -> Optional[str]:
+        # Atomically points the fingerprint at job_id unless it already points at a
+        # job; returns that job's id, or None once claimed.
+        ...
+
+    def set_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int) -> None:
+        ...
+
+    def request_cancel(self, job_id: str) -> None:
+        # Raises the job's cancellation flag, which its worker polls while it runs.
+        ...
+
+    def cancel_requested(self, job_id: str) -> bool:
+        ...
+
 
 class FileStorageContract(Protocol):
-    def save_upload(self, filename: str, file_content: bytes) -> str:
+    def save_upload(self, filename: str, stream: BinaryIO, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        # Returns {"path", "size", "sha256"}; raises UploadTooLargeError past max_bytes.
+        ...
+
+    def delete_upload(self, path: str) -> None:
         ...
 
-    def build_output_path(self, job_id: str) -> str:
+    def delete_job_files(self, job_id: str, input_path: Optional[str] = None) -> None:
+        # The upload plus the job's output in every format it may have been converted to.
+        ...
+
+    def build_output_path(self, job_id: str, output_format: str = "csv") -> str:
         ...
 
     def ensure_path(self, path: str) -> str:
         ...
 
+    def free_bytes(self) -> int:
+        ...
+
 
 class JobQueueContract(Protocol):
-    def enqueue(self, job_id: str) -> None:
+    def enqueue(self, job_id: str, priority: str = "default") -> None:
+        ...
+
+    def enqueue_many(
+        self,
+        job_ids: List[str],
+        pipeline: Optional[Any] = None,
+        priorities: Optional[List[str]] = None,
+    ) -> None:
+        ...
+
+    def depth(self) -> int:
+        # Jobs waiting across every priority lane.
         ...
 
 
@@ -37,10 +100,70 @@ class PipelineExecutorContract(Protocol):
         enabled: Optional[list[str]] = None,
         order: Optional[list[str]] = None,
         parallel_groups: Optional[list[list[str]]] = None,
+        execution_modes: Optional[Dict[str, str]] = None,
+        checkpoint: Optional["StageCheckpointContract"] = None,
+        cancellation: Optional[CancellationToken] = None,
+        timeouts: Optional[Dict[str, float]] = None,
     ) -> Dict[str, Any]:
         ...
 
 
+class StageResultCacheContract(Protocol):
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    def put(self, key: str, value: Any) -> bool:
+        ...
+
+
+class StageCheckpointContract(Protocol):
+    # Per-job stage outputs that let a retried job resume instead of starting over.
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        ...
+
+    def put(self, stage: str, key: str, value: Any) -> bool:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+
+class StageMetricsContract(Protocol):
+    def record(self, stage_metrics: Dict[str, Dict[str, Any]]) -> None:
+        ...
+
+    def render(self) -> str:
+        # Prometheus text format.
+        ...
+
+
+class AdmissionStoreContract(Protocol):
+    # Shared state behind admission control: bytes waiting to run, recent processing
+    # rates and each client's in-flight jobs.
+    def backlog_bytes(self) -> int:
+        ...
+
+    def add_queued(self, job_id: str, size: int) -> None:
+        ...
+
+    def remove_queued(self, job_id: str) -> None:
+        ...
+
+    def record_processed(self, size: int, seconds: float) -> None:
+        ...
+
+    def seconds_per_byte(self) -> Optional[float]:
+        # None until a job has been recorded.
+        ...
+
+    def acquire_client_slot(self, client_id: str, job_id: str, limit: int) -> bool:
+        # Adds job_id to the client's in-flight set unless that would exceed limit.
+        ...
+
+    def release_client_slot(self, client_id: str, job_id: str) -> None:
+        ...
+
+
 class CompletionNotifierContract(Protocol):
     def notify(self, callback_url: Optional[str], job_id: str, payload: Dict[str, Any]) -> None:
         ...
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd is offered only when installed
+    zstandard = None  # type: ignore[assignment]
+
+ENCODING_SUFFIXES: Dict[str, str] = {
+    "zstd": ".zst",
+    "gzip": ".gz",
+}
+
+# Parquet is already compressed internally; another pass costs CPU and saves nothing.
+COMPRESSIBLE_FORMATS = {"csv", "arrow"}
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def available_encodings() -> List[str]:
+    # In server preference order: zstd is smaller and faster to decode than gzip.
+    return [encoding for encoding in ENCODING_SUFFIXES if encoding != "zstd" or zstandard is not None]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    # The client's q-values win; the server's order breaks ties. None means identity.
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding.lower()] = quality
+
+    candidates: List[Tuple[float, int, str]] = []
+    for position, encoding in enumerate(available_encodings()):
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > 0:
+            candidates.append((-quality, position, encoding))
+    return min(candidates)[2] if candidates else None
+
+
+def encoded_path_for(path: str, encoding: str) -> str:
+    return f"{path}{ENCODING_SUFFIXES[encoding]}"
+
+
+def compress_output(path: str, encoding: str) -> str:
+    # Compressed once, next to the original, and reused while it is newer than it.
+    target = encoded_path_for(path, encoding)
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(path):
+            return target
+    except FileNotFoundError:
+        pass
+
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(path, "rb") as source, open(tmp_path, "wb") as raw:
+            if encoding == "gzip":
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as sink:
+                    shutil.copyfileobj(source, sink, COPY_CHUNK_BYTES)
+            else:
+                zstandard.ZstdCompressor(level=10).copy_stream(source, raw, read_size=COPY_CHUNK_BYTES)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return target
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import importlib.util
+import io
+import logging
+import zipfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from xml.etree import ElementTree
+
+import pandas as pd
+
+try:
+    from xlsx2csv import Xlsx2csv
+except ImportError:  # pragma: no cover - offered only when installed
+    Xlsx2csv = None  # type: ignore[assignment,misc]
+
+logger = logging.getLogger(__name__)
+
+Sheet = Union[str, int]
+
+# Always usable, so it ends every preference list: openpyxl for .xlsx, xlrd for .xls.
+FALLBACK_READER = "pandas"
+DEFAULT_READERS: Tuple[str, ...] = ("calamine", FALLBACK_READER)
+
+STREAMABLE_EXCEL_SUFFIXES = {".xlsx", ".xlsm"}
+
+
+class UnknownReaderError(ValueError):
+    pass
+
+
+def column_names(header: Iterable[Any]) -> List[str]:
+    # Same naming pandas uses for blank header cells, and for repeated ones: a, a.1, a.2,
+    # skipping any suffix another header already took.
+    names: List[str] = []
+    counts: Dict[str, int] = {}
+    for i, value in enumerate(header):
+        name = str(value) if value is not None else f"Unnamed: {i}"
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        names.append(name)
+        counts[name] = count + 1
+    return names
+
+
+def conform_dtypes(df: pd.DataFrame, dtypes: pd.Series) -> pd.DataFrame:
+    # Casts each column to the dtype it had in the first batch when no value changes:
+    # an all-empty column, or whole numbers in a float column, read back the way a
+    # whole-sheet read types them. Anything else keeps the type inferred for this batch.
+    for column, dtype in dtypes.items():
+        original = df[column]
+        if original.dtype == dtype:
+            continue
+        try:
+            cast = original.astype(dtype)
+        except (TypeError, ValueError):
+            continue
+        present = original.notna()
+        if not cast.notna().equals(present):
+            continue
+        if (cast[present].astype(object).to_numpy() == original[present].astype(object).to_numpy()).all():
+            df[column] = cast
+    return df
+
+
+def sheet_names(path: str) -> List[str]:
+    # In workbook order, which is how every reader numbers sheets. For .xlsx/.xlsm only
+    # the small workbook part is parsed, not a single cell; other formats open the file.
+    if Path(path).suffix.lower() in STREAMABLE_EXCEL_SUFFIXES:
+        try:
+            with zipfile.ZipFile(path) as archive:
+                root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+            # Matched on the local name: transitional and strict files differ in namespace.
+            return [element.get("name", "") for element in root.iter() if element.tag.rpartition("}")[2] == "sheet"]
+        except (KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+            pass
+    with pd.ExcelFile(path) as workbook:
+        return [str(name) for name in workbook.sheet_names]
+
+
+def iter_openpyxl_batches(path: str, sheet: Sheet, batch_size: int) -> Iterator[pd.DataFrame]:
+    # Read-only openpyxl walks the sheet XML row by row, so memory is one batch.
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = column_names(header)
+        dtypes: Optional[pd.Series] = None
+
+        def frame(batch: List[Any]) -> pd.DataFrame:
+            # Every batch is typed on its own rows; later ones follow the first where they can.
+            nonlocal dtypes
+            df = pd.DataFrame.from_records(batch, columns=columns)
+            if dtypes is None:
+                dtypes = df.dtypes
+                return df
+            return conform_dtypes(df, dtypes)
+
+        batch: List[Any] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield frame(batch)
+                batch = []
+        if batch:
+            yield frame(batch)
+    finally:
+        workbook.close()
+
+
+def _read_calamine(path: str, sheet: Sheet) -> pd.DataFrame:
+    return pd.read_excel(path, sheet_name=sheet, engine="calamine")
+
+
+def _read_openpyxl_stream(path: str, sheet: Sheet) -> pd.DataFrame:
+    batches = list(iter_openpyxl_batches(path, sheet, 65536))
+    if not batches:
+        return pd.DataFrame()
+    return pd.concat(batches, ignore_index=True, copy=False) if len(batches) > 1 else batches[0]
+
+
+def _read_xlsx2csv(path: str, sheet: Sheet) -> pd.DataFrame:
+    # Converts the sheet XML straight to CSV text and lets the CSV parser infer types;
+    # dates come back as ISO strings rather than datetimes.
+    converter = Xlsx2csv(path, outputencoding="utf-8", dateformat="%Y-%m-%dT%H:%M:%S")
+    buffer = io.StringIO()
+    if isinstance(sheet, str):
+        converter.convert(buffer, sheetname=sheet)
+    else:
+        converter.convert(buffer, sheetid=sheet + 1)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
+
+
+def _read_pandas(path: str, sheet: Sheet) -> pd.DataFrame:
+    return pd.read_excel(path, sheet_name=sheet)
+
+
+# name -> (reader, suffixes it handles or None for any, whether it is installed)
+READERS: Dict[str, Tuple[Callable[[str, Sheet], pd.DataFrame], Optional[Set[str]], Callable[[], bool]]] = {
+    "calamine": (
+        _read_calamine,
+        {".xlsx", ".xlsm", ".xlsb", ".xls", ".ods"},
+        lambda: importlib.util.find_spec("python_calamine") is not None,
+    ),
+    "openpyxl_stream": (_read_openpyxl_stream, STREAMABLE_EXCEL_SUFFIXES, lambda: True),
+    "xlsx2csv": (_read_xlsx2csv, STREAMABLE_EXCEL_SUFFIXES, lambda: Xlsx2csv is not None),
+    FALLBACK_READER: (_read_pandas, None, lambda: True),
+}
+
+
+def parse_readers(spec: str) -> Tuple[str, ...]:
+    names = tuple(filter(None, (part.strip().lower() for part in spec.split(","))))
+    unknown = [name for name in names if name not in READERS]
+    if unknown:
+        raise UnknownReaderError(f"Unknown Excel reader(s): {', '.join(unknown)}")
+    return names or DEFAULT_READERS
+
+
+def available_readers() -> List[str]:
+    return [name for name, (_, _, installed) in READERS.items() if installed()]
+
+
+def readers_for(path: str, preference: Sequence[str] = DEFAULT_READERS) -> List[str]:
+    suffix = Path(path).suffix.lower()
+    candidates = []
+    for name in dict.fromkeys([*preference, FALLBACK_READER]):
+        _, suffixes, installed = READERS[name]
+        if installed() and (suffixes is None or suffix in suffixes):
+            candidates.append(name)
+    return candidates
+
+
+def read_excel(path: str, sheet: Sheet = 0, preference: Sequence[str] = DEFAULT_READERS) -> pd.DataFrame:
+    # The first installed reader that handles the file's format parses it. If it raises,
+    # the next one gets a go, so one engine's quirk does not fail the job.
+    candidates = readers_for(path, preference)
+    for position, name in enumerate(candidates):
+        try:
+            return READERS[name][0](path, sheet)
+        except Exception:
+            if position == len(candidates) - 1:
+                raise
+            logger.warning("Excel reader %s failed on %s; falling back", name, path, exc_info=True)
+    raise AssertionError("unreachable: the pandas reader is always a candidate")
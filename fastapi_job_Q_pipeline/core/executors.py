@@ -2,7 +2,10 @@ from __future__ import annotations
 
 from typing import Any, Dict, Optional
 
+from core.cancellation import CancellationToken
+from core.contracts import StageCheckpointContract, StageResultCacheContract
 from core.interfaces import Stage
+from core.partitioning import DEFAULT_MIN_PARTITION_ROWS
 from core.pipeline import Pipeline
 from core.stages import Stage1LoadAndNormalize, Stage2CpuTransform, Stage3WriteOutput
 
@@ -16,9 +19,26 @@ def default_stages() -> Dict[str, Stage]:
 
 
 class PipelineExecutor:
-    def __init__(self, stages: Optional[Dict[str, Stage]] = None) -> None:
+    def __init__(
+        self,
+        stages: Optional[Dict[str, Stage]] = None,
+        max_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        result_cache: Optional[StageResultCacheContract] = None,
+        overrun: str = "kill",
+        default_timeout: Optional[float] = None,
+        min_partition_rows: Optional[int] = DEFAULT_MIN_PARTITION_ROWS,
+    ) -> None:
         stages = stages or default_stages()
-        self.pipeline = Pipeline(stages)
+        self.pipeline = Pipeline(
+            stages,
+            max_workers=max_workers,
+            process_workers=process_workers,
+            result_cache=result_cache,
+            overrun=overrun,
+            default_timeout=default_timeout,
+            min_partition_rows=min_partition_rows,
+        )
 
     def run(
         self,
@@ -26,7 +46,16 @@ class PipelineExecutor:
         enabled: Optional[list[str]] = None,
         order: Optional[list[str]] = None,
         parallel_groups: Optional[list[list[str]]] = None,
+        execution_modes: Optional[Dict[str, str]] = None,
+        checkpoint: Optional[StageCheckpointContract] = None,
+        cancellation: Optional[CancellationToken] = None,
+        timeouts: Optional[Dict[str, float]] = None,
     ) -> Dict[str, Any]:
         if enabled is None:
             enabled = list(self.pipeline.stages.keys())
-        return self.pipeline.run(context, enabled, order, parallel_groups)
+        return self.pipeline.run(
+            context, enabled, order, parallel_groups, execution_modes, checkpoint, cancellation, timeouts
+        )
+
+    def close(self) -> None:
+        self.pipeline.close()
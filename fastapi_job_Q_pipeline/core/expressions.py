@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import ast
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+Evaluator = Callable[[pd.DataFrame], Any]
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+# Plain Python ints and strings grow without bound, so arithmetic that can produce them
+# is capped before it runs: on scalars, on text columns, and on object columns, which
+# hold Python ints rather than numpy's fixed-width ones.
+MAX_INT_BITS = 4096
+MAX_STRING_LENGTH = 100_000
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_text(value: Any) -> bool:
+    if isinstance(value, pd.Series):
+        return not pd.api.types.is_numeric_dtype(value) and value.map(lambda item: isinstance(item, str)).any()
+    return isinstance(value, str)
+
+
+def _numeric(value: Any) -> Any:
+    # Object columns become numpy numbers (or floats, past int64) before they are raised
+    # to a power; text in them fails here rather than as a Python bigint loop.
+    if isinstance(value, pd.Series) and value.dtype == object:
+        return pd.to_numeric(value)
+    return value
+
+
+def _power(base: Any, exponent: Any) -> Any:
+    if _is_int(base) and _is_int(exponent) and exponent > 0 and abs(base) > 1:
+        if base.bit_length() * exponent > MAX_INT_BITS:
+            raise ExpressionError(f"Integer power exceeds {MAX_INT_BITS} bits")
+    return operator.pow(_numeric(base), _numeric(exponent))
+
+
+def _repeated_length(text: Any, count: Any) -> Any:
+    lengths = text.map(lambda item: len(item) if isinstance(item, str) else 0) if isinstance(text, pd.Series) else len(text)
+    if isinstance(count, pd.Series):
+        count = pd.to_numeric(count, errors="coerce")
+    elif not _is_int(count):
+        return 0
+    # Floats, so a huge count cannot wrap around int64 and slip under the cap.
+    return np.asarray(lengths, dtype="float64") * np.asarray(count, dtype="float64")
+
+
+def _multiply(left: Any, right: Any) -> Any:
+    if _is_int(left) and _is_int(right):
+        if left.bit_length() + right.bit_length() > MAX_INT_BITS:
+            raise ExpressionError(f"Integer product exceeds {MAX_INT_BITS} bits")
+    for text, count in ((left, right), (right, left)):
+        if _is_text(text) and np.nanmax(np.append(_repeated_length(text, count), 0)) > MAX_STRING_LENGTH:
+            # Checked per row: one row with a huge count would exhaust memory.
+            raise ExpressionError(f"Repeated string exceeds {MAX_STRING_LENGTH} characters")
+    return operator.mul(left, right)
+
+
+_BINARY_OPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _multiply,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _power,
+}
+
+_COMPARE_OPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+
+def _series(value: Any, df: pd.DataFrame) -> pd.Series:
+    if isinstance(value, pd.Series):
+        return value
+    return pd.Series(value, index=df.index)
+
+
+def _isin(left: Any, members: List[Any]) -> Any:
+    if isinstance(left, pd.Series):
+        return left.isin(members)
+    return left in members
+
+
+def _not_isin(left: Any, members: List[Any]) -> Any:
+    if isinstance(left, pd.Series):
+        return ~left.isin(members)
+    return left not in members
+
+
+def _logical_not(value: Any) -> Any:
+    if isinstance(value, pd.Series):
+        return ~value.astype(bool)
+    return not value
+
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, pd.Series):
+        return np.trunc(pd.to_numeric(value, errors="coerce")).astype("Int64")
+    return int(value)
+
+
+def _to_float(value: Any) -> Any:
+    if isinstance(value, pd.Series):
+        return pd.to_numeric(value, errors="coerce").astype("float64")
+    return float(value)
+
+
+def _to_str(value: Any) -> Any:
+    if isinstance(value, pd.Series):
+        return value.astype("string")
+    return str(value)
+
+
+def _to_bool(value: Any) -> Any:
+    if isinstance(value, pd.Series):
+        return value.astype(bool)
+    return bool(value)
+
+
+def _str_method(method: str) -> Callable[..., Any]:
+    def apply(df: pd.DataFrame, value: Any, *args: Any) -> Any:
+        return getattr(_series(value, df).astype("string").str, method)(*args)
+
+    return apply
+
+
+def _concat(df: pd.DataFrame, *values: Any) -> pd.Series:
+    result = _series(values[0], df).astype("string")
+    for value in values[1:]:
+        result = result + _series(value, df).astype("string")
+    return result
+
+
+def _coalesce(df: pd.DataFrame, *values: Any) -> pd.Series:
+    result = _series(values[0], df)
+    for value in values[1:]:
+        result = result.fillna(value)
+    return result
+
+
+def _least(df: pd.DataFrame, *values: Any) -> pd.Series:
+    return pd.concat([_series(value, df) for value in values], axis=1).min(axis=1)
+
+
+def _greatest(df: pd.DataFrame, *values: Any) -> pd.Series:
+    return pd.concat([_series(value, df) for value in values], axis=1).max(axis=1)
+
+
+# name -> (min args, max args, implementation taking the frame first)
+_FUNCTIONS: Dict[str, Tuple[int, int, Callable[..., Any]]] = {
+    "int": (1, 1, lambda df, value: _to_int(value)),
+    "float": (1, 1, lambda df, value: _to_float(value)),
+    "str": (1, 1, lambda df, value: _to_str(value)),
+    "bool": (1, 1, lambda df, value: _to_bool(value)),
+    "abs": (1, 1, lambda df, value: abs(value)),
+    "round": (1, 2, lambda df, value, digits=0: _series(value, df).round(digits)),
+    "isnull": (1, 1, lambda df, value: _series(value, df).isna()),
+    "coalesce": (2, 16, _coalesce),
+    "least": (2, 16, _least),
+    "greatest": (2, 16, _greatest),
+    "upper": (1, 1, _str_method("upper")),
+    "lower": (1, 1, _str_method("lower")),
+    "strip": (1, 1, _str_method("strip")),
+    "len": (1, 1, _str_method("len")),
+    "contains": (2, 2, lambda df, value, pattern: _str_method("contains")(df, value, pattern, False)),
+    "startswith": (2, 2, _str_method("startswith")),
+    "endswith": (2, 2, _str_method("endswith")),
+    "replace": (3, 3, lambda df, value, old, new: _str_method("replace")(df, value, old, new, -1, True, None, False)),
+    "substr": (2, 3, lambda df, value, start, stop=None: _str_method("slice")(df, value, start, stop)),
+    "concat": (2, 16, _concat),
+}
+
+
+class _Compiler:
+    # Sub-expressions without column references are folded here, through the capped
+    # operators, so an oversized constant fails validation instead of a worker.
+    def __init__(self, source: str):
+        self.source = source
+        self.constants: Dict[int, Any] = {}
+
+    def constant(self, node: ast.AST, value: Any) -> Evaluator:
+        self.constants[id(node)] = value
+        return lambda df: value
+
+    def is_constant(self, node: ast.AST) -> bool:
+        return id(node) in self.constants
+
+    def fail(self, node: ast.AST, message: str) -> ExpressionError:
+        return ExpressionError(f"{message} in expression {self.source!r} (column {getattr(node, 'col_offset', 0)})")
+
+    def compile(self, node: ast.AST) -> Evaluator:
+        handler = getattr(self, f"visit_{type(node).__name__}", None)
+        if handler is None:
+            raise self.fail(node, f"Unsupported syntax '{type(node).__name__}'")
+        return handler(node)
+
+    def visit_Expression(self, node: ast.Expression) -> Evaluator:
+        return self.compile(node.body)
+
+    def visit_Constant(self, node: ast.Constant) -> Evaluator:
+        if not isinstance(node.value, (int, float, str, bool, type(None))):
+            raise self.fail(node, "Unsupported literal")
+        return self.constant(node, node.value)
+
+    def visit_Name(self, node: ast.Name) -> Evaluator:
+        column = node.id
+        return lambda df: df[column]
+
+    def visit_BinOp(self, node: ast.BinOp) -> Evaluator:
+        op = _BINARY_OPS.get(type(node.op))
+        if op is None:
+            raise self.fail(node, f"Unsupported operator '{type(node.op).__name__}'")
+        left, right = self.compile(node.left), self.compile(node.right)
+        if self.is_constant(node.left) and self.is_constant(node.right):
+            try:
+                value = op(self.constants[id(node.left)], self.constants[id(node.right)])
+            except ExpressionError as exc:
+                raise self.fail(node, str(exc)) from exc
+            except (ArithmeticError, TypeError, ValueError) as exc:
+                raise self.fail(node, f"Invalid constant arithmetic ({exc})") from exc
+            return self.constant(node, value)
+        return lambda df: op(left(df), right(df))
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> Evaluator:
+        operand = self.compile(node.operand)
+        if self.is_constant(node.operand) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = self.constants[id(node.operand)]
+            if not isinstance(value, (int, float)):
+                raise self.fail(node, "Unary sign on a non-number")
+            return self.constant(node, -value if isinstance(node.op, ast.USub) else value)
+        if isinstance(node.op, ast.USub):
+            return lambda df: -operand(df)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        if isinstance(node.op, ast.Not):
+            return lambda df: _logical_not(operand(df))
+        raise self.fail(node, f"Unsupported operator '{type(node.op).__name__}'")
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> Evaluator:
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        values = [self.compile(value) for value in node.values]
+
+        def evaluate(df: pd.DataFrame) -> Any:
+            result = values[0](df)
+            for value in values[1:]:
+                result = combine(result, value(df))
+            return result
+
+        return evaluate
+
+    def visit_Compare(self, node: ast.Compare) -> Evaluator:
+        operands = [self.compile(node.left)]
+        checks: List[Callable[[Any, Any], Any]] = []
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(right, (ast.List, ast.Tuple)):
+                    raise self.fail(node, "'in' needs a literal list")
+                try:
+                    members = [ast.literal_eval(element) for element in right.elts]
+                except ValueError as exc:
+                    raise self.fail(node, "'in' list must hold literals") from exc
+                operands.append(lambda df, members=members: members)
+                checks.append(_not_isin if isinstance(op, ast.NotIn) else _isin)
+                continue
+            compare = _COMPARE_OPS.get(type(op))
+            if compare is None:
+                raise self.fail(node, f"Unsupported comparison '{type(op).__name__}'")
+            operands.append(self.compile(right))
+            checks.append(compare)
+
+        def evaluate(df: pd.DataFrame) -> Any:
+            values = [operand(df) for operand in operands]
+            result = checks[0](values[0], values[1])
+            for i in range(1, len(checks)):
+                result = result & checks[i](values[i], values[i + 1])
+            return result
+
+        return evaluate
+
+    def visit_IfExp(self, node: ast.IfExp) -> Evaluator:
+        condition, then, otherwise = self.compile(node.test), self.compile(node.body), self.compile(node.orelse)
+
+        def evaluate(df: pd.DataFrame) -> Any:
+            mask = _series(condition(df), df).fillna(False).astype(bool)
+            return _series(then(df), df).where(mask, _series(otherwise(df), df))
+
+        return evaluate
+
+    def visit_Call(self, node: ast.Call) -> Evaluator:
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise self.fail(node, "Only plain function calls are supported")
+        name = node.func.id
+        if name == "col":
+            if len(node.args) != 1 or not isinstance(node.args[0], ast.Constant) or not isinstance(node.args[0].value, str):
+                raise self.fail(node, "col() takes one column name literal")
+            column = node.args[0].value
+            return lambda df: df[column]
+
+        spec = _FUNCTIONS.get(name)
+        if spec is None:
+            raise self.fail(node, f"Unknown function '{name}'")
+        min_args, max_args, function = spec
+        if not min_args <= len(node.args) <= max_args:
+            raise self.fail(node, f"{name}() takes {min_args} to {max_args} arguments")
+        args = [self.compile(arg) for arg in node.args]
+        return lambda df: function(df, *(arg(df) for arg in args))
+
+
+def compile_expression(source: str) -> Evaluator:
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as exc:
+        raise ExpressionError(f"Invalid expression {source!r}: {exc.msg}") from exc
+    return _Compiler(source).compile(tree)
+
+
+@lru_cache(maxsize=256)
+def compile_transforms(transforms: Tuple[Tuple[str, str], ...]) -> Tuple[Tuple[str, Evaluator], ...]:
+    return tuple((column, compile_expression(expression)) for column, expression in transforms)
+
+
+def apply_transforms(df: pd.DataFrame, transforms: Sequence[Dict[str, str]]) -> pd.DataFrame:
+    # Each expression runs once over whole columns; later ones can use earlier outputs.
+    compiled = compile_transforms(tuple((item["column"], item["expression"]) for item in transforms))
+    for column, evaluate in compiled:
+        try:
+            df[column] = evaluate(df)
+        except KeyError as exc:
+            raise ExpressionError(f"Unknown column {exc.args[0]!r} in transform for '{column}'") from exc
+        except ExpressionError:
+            raise
+        except (ArithmeticError, TypeError, ValueError) as exc:
+            # Type mismatches only show up against the data, e.g. text ** 2.
+            raise ExpressionError(f"Transform for '{column}' failed ({exc})") from exc
+    return df
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import os
+import uuid
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+DEFAULT_OUTPUT_FORMAT = "csv"
+
+OUTPUT_SUFFIXES: Dict[str, str] = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+MEDIA_TYPES: Dict[str, str] = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+# Accepted spellings of each format in an Accept header.
+MEDIA_TYPE_ALIASES: Dict[str, str] = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/x-arrow": "arrow",
+}
+
+
+class OutputFormatError(ValueError):
+    pass
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in OUTPUT_SUFFIXES:
+        raise OutputFormatError(f"Unknown output format '{fmt}'")
+    return fmt
+
+
+def output_path_for(path: str, fmt: str) -> str:
+    return str(Path(path).with_suffix(OUTPUT_SUFFIXES[check_format(fmt)]))
+
+
+def _arrow_table(df: pd.DataFrame, schema: Any = None) -> Any:
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _widen_type(current: Any, new: Any) -> Any:
+    import pyarrow as pa
+
+    if current.equals(new):
+        return current
+    try:
+        # null -> anything, int -> float and the like.
+        return pa.unify_schemas(
+            [pa.schema([("value", current)]), pa.schema([("value", new)])], promote_options="permissive"
+        ).field("value").type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, NotImplementedError):
+        # Numbers in one chunk and text in another: the column is kept as text.
+        return pa.string()
+
+
+class _ColumnarChunkWriter:
+    # Parquet and Arrow files fix their schema when opened, but chunks of one sheet can
+    # disagree: a column empty so far turns up filled, an int column meets a NaN. Such
+    # a chunk widens the schema and what was already written is copied over into a new
+    # file under it, batch by batch; later chunks are cast to the widened schema.
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self.schema: Any = None
+        self._writer: Any = None
+        self._sink: Any = None
+
+    def _open(self, schema: Any) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = schema
+        if self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(self.path, schema)
+        else:
+            self._sink = pa.OSFile(self.path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def _batches(self, path: str) -> Iterable[Any]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.fmt == "parquet":
+            yield from pq.ParquetFile(path).iter_batches()
+            return
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index)
+
+    def _reopen(self, schema: Any) -> None:
+        import pyarrow as pa
+
+        self.close()
+        previous = f"{self.path}.{uuid.uuid4().hex}.prev"
+        os.replace(self.path, previous)
+        try:
+            self._open(schema)
+            for batch in self._batches(previous):
+                self._writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+        finally:
+            os.remove(previous)
+
+    def write(self, table: Any) -> None:
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._open(table.schema)
+        elif not table.schema.equals(self.schema, check_metadata=False):
+            if table.schema.names != self.schema.names:
+                raise OutputFormatError(f"Chunk columns {table.schema.names} differ from {self.schema.names}")
+            types = [_widen_type(field.type, other.type) for field, other in zip(self.schema, table.schema)]
+            if any(not new.equals(field.type) for new, field in zip(types, self.schema)):
+                # The first chunk's pandas metadata would describe the old types.
+                self._reopen(pa.schema([field.with_type(new) for field, new in zip(self.schema, types)]))
+            table = table.cast(self.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    @property
+    def opened(self) -> bool:
+        return self.schema is not None
+
+
+def write_chunks(chunks: Iterable[pd.DataFrame], path: str, fmt: str) -> None:
+    # One pass over the chunks; the columnar writers widen their schema as needed.
+    check_format(fmt)
+    if fmt == "csv":
+        with open(path, "w", newline="") as f:
+            header = True
+            for chunk in chunks:
+                chunk.to_csv(f, index=False, header=header)
+                header = False
+        return
+
+    writer = _ColumnarChunkWriter(path, fmt)
+    try:
+        for chunk in chunks:
+            writer.write(_arrow_table(chunk))
+    finally:
+        writer.close()
+    if not writer.opened:
+        write_frame(pd.DataFrame(), path, fmt)
+
+
+def write_frame(df: pd.DataFrame, path: str, fmt: str) -> None:
+    check_format(fmt)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        import pyarrow as pa
+
+        table = _arrow_table(df)
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_frame(path: str, fmt: str) -> pd.DataFrame:
+    check_format(fmt)
+    if fmt == "csv":
+        return pd.read_csv(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def convert_output(path: str, fmt: str, target_fmt: str) -> str:
+    # Lazy: converted once on first request, then served from disk next to the original.
+    if target_fmt == fmt:
+        return path
+    target = output_path_for(path, target_fmt)
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(path):
+            return target
+    except FileNotFoundError:
+        pass
+
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        write_frame(read_frame(path, fmt), tmp_path, target_fmt)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return target
+
+
+def negotiate_format(accept: Optional[str]) -> Optional[str]:
+    # Highest q-value wins, ties keep header order. None means any format will do
+    # (no header or */*), so the caller serves whatever was stored.
+    if not accept:
+        return None
+    candidates = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type.lower()))
+
+    for _, _, media_type in sorted(candidates):
+        if media_type == "*/*" or not media_type:
+            return None
+        if media_type in MEDIA_TYPE_ALIASES:
+            return MEDIA_TYPE_ALIASES[media_type]
+    raise OutputFormatError(f"None of the accepted types is supported: {accept}")
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import shutil
+import zipfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from core import transport
+from core.cancellation import CancellationToken
+from core.excel_readers import DEFAULT_READERS, read_excel, sheet_names
+from core.process_pool import in_pool_worker, shared_process_pool
+
+INGEST_MODES = ("first_sheet", "all_sheets")
+EXCEL_SUFFIXES = {".xlsx", ".xlsm", ".xls"}
+ARCHIVE_SUFFIXES = {".zip"}
+
+SOURCE_FILE_COLUMN = "_source_file"
+SOURCE_SHEET_COLUMN = "_source_sheet"
+
+# (label, workbook path, sheet name or 0 for the first sheet)
+Source = Tuple[str, str, Union[str, int]]
+
+
+def is_archive(input_path: str) -> bool:
+    return Path(input_path).suffix.lower() in ARCHIVE_SUFFIXES
+
+
+def extract_workbooks(archive_path: str, target_dir: str) -> List[Tuple[str, str]]:
+    # Returns (name inside the archive, extracted path) for every workbook, in archive
+    # order. Members are written under generated names, so no entry can escape target_dir.
+    workbooks = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for index, info in enumerate(archive.infolist()):
+            suffix = Path(info.filename).suffix.lower()
+            if info.is_dir() or suffix not in EXCEL_SUFFIXES or Path(info.filename).name.startswith("~$"):
+                continue
+            target = Path(target_dir) / f"{index:05d}{suffix}"
+            with archive.open(info) as member, target.open("wb") as out:
+                shutil.copyfileobj(member, out, 1024 * 1024)
+            workbooks.append((info.filename, str(target)))
+    return workbooks
+
+
+def list_sources(workbooks: List[Tuple[str, str]], mode: str) -> List[Source]:
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Unknown ingest mode '{mode}'")
+    sources: List[Source] = []
+    for label, path in workbooks:
+        if mode == "first_sheet":
+            sources.append((label, path, 0))
+            continue
+        sources.extend((label, path, sheet) for sheet in sheet_names(path))
+    return sources
+
+
+def _resolve_sheet(path: str, sheet: Union[str, int]) -> str:
+    return sheet if isinstance(sheet, str) else sheet_names(path)[sheet]
+
+
+def _read_sheet(path: str, sheet: Union[str, int], readers: Sequence[str]) -> Tuple[transport.SharedPayload, str]:
+    # Runs in a pool worker; the frame comes back through shared memory, not a pickle,
+    # along with the sheet's name so the parent never reopens the workbook for it.
+    return transport.pack(read_excel(path, sheet, readers)), _resolve_sheet(path, sheet)
+
+
+def read_sources(
+    sources: List[Source],
+    readers: Sequence[str] = DEFAULT_READERS,
+    cancellation: Optional[CancellationToken] = None,
+) -> List[Tuple[pd.DataFrame, str]]:
+    # (frame, sheet name) per source. Sheets are parsed concurrently on the shared
+    # process pool, one task each. Inside a pool worker (stage1 run in "process" mode)
+    # there is no pool to use: read in turn.
+    if len(sources) <= 1 or in_pool_worker():
+        return [(read_excel(path, sheet, readers), _resolve_sheet(path, sheet)) for _, path, sheet in sources]
+
+    pool = shared_process_pool()
+    futures = [pool.submit(_read_sheet, path, sheet, tuple(readers)) for _, path, sheet in sources]
+    read = []
+    try:
+        for future in futures:
+            if cancellation is not None:
+                cancellation.check()
+            payload, name = future.result()
+            try:
+                read.append((transport.unpack(payload), name))
+            finally:
+                transport.release(payload)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return read
+
+
+def combine(read: List[Tuple[pd.DataFrame, str]], sources: List[Source], tag_file: bool) -> pd.DataFrame:
+    # One concat, then the source tags as categoricals built straight from per-frame
+    # lengths, so no frame is copied just to label its rows.
+    frames = [frame for frame, _ in read]
+    df = pd.concat(frames, ignore_index=True, copy=False) if len(frames) > 1 else frames[0]
+    lengths = [len(frame) for frame in frames]
+    if tag_file:
+        labels = [label for label, _, _ in sources]
+        df[SOURCE_FILE_COLUMN] = _tag(labels, lengths, _categories(labels))
+    names = [name for _, name in read]
+    df[SOURCE_SHEET_COLUMN] = _tag(names, lengths, _categories(names))
+    return df
+
+
+def _categories(labels: List[str]) -> List[str]:
+    return list(dict.fromkeys(labels))
+
+
+def _tag(labels: List[str], lengths: List[int], categories: List[str]) -> pd.Categorical:
+    codes = np.repeat([categories.index(label) for label in labels], lengths)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def iter_source_chunks(
+    sources: List[Source], tag_file: bool, read_chunks: Any
+) -> Iterator[pd.DataFrame]:
+    # Streaming keeps memory to one chunk, so sources are read one after another. The
+    # tags are the same categoricals as combine() builds, with every source's label
+    # as categories up front, so each chunk has one dtype and matches a whole read.
+    labels = [label for label, _, _ in sources]
+    names = [_resolve_sheet(path, sheet) for _, path, sheet in sources]
+    file_categories, sheet_categories = _categories(labels), _categories(names)
+    for (label, path, sheet), name in zip(sources, names):
+        for chunk in read_chunks(path, sheet):
+            if tag_file:
+                chunk[SOURCE_FILE_COLUMN] = _tag([label], [len(chunk)], file_categories)
+            chunk[SOURCE_SHEET_COLUMN] = _tag([name], [len(chunk)], sheet_categories)
+            yield chunk
@@ -1,13 +1,45 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from typing import Any, Dict, List
 
+EXECUTION_MODES = ("thread", "process", "inline")
+
 
 class Stage(ABC):
     name: str
     depends_on: List[str]
+    # "thread": shared stage thread pool, "process": warm process pool (results cross
+    # through shared memory), "inline": the scheduler thread itself.
+    execution_mode: str = "thread"
+    # Bump version whenever the output for the same input changes; stages with side
+    # effects opt out of the stage result cache.
+    version: str = "1"
+    cacheable: bool = True
 
     @abstractmethod
     def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
         raise NotImplementedError
+
+    def cache_key_parts(self, context: Dict[str, Any]) -> Any:
+        # Context values that change this stage's output, folded into its cache key.
+        return None
+
+
+class RowWiseStage(Stage):
+    # Transforms each frame independently of any other rows, so it can consume a
+    # streamed input (an iterator of DataFrame chunks) one chunk at a time.
+    # Partitionable stages also have a large DataFrame input split into row ranges that
+    # are transformed in parallel on the process pool when they run in "process" mode.
+    partitionable: bool = False
+
+    @abstractmethod
+    def transform(self, df: Any, context: Dict[str, Any]) -> Any:
+        raise NotImplementedError
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        data = results[self.depends_on[0]]
+        if isinstance(data, Iterator):
+            return (self.transform(chunk, context) for chunk in data)
+        return self.transform(data, context)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+# Below this many rows per partition, shipping a partition to a worker costs more
+# than transforming it there saves.
+DEFAULT_MIN_PARTITION_ROWS = 50_000
+
+
+def available_cores() -> int:
+    # The CPUs this process may run on (a container's cpuset), not the whole host.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - macOS and Windows
+        return os.cpu_count() or 1
+
+
+def partition_count(rows: int, workers: Optional[int] = None, min_rows: int = DEFAULT_MIN_PARTITION_ROWS) -> int:
+    # One partition per worker at most, and none smaller than min_rows.
+    workers = workers or available_cores()
+    if rows <= 0 or min_rows <= 0:
+        return 1
+    return max(1, min(workers, rows // min_rows))
+
+
+def split_frame(df: pd.DataFrame, parts: int) -> Iterator[pd.DataFrame]:
+    # Contiguous row ranges of near-equal size, in order. Each is copied so its blocks
+    # are contiguous again and cross to the worker through shared memory out of band.
+    bounds = [len(df) * index // parts for index in range(parts + 1)]
+    for start, stop in zip(bounds, bounds[1:]):
+        yield df.iloc[start:stop].copy()
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    # Partitions keep their original index, so the result lines up with the input.
+    return pd.concat(frames, copy=False)
+
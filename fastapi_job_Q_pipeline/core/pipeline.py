@@ -1,30 +1,372 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
-from core.interfaces import Stage
+import pandas as pd
+
+from core import telemetry, transport
+from core.cancellation import CancellationToken
+from core.contracts import StageCheckpointContract, StageResultCacheContract
+from core.interfaces import EXECUTION_MODES, RowWiseStage, Stage
+from core.partitioning import DEFAULT_MIN_PARTITION_ROWS, concat_frames, partition_count, split_frame
+from core.process_pool import shared_process_pool, terminate_process_pool
+
+OVERRUN_POLICIES = ("kill", "abandon")
+
+# How often the scheduler, and stages waiting on the process pool, look at deadlines
+# and cancellation while a stage runs.
+CANCEL_CHECK_SECONDS = 0.25
 
 
 class PipelineError(Exception):
     pass
 
 
+def _run_in_process(
+    stage: Stage, context: Dict[str, Any], inputs: transport.SharedPayload
+) -> Tuple[transport.SharedPayload, Dict[str, Any]]:
+    cpu_started = time.process_time()
+    rss_started = telemetry.current_rss_bytes()
+    output = transport.pack(stage.run(context, transport.unpack(inputs)))
+    return output, telemetry.process_usage(cpu_started, rss_started)
+
+
+def _transform_in_process(
+    stage: RowWiseStage, context: Dict[str, Any], chunk: transport.SharedPayload
+) -> transport.SharedPayload:
+    return transport.pack(stage.transform(transport.unpack(chunk), context))
+
+
+def _transform_partition(
+    stage: RowWiseStage, context: Dict[str, Any], partition: transport.SharedPayload
+) -> Tuple[transport.SharedPayload, Dict[str, Any]]:
+    cpu_started = time.process_time()
+    rss_started = telemetry.current_rss_bytes()
+    output = transport.pack(stage.transform(transport.unpack(partition), context))
+    return output, telemetry.process_usage(cpu_started, rss_started)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _take(output: transport.SharedPayload) -> Any:
+    try:
+        return transport.unpack(output)
+    finally:
+        transport.release(output)
+
+
+def _release_when_done(future: Future) -> None:
+    # An abandoned pool task still packs its output into shared memory when it ends.
+    if future.cancelled() or future.exception() is not None:
+        return
+    output = future.result()
+    transport.release(output[0] if isinstance(output, tuple) else output)
+
+
+class ExecutionPlan:
+    def __init__(self, graph: Dict[str, Tuple[str, ...]]):
+        self.graph = graph
+        dependents: Dict[str, List[str]] = {name: [] for name in graph}
+        for name, prerequisites in graph.items():
+            for dep in prerequisites:
+                dependents[dep].append(name)
+        self.dependents = {name: tuple(names) for name, names in dependents.items()}
+
+
 class Pipeline:
-    def __init__(self, stages: Dict[str, Stage]):
+    def __init__(
+        self,
+        stages: Dict[str, Stage],
+        max_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        plan_cache_size: int = 128,
+        result_cache: Optional[StageResultCacheContract] = None,
+        overrun: str = "kill",
+        abandon_grace_seconds: float = 30.0,
+        default_timeout: Optional[float] = None,
+        min_partition_rows: Optional[int] = DEFAULT_MIN_PARTITION_ROWS,
+    ):
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy '{overrun}'")
         self.stages = stages
+        self.result_cache = result_cache
+        # What happens to a process stage past its deadline or in a cancelled job:
+        # "kill" terminates the pool's workers (a worker process runs one job at a time,
+        # so nothing else is on them), "abandon" leaves the task to finish unobserved.
+        self.overrun = overrun
+        # How long a stopped run waits for its thread stages to notice before leaving them.
+        self.abandon_grace_seconds = abandon_grace_seconds
+        # Seconds any stage without its own timeout may run; None means no limit.
+        self.default_timeout = default_timeout
+        # Smallest row range a partitionable process stage is split into; None disables it.
+        self.min_partition_rows = min_partition_rows
+        self.max_workers = max_workers
+        self.process_workers = process_workers
+        self.plan_cache_size = plan_cache_size
+        self._plan_cache: "OrderedDict[Tuple[Any, ...], ExecutionPlan]" = OrderedDict()
+        self._plan_hits = 0
+        self._plan_misses = 0
+        self._plan_lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+        self._pool_lock = threading.Lock()
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        # One long-lived pool per pipeline; stages never submit to it themselves,
+        # so sharing it across jobs cannot deadlock.
+        # Threads do not survive fork, so a pipeline built before a prefork worker
+        # forked starts its own pool in the child.
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="pipeline-stage",
+                    )
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=True)
+            self._pool = None
+            self._pool_pid = None
+
+    def _resolve_modes(self, names: List[str], overrides: Optional[Dict[str, str]]) -> Dict[str, str]:
+        overrides = overrides or {}
+        unknown = [name for name in overrides if name not in names]
+        if unknown:
+            raise PipelineError(f"Execution modes given for stages that are not enabled: {unknown}")
+
+        modes = {}
+        for name in names:
+            mode = overrides.get(name) or self.stages[name].execution_mode
+            if mode not in EXECUTION_MODES:
+                raise PipelineError(f"Stage '{name}' has unknown execution mode '{mode}'")
+            modes[name] = mode
+        return modes
+
+    def _resolve_timeouts(self, names: List[str], timeouts: Optional[Dict[str, float]]) -> Dict[str, float]:
+        timeouts = timeouts or {}
+        unknown = [name for name in timeouts if name not in names]
+        if unknown:
+            raise PipelineError(f"Timeouts given for stages that are not enabled: {unknown}")
+        invalid = [name for name, seconds in timeouts.items() if not seconds or seconds <= 0]
+        if invalid:
+            raise PipelineError(f"Timeouts must be positive: {invalid}")
+        if self.default_timeout:
+            return {name: timeouts.get(name, self.default_timeout) for name in names}
+        return dict(timeouts)
+
+    def _await(self, future: Future, token: CancellationToken) -> Any:
+        while True:
+            remaining = token.remaining()
+            slice_seconds = CANCEL_CHECK_SECONDS if remaining is None else min(CANCEL_CHECK_SECONDS, remaining)
+            done, _ = wait([future], timeout=slice_seconds)
+            if done:
+                return future.result()
+            if token.cancelled or token.expired:
+                self._abandon(future)
+                token.check()
+
+    def _abandon(self, future: Future) -> None:
+        if future.cancel():
+            return
+        future.add_done_callback(_release_when_done)
+        if self.overrun == "kill":
+            terminate_process_pool()
+
+    def _collect(self, future: Future, inputs: transport.SharedPayload, token: CancellationToken) -> Any:
+        try:
+            output = self._await(future, token)
+        finally:
+            transport.release(inputs)
+        return _take(output)
+
+    def _run_stage_in_process(
+        self, name: str, context: Dict[str, Any], results: Dict[str, Any], stats: Dict[str, Any]
+    ) -> Any:
+        stage = self.stages[name]
+        inputs = {dep: results[dep] for dep in stage.depends_on}
+        if any(isinstance(value, Iterator) for value in inputs.values()):
+            if not isinstance(stage, RowWiseStage):
+                raise PipelineError(f"Process stage '{name}' cannot consume a streamed input")
+            return self._stream_in_process(stage, context, inputs[stage.depends_on[0]])
+        if isinstance(stage, RowWiseStage) and stage.partitionable and self.min_partition_rows:
+            data = inputs[stage.depends_on[0]]
+            if isinstance(data, pd.DataFrame):
+                parts = partition_count(len(data), self.process_workers, self.min_partition_rows)
+                if parts > 1:
+                    stats["partitions"] = parts
+                    return self._run_partitioned(stage, context, data, parts, stats)
+                # Too small to split: one worker would only add a copy each way, so the
+                # frame is transformed on this stage thread instead.
+                stats["mode"] = "thread"
+                return stage.run(context, results)
+
+        payload = transport.pack(inputs)
+        try:
+            future = shared_process_pool(self.process_workers).submit(_run_in_process, stage, context, payload)
+        except BaseException:
+            transport.release(payload)
+            raise
+        try:
+            output, usage = self._await(future, context["cancellation"])
+        finally:
+            transport.release(payload)
+        stats["child"] = usage
+        return _take(output)
+
+    def _run_partitioned(
+        self, stage: RowWiseStage, context: Dict[str, Any], df: pd.DataFrame, parts: int, stats: Dict[str, Any]
+    ) -> pd.DataFrame:
+        # There are at most as many partitions as pool workers, so all are submitted at
+        # once; results are collected in submission order, which keeps rows in order.
+        token = context["cancellation"]
+        submitted: List[Tuple[Future, transport.SharedPayload]] = []
+        outputs: List[pd.DataFrame] = []
+        usages: List[Dict[str, Any]] = []
+        try:
+            for partition in split_frame(df, parts):
+                payload = transport.pack(partition)
+                try:
+                    future = shared_process_pool(self.process_workers).submit(
+                        _transform_partition, stage, context, payload
+                    )
+                except BaseException:
+                    transport.release(payload)
+                    raise
+                submitted.append((future, payload))
+            for future, payload in submitted:
+                try:
+                    output, usage = self._await(future, token)
+                finally:
+                    transport.release(payload)
+                outputs.append(_take(output))
+                usages.append(usage)
+        finally:
+            for future, payload in submitted[len(outputs):]:
+                if not future.cancel():
+                    future.add_done_callback(_release_when_done)
+                transport.release(payload)
+        # The partitions run side by side, so their growth adds up.
+        deltas = [usage["rss_delta_bytes"] for usage in usages if usage.get("rss_delta_bytes") is not None]
+        stats["child"] = {
+            "cpu_seconds": sum(usage["cpu_seconds"] for usage in usages),
+            "rss_delta_bytes": sum(deltas) if deltas else None,
+        }
+        return concat_frames(outputs)
+
+    def _stream_in_process(
+        self, stage: RowWiseStage, context: Dict[str, Any], chunks: Iterator[Any]
+    ) -> Iterator[Any]:
+        # Chunks stay in order; at most one chunk per pool worker is in flight, which
+        # keeps memory bounded while still using every core.
+        max_in_flight = self.process_workers or os.cpu_count() or 1
+        token = context["cancellation"]
+        in_flight: Deque[Tuple[Future, transport.SharedPayload]] = deque()
+        try:
+            for chunk in chunks:
+                payload = transport.pack(chunk)
+                try:
+                    # Looked up per chunk: a killed pool is replaced by the next call.
+                    pool = shared_process_pool(self.process_workers)
+                    in_flight.append((pool.submit(_transform_in_process, stage, context, payload), payload))
+                except BaseException:
+                    transport.release(payload)
+                    raise
+                if len(in_flight) >= max_in_flight:
+                    yield self._collect(*in_flight.popleft(), token)
+            while in_flight:
+                yield self._collect(*in_flight.popleft(), token)
+        finally:
+            for future, payload in in_flight:
+                if not future.cancel():
+                    future.add_done_callback(_release_when_done)
+                transport.release(payload)
+
+    def _run_stage(
+        self, name: str, mode: str, context: Dict[str, Any], results: Dict[str, Any], stats: Dict[str, Any]
+    ) -> Any:
+        if mode == "process":
+            return self._run_stage_in_process(name, context, results, stats)
+        return self.stages[name].run(context, results)
+
+    def _measure_stage(
+        self, name: str, mode: str, context: Dict[str, Any], results: Dict[str, Any], stats: Dict[str, Any]
+    ) -> Any:
+        # Wall and CPU time cover the stage call only; a streamed output is produced
+        # lazily, so its work shows up in the stage that consumes it.
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        rss_started = telemetry.current_rss_bytes()
+        value = self._run_stage(name, mode, context, results, stats)
+        child = stats.pop("child", {})
+        stats["wall_seconds"] = time.perf_counter() - started
+        stats["cpu_seconds"] = time.thread_time() - cpu_started + child.get("cpu_seconds", 0.0)
+        # Memory is a delta rather than a peak; stages running on other threads at the
+        # same time still show up in it, but no longer a high-water mark from earlier.
+        deltas = [delta for delta in (telemetry.rss_delta(rss_started), child.get("rss_delta_bytes")) if delta is not None]
+        stats["rss_delta_bytes"] = sum(deltas) if deltas else None
+        if isinstance(value, Iterator):
+            stats["streamed"] = True
+            return telemetry.count_rows(value, stats)
+        stats["rows_out"] = telemetry.row_count(value)
+        return value
+
+    def _cache_keys(self, plan: ExecutionPlan, context: Dict[str, Any]) -> Dict[str, str]:
+        # Content-addressed: input bytes, stage identity/version, stage options and the
+        # keys of every upstream stage. A stage without a key poisons its dependents.
+        input_hash = context.get("input_hash") or _file_digest(context["input_path"])
+        keys: Dict[str, str] = {}
+        for name in plan.graph:
+            stage = self.stages[name]
+            if not stage.cacheable or any(dep not in keys for dep in stage.depends_on):
+                continue
+            material = [
+                input_hash,
+                name,
+                stage.version,
+                [keys[dep] for dep in stage.depends_on],
+                stage.cache_key_parts(context),
+            ]
+            keys[name] = hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+        return keys
 
     def _validate_stages(self, enabled: List[str]) -> None:
+        if len(set(enabled)) != len(enabled):
+            raise PipelineError("Duplicate stage in enabled stages")
         missing = [name for name in enabled if name not in self.stages]
         if missing:
             raise PipelineError(f"Unknown stages: {missing}")
 
+        enabled_set = set(enabled)
         for name in enabled:
-            deps = self.stages[name].depends_on
-            for dep in deps:
-                if dep not in enabled:
+            for dep in self.stages[name].depends_on:
+                if dep not in enabled_set:
                     raise PipelineError(f"Stage '{name}' depends on '{dep}', which is not enabled")
 
+    def _check_dependencies_precede(self, index_of: Dict[str, int], enabled: List[str], what: str) -> None:
+        for name in enabled:
+            for dep in self.stages[name].depends_on:
+                if index_of[dep] >= index_of[name]:
+                    raise PipelineError(f"Invalid {what}: '{name}' depends on '{dep}' in same or later position")
+
     def _plan_from_parallel_groups(self, groups: List[List[str]], enabled: List[str]) -> List[List[str]]:
         flattened = [name for group in groups for name in group]
         if len(set(flattened)) != len(flattened):
@@ -32,18 +374,9 @@ class Pipeline:
         if set(flattened) != set(enabled):
             raise PipelineError("Parallel groups must include all enabled stages")
 
-        index_of = {}
-        for i, group in enumerate(groups):
-            for name in group:
-                index_of[name] = i
-
-        for name in enabled:
-            for dep in self.stages[name].depends_on:
-                if index_of[dep] >= index_of[name]:
-                    raise PipelineError(
-                        f"Invalid parallel plan: '{name}' depends on '{dep}' in same or later group"
-                    )
-        return groups
+        index_of = {name: i for i, group in enumerate(groups) for name in group}
+        self._check_dependencies_precede(index_of, enabled, "parallel plan")
+        return [list(group) for group in groups]
 
     def _plan_sequential(self, order: Optional[List[str]], enabled: List[str]) -> List[List[str]]:
         if order:
@@ -51,21 +384,27 @@ class Pipeline:
                 raise PipelineError("Duplicate stage in order")
             if set(order) != set(enabled):
                 raise PipelineError("Order must include all enabled stages")
-            ordered = order
-        else:
-            # Topological-like order based on dependencies
-            ordered = []
-            remaining = set(enabled)
-            while remaining:
-                progressed = False
-                for name in list(remaining):
-                    deps = self.stages[name].depends_on
-                    if all(dep in ordered for dep in deps):
-                        ordered.append(name)
-                        remaining.remove(name)
-                        progressed = True
-                if not progressed:
-                    raise PipelineError("Cyclic dependency detected in stages")
+            self._check_dependencies_precede({name: i for i, name in enumerate(order)}, enabled, "order")
+            return [[name] for name in order]
+
+        # Kahn's algorithm, O(V + E); ties keep the enabled order.
+        indegree = {name: len(self.stages[name].depends_on) for name in enabled}
+        dependents: Dict[str, List[str]] = {name: [] for name in enabled}
+        for name in enabled:
+            for dep in self.stages[name].depends_on:
+                dependents[dep].append(name)
+
+        queue: Deque[str] = deque(name for name in enabled if indegree[name] == 0)
+        ordered: List[str] = []
+        while queue:
+            name = queue.popleft()
+            ordered.append(name)
+            for dependent in dependents[name]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    queue.append(dependent)
+        if len(ordered) != len(enabled):
+            raise PipelineError("Cyclic dependency detected in stages")
         return [[name] for name in ordered]
 
     def build_plan(
@@ -79,29 +418,209 @@ class Pipeline:
             return self._plan_from_parallel_groups(parallel_groups, enabled)
         return self._plan_sequential(order, enabled)
 
+    def _compile_plan(
+        self,
+        enabled: List[str],
+        order: Optional[List[str]],
+        parallel_groups: Optional[List[List[str]]],
+    ) -> ExecutionPlan:
+        # An explicit order chains each stage to its predecessor; parallel groups
+        # make each stage wait for the whole previous group.
+        plan = self.build_plan(enabled, order, parallel_groups)
+        graph: Dict[str, Tuple[str, ...]] = {}
+        previous: List[str] = []
+        for group in plan:
+            for name in group:
+                prerequisites = list(self.stages[name].depends_on)
+                if order or parallel_groups:
+                    seen = set(prerequisites)
+                    prerequisites.extend(dep for dep in previous if dep not in seen)
+                graph[name] = tuple(prerequisites)
+            previous = group
+        return ExecutionPlan(graph)
+
+    def _plan(
+        self,
+        enabled: List[str],
+        order: Optional[List[str]] = None,
+        parallel_groups: Optional[List[List[str]]] = None,
+    ) -> ExecutionPlan:
+        # The same stages listed in another order are the same plan: without an explicit
+        # order they are scheduled in registration order, so only the set (and its
+        # length, so duplicates still fail validation) enters the key.
+        if not order and not parallel_groups:
+            rank = {name: index for index, name in enumerate(self.stages)}
+            enabled = sorted(enabled, key=lambda name: rank.get(name, len(rank)))
+        key = (
+            frozenset(enabled),
+            len(enabled),
+            tuple(order or ()),
+            tuple(tuple(group) for group in parallel_groups or ()),
+        )
+        with self._plan_lock:
+            plan = self._plan_cache.get(key)
+            if plan is not None:
+                self._plan_cache.move_to_end(key)
+                self._plan_hits += 1
+                return plan
+            self._plan_misses += 1
+
+        plan = self._compile_plan(enabled, order, parallel_groups)
+        with self._plan_lock:
+            self._plan_cache[key] = plan
+            self._plan_cache.move_to_end(key)
+            while len(self._plan_cache) > self.plan_cache_size:
+                self._plan_cache.popitem(last=False)
+        return plan
+
+    def build_graph(
+        self,
+        enabled: List[str],
+        order: Optional[List[str]] = None,
+        parallel_groups: Optional[List[List[str]]] = None,
+    ) -> Dict[str, Tuple[str, ...]]:
+        # Stage -> stages that must finish before it starts, keyed in plan order.
+        return dict(self._plan(enabled, order, parallel_groups).graph)
+
+    def plan_cache_info(self) -> Dict[str, int]:
+        with self._plan_lock:
+            return {
+                "hits": self._plan_hits,
+                "misses": self._plan_misses,
+                "size": len(self._plan_cache),
+                "max_size": self.plan_cache_size,
+            }
+
+    def register_stage(self, stage: Stage) -> None:
+        with self._plan_lock:
+            self.stages[stage.name] = stage
+            self._plan_cache.clear()
+
     def run(
         self,
         context: Dict[str, Any],
         enabled: List[str],
         order: Optional[List[str]] = None,
         parallel_groups: Optional[List[List[str]]] = None,
+        execution_modes: Optional[Dict[str, str]] = None,
+        checkpoint: Optional[StageCheckpointContract] = None,
+        cancellation: Optional[CancellationToken] = None,
+        timeouts: Optional[Dict[str, float]] = None,
     ) -> Dict[str, Any]:
-        plan = self.build_plan(enabled, order, parallel_groups)
+        plan = self._plan(enabled, order, parallel_groups)
+        graph = plan.graph
+        dependents = plan.dependents
+        modes = self._resolve_modes(list(graph), execution_modes)
+        timeouts = self._resolve_timeouts(list(graph), timeouts)
+        # Stopping this run (a stage failed or overran) must not cancel the caller's token.
+        run_token = CancellationToken(parent=cancellation)
+        run_token.check()
+        tokens: Dict[str, CancellationToken] = {}
+
+        use_keys = self.result_cache is not None or checkpoint is not None
+        cache_keys = self._cache_keys(plan, context) if use_keys else {}
+        cached_stages: List[str] = []
+        restored_stages: List[str] = []
+        metrics: Dict[str, Dict[str, Any]] = {}
+        ready_at: Dict[str, float] = {}
+
+        def execute(name: str, snapshot: Dict[str, Any]) -> Any:
+            # The deadline starts when the stage does, not when it was queued.
+            token = tokens[name] = run_token.child(name, timeouts.get(name))
+            token.check()
+            stage_context = {**context, "cancellation": token}
+            streamed = [dep for dep in self.stages[name].depends_on if isinstance(snapshot[dep], Iterator)]
+            if streamed:
+                snapshot = {**snapshot, **{dep: token.guard(snapshot[dep]) for dep in streamed}}
+            stats: Dict[str, Any] = {
+                "mode": modes[name],
+                "queue_wait_seconds": time.perf_counter() - ready_at[name],
+            }
+            metrics[name] = stats
+            key = cache_keys.get(name)
+            if key is not None and checkpoint is not None:
+                # This job's own earlier attempt got this far.
+                value = checkpoint.get(name, key)
+                if value is not None:
+                    restored_stages.append(name)
+                    stats.update(restored=True, rows_out=telemetry.row_count(value))
+                    return value
+            if key is not None and self.result_cache is not None:
+                value = self.result_cache.get(key)
+                if value is not None:
+                    cached_stages.append(name)
+                    stats.update(cached=True, rows_out=telemetry.row_count(value))
+                    return value
+            value = self._measure_stage(name, modes[name], stage_context, snapshot, stats)
+            if key is not None and self.result_cache is not None:
+                self.result_cache.put(key, value)
+            if key is not None and checkpoint is not None:
+                checkpoint.put(name, key, value)
+            return value
+
+        pending = {name: len(prerequisites) for name, prerequisites in graph.items()}
+        ready: Deque[str] = deque(name for name, count in pending.items() if count == 0)
+        started = time.perf_counter()
+        ready_at.update((name, started) for name in ready)
+        running: Dict[Future, str] = {}
         results: Dict[str, Any] = {}
 
-        for group in plan:
-            if len(group) == 1:
-                name = group[0]
-                results[name] = self.stages[name].run(context, results)
-                continue
+        def complete(name: str, value: Any) -> None:
+            if isinstance(value, Iterator) and len(dependents[name]) > 1:
+                raise PipelineError(f"Streamed output of '{name}' can only feed one stage")
+            results[name] = value
+            for dependent in dependents[name]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready_at[dependent] = time.perf_counter()
+                    ready.append(dependent)
+
+        try:
+            while ready or running:
+                while ready:
+                    name = ready.popleft()
+                    mode = modes[name]
+                    # A lone thread stage has nothing to overlap with: skip the pool hop,
+                    # unless it has a timeout the scheduler has to watch.
+                    lone = mode == "thread" and not ready and not running and name not in timeouts
+                    if mode == "inline" or lone:
+                        complete(name, execute(name, results))
+                        continue
+                    # Stages get a snapshot so completions never mutate a dict they read.
+                    running[self._thread_pool().submit(execute, name, dict(results))] = name
+
+                if running:
+                    done, _ = wait(running, timeout=CANCEL_CHECK_SECONDS, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        complete(name, future.result())
+                    # A thread stage cannot be interrupted: one that overran, or runs in
+                    # a cancelled job, is left behind once it ignores its token.
+                    for name in running.values():
+                        if name in tokens:
+                            tokens[name].check()
+                    run_token.check()
+        except BaseException as exc:
+            # In-flight stages stop at their next check; let them settle so a failed job
+            # rarely overlaps its retry, but never wait on a runaway stage for good.
+            run_token.cancel(f"Pipeline stopped: {exc}")
+            wait(running, timeout=self.abandon_grace_seconds)
+            raise
 
-            with ThreadPoolExecutor(max_workers=len(group)) as executor:
-                future_map = {
-                    executor.submit(self.stages[name].run, context, results): name
-                    for name in group
-                }
-                for future in future_map:
-                    name = future_map[future]
-                    results[name] = future.result()
+        context["cached_stages"] = [name for name in graph if name in cached_stages]
+        context["restored_stages"] = [name for name in graph if name in restored_stages]
+        context["stage_metrics"] = self._finish_metrics(metrics, graph)
+        return {name: results[name] for name in graph}
 
-        return results
+    def _finish_metrics(
+        self, metrics: Dict[str, Dict[str, Any]], graph: Dict[str, Tuple[str, ...]]
+    ) -> Dict[str, Dict[str, Any]]:
+        # Row counts of streamed outputs are only final once the stream is drained,
+        # so inputs are filled in from the upstream outputs at the end.
+        finished: Dict[str, Dict[str, Any]] = {}
+        for name in graph:
+            stats = dict(metrics[name])
+            upstream = [metrics[dep].get("rows_out") for dep in self.stages[name].depends_on]
+            stats["rows_in"] = sum(upstream) if upstream and None not in upstream else None
+            finished[name] = stats
+        return finished
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+_in_pool_worker = False
+
+
+def _start_method() -> str:
+    # Pipelines run inside threaded workers, where a plain fork can inherit held locks.
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+def _mark_pool_worker() -> None:
+    global _in_pool_worker
+    _in_pool_worker = True
+
+
+def in_pool_worker() -> bool:
+    # Set by the pool initializer. A fork-context child (a prefork RQ worker) has a
+    # parent process too, but it is not a pool worker and may use a pool of its own.
+    return _in_pool_worker
+
+
+def shared_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context(_start_method()),
+                initializer=_mark_pool_worker,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=True)
+        _pool = None
+        _pool_pid = None
+
+
+def terminate_process_pool() -> None:
+    # The only way to stop a task already running on a worker: kill the workers. Other
+    # tasks on the pool fail with BrokenProcessPool; the next caller gets a fresh pool.
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool = _pool if _pool_pid == os.getpid() else None
+        _pool = None
+        _pool_pid = None
+    if pool is None:
+        return
+    # ProcessPoolExecutor has no public handle on its worker processes.
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
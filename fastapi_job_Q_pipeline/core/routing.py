@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+PRIORITIES = ("high", "default", "low")
+ROUTING_POLICIES = ("size", "cost", "priority")
+
+# Default pipeline: stage1, stage2, stage3 and no transforms.
+_BASELINE_WEIGHT = 3.0
+
+
+def estimate_cost(job: Dict[str, Any]) -> float:
+    # Rough work estimate in "bytes of a default job": input size scaled by how much
+    # of the pipeline the config runs and by how many column transforms it adds.
+    config = job.get("pipeline_config") or {}
+    stages = config.get("enabled_stages")
+    weight = float(len(stages)) if stages else _BASELINE_WEIGHT
+    weight += len(config.get("transforms") or ()) / 4
+    return (job.get("input_size") or 0) * weight / _BASELINE_WEIGHT
+
+
+class QueueRouter:
+    # An explicit pipeline_config["priority"] always wins; otherwise "size" and "cost"
+    # send small jobs to "high" and large ones to "low", and "priority" uses "default".
+    def __init__(self, policy: str = "size", small_bytes: int = 5 * 1024**2, large_bytes: int = 100 * 1024**2):
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy '{policy}'")
+        self.policy = policy
+        self.small_bytes = small_bytes
+        self.large_bytes = large_bytes
+
+    def route(self, job: Dict[str, Any]) -> str:
+        explicit: Optional[str] = (job.get("pipeline_config") or {}).get("priority")
+        if explicit:
+            return explicit
+        if self.policy == "priority":
+            return "default"
+
+        measure = (job.get("input_size") or 0) if self.policy == "size" else estimate_cost(job)
+        if measure <= self.small_bytes:
+            return "high"
+        if measure >= self.large_bytes:
+            return "low"
+        return "default"
@@ -1,33 +1,129 @@
 from __future__ import annotations
 
+import tempfile
 import time
-from typing import Any, Dict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
 
 import pandas as pd
 
-from core.interfaces import Stage
+from core.encodings import COMPRESSIBLE_FORMATS, available_encodings, compress_output
+from core.excel_readers import DEFAULT_READERS, STREAMABLE_EXCEL_SUFFIXES, iter_openpyxl_batches, read_excel
+from core.expressions import apply_transforms
+from core.formats import DEFAULT_OUTPUT_FORMAT, write_chunks, write_frame
+from core.ingest import (
+    Source,
+    combine,
+    extract_workbooks,
+    is_archive,
+    iter_source_chunks,
+    list_sources,
+    read_sources,
+)
+from core.interfaces import RowWiseStage, Stage
 
 
 class Stage1LoadAndNormalize(Stage):
     name = "stage1"
     depends_on = []
 
-    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> pd.DataFrame:
+    def cache_key_parts(self, context: Dict[str, Any]) -> Any:
+        parts: Dict[str, Any] = {"chunk_size": context.get("chunk_size")}
+        ingest = context.get("ingest") or "first_sheet"
+        if ingest != "first_sheet":
+            # Only added when set, so cache keys of single-sheet jobs stay as they were.
+            parts["ingest"] = ingest
+        readers = tuple(context.get("excel_readers") or DEFAULT_READERS)
+        if readers != DEFAULT_READERS:
+            # Readers differ in the dtypes they infer, so their output is not interchangeable.
+            parts["excel_readers"] = list(readers)
+        return parts
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
         input_path = context["input_path"]
-        df = pd.read_excel(input_path)
+        chunk_size = context.get("chunk_size")
+        ingest = context.get("ingest") or "first_sheet"
+        # Deployment preference; the first installed reader for the format is used.
+        readers = context.get("excel_readers") or DEFAULT_READERS
+        if ingest != "first_sheet" or is_archive(input_path):
+            if chunk_size:
+                return self._iter_source_chunks(input_path, ingest, chunk_size, readers)
+            with self._sources(input_path, ingest) as (sources, tag_file):
+                df = combine(read_sources(sources, readers, context.get("cancellation")), sources, tag_file)
+            return self._with_row_ids(df)
+
+        if chunk_size:
+            return self._iter_chunks(input_path, chunk_size, readers)
+
+        df = read_excel(input_path, 0, readers)
+        time.sleep(0.2)
+        return self._with_row_ids(df)
+
+    @staticmethod
+    def _with_row_ids(df: pd.DataFrame) -> pd.DataFrame:
+        # Frames here are freshly read or concatenated, so the id column goes on in place.
         if "_row_id" not in df.columns:
-            df = df.copy()
             df["_row_id"] = range(1, len(df) + 1)
-        time.sleep(0.2)
         return df
 
+    @contextmanager
+    def _sources(self, input_path: str, ingest: str) -> Iterator[Tuple[List[Source], bool]]:
+        # Archives are unpacked into a temporary directory that lives as long as the read;
+        # rows from an archive are tagged with their member as well as their sheet.
+        if not is_archive(input_path):
+            yield list_sources([(Path(input_path).name, input_path)], ingest), False
+            return
+        with tempfile.TemporaryDirectory(prefix="ingest_") as tmp:
+            workbooks = extract_workbooks(input_path, tmp)
+            if not workbooks:
+                raise ValueError(f"No Excel workbooks found in '{Path(input_path).name}'")
+            yield list_sources(workbooks, ingest), True
+
+    def _iter_source_chunks(
+        self, input_path: str, ingest: str, chunk_size: int, readers: Sequence[str]
+    ) -> Iterator[pd.DataFrame]:
+        with self._sources(input_path, ingest) as (sources, tag_file):
+            yield from self._number_chunks(
+                iter_source_chunks(
+                    sources, tag_file, lambda path, sheet: self._read_chunks(path, chunk_size, sheet, readers)
+                )
+            )
 
-class Stage2CpuTransform(Stage):
+    def _iter_chunks(self, input_path: str, chunk_size: int, readers: Sequence[str]) -> Iterator[pd.DataFrame]:
+        return self._number_chunks(self._read_chunks(input_path, chunk_size, 0, readers))
+
+    @staticmethod
+    def _number_chunks(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        next_row_id = 1
+        for chunk in chunks:
+            if "_row_id" not in chunk.columns:
+                chunk["_row_id"] = range(next_row_id, next_row_id + len(chunk))
+            next_row_id += len(chunk)
+            yield chunk
+
+    def _read_chunks(
+        self, input_path: str, chunk_size: int, sheet: Union[str, int], readers: Sequence[str]
+    ) -> Iterator[pd.DataFrame]:
+        if Path(input_path).suffix.lower() in STREAMABLE_EXCEL_SUFFIXES:
+            yield from iter_openpyxl_batches(input_path, sheet, chunk_size)
+            return
+        df = read_excel(input_path, sheet, readers)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size].copy()
+
+
+class Stage2CpuTransform(RowWiseStage):
     name = "stage2"
     depends_on = ["stage1"]
+    execution_mode = "process"
+    partitionable = True
+
+    def cache_key_parts(self, context: Dict[str, Any]) -> Any:
+        return {"transforms": context.get("transforms")}
 
-    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> pd.DataFrame:
-        df: pd.DataFrame = results["stage1"]
+    def transform(self, df: pd.DataFrame, context: Dict[str, Any]) -> pd.DataFrame:
         df = df.copy()
         numeric_cols = df.select_dtypes(include=["number"]).columns
         if len(numeric_cols) > 0:
@@ -39,16 +135,29 @@ class Stage2CpuTransform(Stage):
         for i in range(20000):
             total += i * i
         df["_cpu_marker"] = total % 97
+        transforms = context.get("transforms")
+        if transforms:
+            df = apply_transforms(df, transforms)
         return df
 
 
 class Stage3WriteOutput(Stage):
     name = "stage3"
     depends_on = ["stage2"]
+    cacheable = False
 
     def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> str:
-        df: pd.DataFrame = results["stage2"]
+        data = results["stage2"]
         output_path = context["output_path"]
-        df.to_csv(output_path, index=False)
+        output_format = context.get("output_format") or DEFAULT_OUTPUT_FORMAT
+        if isinstance(data, Iterator):
+            write_chunks(data, output_path, output_format)
+        else:
+            write_frame(data, output_path, output_format)
+        if output_format in COMPRESSIBLE_FORMATS:
+            # Otherwise the first download of each encoding compresses it.
+            for encoding in context.get("precompress") or ():
+                if encoding in available_encodings():
+                    compress_output(output_path, encoding)
         time.sleep(0.2)
         return output_path
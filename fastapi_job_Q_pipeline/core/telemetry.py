@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterator
+from typing import Any, Dict, Optional
+
+
+def current_rss_bytes() -> Optional[int]:
+    # Resident set size right now, unlike ru_maxrss, which is the lifetime peak of the
+    # whole process and so says nothing about any one stage. Linux only.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def rss_delta(rss_started: Optional[int]) -> Optional[int]:
+    # Net growth since rss_started; negative when the stage freed more than it kept.
+    current = current_rss_bytes()
+    return None if current is None or rss_started is None else current - rss_started
+
+
+def process_usage(cpu_started: float, rss_started: Optional[int]) -> Dict[str, Any]:
+    return {"cpu_seconds": time.process_time() - cpu_started, "rss_delta_bytes": rss_delta(rss_started)}
+
+
+def row_count(value: Any) -> Optional[int]:
+    shape = getattr(value, "shape", None)
+    if shape:
+        return int(shape[0])
+    return None
+
+
+def count_rows(chunks: Iterator[Any], stats: Dict[str, Any]) -> Iterator[Any]:
+    # Streamed outputs are only materialised downstream, so rows are tallied as they pass.
+    stats["rows_out"] = 0
+    try:
+        for chunk in chunks:
+            rows = row_count(chunk)
+            if rows is not None:
+                stats["rows_out"] += rows
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import mmap
+import os
+import pickle
+from multiprocessing import shared_memory
+from typing import Any, List, Optional
+
+
+# Pickle protocol 5 hands contiguous buffers (the numpy arrays behind DataFrame
+# blocks) out-of-band. They are copied once into a shared memory block, so only the
+# small pickle header travels through the process pool pipe, and the receiver maps
+# them in place.
+class SharedPayload:
+    def __init__(self, header: bytes, block_name: Optional[str], lengths: List[int]):
+        self.header = header
+        self.block_name = block_name
+        self.lengths = lengths
+
+
+# Where POSIX shared memory segments live on Linux: a tmpfs, 64 MB by default in a
+# container, so the pages are reserved up front instead of faulting in mid-write.
+SHM_DIR = "/dev/shm"
+
+
+def _segment_path(name: str) -> Optional[str]:
+    path = os.path.join(SHM_DIR, name)
+    return path if os.path.exists(path) else None
+
+
+def _reserve(name: str, size: int) -> None:
+    # A write into an unbacked page of a full tmpfs is a SIGBUS, which kills the
+    # process; posix_fallocate turns it into an OSError (ENOSPC) here instead.
+    path = _segment_path(name)
+    if path is None or not hasattr(os, "posix_fallocate"):
+        return
+    fd = os.open(path, os.O_RDWR)
+    try:
+        os.posix_fallocate(fd, 0, size)
+    finally:
+        os.close(fd)
+
+
+def _in_band(value: Any) -> SharedPayload:
+    return SharedPayload(pickle.dumps(value, protocol=5), None, [])
+
+
+def pack(value: Any) -> SharedPayload:
+    buffers: List[pickle.PickleBuffer] = []
+    header = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    lengths = [raw.nbytes for raw in raws]
+    total = sum(lengths)
+    if total == 0:
+        return _in_band(value)
+
+    # Out of shared memory the frame still gets through, pickled down the pipe.
+    try:
+        block = shared_memory.SharedMemory(create=True, size=total)
+    except OSError:
+        return _in_band(value)
+    try:
+        _reserve(block.name, total)
+        offset = 0
+        for raw, length in zip(raws, lengths):
+            block.buf[offset:offset + length] = raw
+            offset += length
+    except OSError:
+        block.close()
+        block.unlink()
+        return _in_band(value)
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    block.close()
+    return SharedPayload(header, block.name, lengths)
+
+
+def _map(payload: SharedPayload) -> memoryview:
+    # The arrays are rebuilt directly on a mapping of the segment, with no copy. It is
+    # unmapped once the last of them is collected, and release() unlinking the name in
+    # the meantime does not affect it. The mapping is writable and belongs to this
+    # receiver alone, so stages may still mutate what they get.
+    total = sum(payload.lengths)
+    path = _segment_path(payload.block_name)
+    if path is not None:
+        fd = os.open(path, os.O_RDWR)
+        try:
+            return memoryview(mmap.mmap(fd, total))
+        finally:
+            os.close(fd)
+    # Elsewhere the segment is only reachable through SharedMemory, whose close() fails
+    # while arrays still point into .buf: copy out of it.
+    block = shared_memory.SharedMemory(name=payload.block_name)
+    try:
+        return memoryview(bytearray(block.buf[:total]))
+    finally:
+        block.close()
+
+
+def unpack(payload: SharedPayload) -> Any:
+    if payload.block_name is None:
+        return pickle.loads(payload.header)
+
+    view = _map(payload)
+    buffers = []
+    offset = 0
+    for length in payload.lengths:
+        buffers.append(view[offset:offset + length])
+        offset += length
+    return pickle.loads(payload.header, buffers=buffers)
+
+
+def release(payload: SharedPayload) -> None:
+    if payload.block_name is None:
+        return
+    try:
+        block = shared_memory.SharedMemory(name=payload.block_name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
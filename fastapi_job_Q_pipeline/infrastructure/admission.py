@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+import redis
+
+QUEUED_KEY = "admission:queued"
+RATES_KEY = "admission:rates"
+CLIENT_KEY_PREFIX = "admission:client:"
+
+
+class RedisAdmissionStore:
+    # Queued bytes are a hash of job_id -> input size rather than a counter, so removing
+    # a job twice (cancelled, then skipped by its worker) cannot drive the total negative.
+    # Rates are the last rate_samples finished jobs; each client's in-flight jobs are a
+    # sorted set scored by submit time, and entries older than slot_ttl_seconds are
+    # dropped so a slot whose release was lost cannot block a client for good.
+    def __init__(self, redis_client: redis.Redis, rate_samples: int = 200, slot_ttl_seconds: int = 86400):
+        self.redis = redis_client
+        self.rate_samples = rate_samples
+        self.slot_ttl_seconds = slot_ttl_seconds
+
+    def backlog_bytes(self) -> int:
+        return sum(int(size) for size in self.redis.hvals(QUEUED_KEY))
+
+    def add_queued(self, job_id: str, size: int) -> None:
+        self.redis.hset(QUEUED_KEY, mapping={job_id: int(size)})
+
+    def remove_queued(self, job_id: str) -> None:
+        self.redis.hdel(QUEUED_KEY, job_id)
+
+    def record_processed(self, size: int, seconds: float) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.lpush(RATES_KEY, f"{int(size)}:{seconds:.6f}")
+        pipe.ltrim(RATES_KEY, 0, self.rate_samples - 1)
+        pipe.execute()
+
+    def seconds_per_byte(self) -> Optional[float]:
+        total_bytes = 0
+        total_seconds = 0.0
+        for sample in self.redis.lrange(RATES_KEY, 0, -1):
+            size, _, seconds = (sample.decode() if isinstance(sample, bytes) else sample).partition(":")
+            total_bytes += int(size)
+            total_seconds += float(seconds)
+        return total_seconds / total_bytes if total_bytes else None
+
+    def acquire_client_slot(self, client_id: str, job_id: str, limit: int) -> bool:
+        # Added first and counted in the same transaction, then taken back if over the
+        # limit, so concurrent submissions cannot both slip under it.
+        key = f"{CLIENT_KEY_PREFIX}{client_id}"
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.zremrangebyscore(key, "-inf", now - self.slot_ttl_seconds)
+        pipe.zadd(key, {job_id: now})
+        pipe.zcard(key)
+        pipe.expire(key, self.slot_ttl_seconds)
+        in_flight = pipe.execute()[2]
+        if in_flight > limit:
+            self.redis.zrem(key, job_id)
+            return False
+        return True
+
+    def release_client_slot(self, client_id: str, job_id: str) -> None:
+        self.redis.zrem(f"{CLIENT_KEY_PREFIX}{client_id}", job_id)
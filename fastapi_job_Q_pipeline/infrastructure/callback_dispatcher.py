@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Client errors that a later attempt can still fix.
+RETRYABLE_STATUSES = {408, 425, 429}
+
+
+def retry_delay(attempts: int, base_delay: float, max_delay: float) -> float:
+    # Exponential backoff with jitter, so callbacks that failed together do not retry together.
+    return min(max_delay, base_delay * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class CallbackDispatcher:
+    # Callbacks wait in the "<queue>" list, retries in the "<queue>:retry" sorted set
+    # (scored by due time) and give-ups in the "<queue>:dead" list. A callback being
+    # delivered sits in "<queue>:processing:<name>" until its outcome is recorded, so one
+    # taken by a dispatcher that crashed is handed back when a dispatcher of the same
+    # name starts again. Delivery is therefore at least once.
+    def __init__(
+        self,
+        redis_client: Any,
+        http_client: httpx.AsyncClient,
+        queue: str = "callbacks",
+        name: str = "dispatcher",
+        concurrency: int = 32,
+        max_attempts: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+    ):
+        self.redis = redis_client
+        self.http = http_client
+        self.queue = queue
+        self.retry_key = f"{queue}:retry"
+        self.dead_key = f"{queue}:dead"
+        self.processing_key = f"{queue}:processing:{name}"
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots = asyncio.Semaphore(concurrency)
+        self._inflight: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def recover(self) -> int:
+        # Newest first onto the consuming end, so the oldest leftover goes out first.
+        recovered = 0
+        while await self.redis.lmove(self.processing_key, self.queue, "LEFT", "RIGHT") is not None:
+            recovered += 1
+        return recovered
+
+    async def run(self) -> None:
+        recovered = await self.recover()
+        if recovered:
+            logger.info("Requeued %d callbacks left in flight by a previous run", recovered)
+        promoter = asyncio.create_task(self._promote_due())
+        try:
+            while not self._stopping.is_set():
+                await self._slots.acquire()
+                try:
+                    # BLMOVE (Redis 6.2+): the callback is never only in this process's memory.
+                    raw = await self.redis.blmove(self.queue, self.processing_key, 1, "RIGHT", "LEFT")
+                except Exception:  # noqa: BLE001 - keep dispatching across Redis restarts
+                    self._slots.release()
+                    logger.warning("Reading callbacks failed, retrying", exc_info=True)
+                    await asyncio.sleep(1)
+                    continue
+                if raw is None:
+                    self._slots.release()
+                    continue
+                task = asyncio.create_task(self._deliver_and_release(raw))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+        finally:
+            promoter.cancel()
+            if self._inflight:
+                await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _deliver_and_release(self, raw: str) -> None:
+        try:
+            await self.deliver(raw)
+            await self.redis.lrem(self.processing_key, 1, raw)
+        except Exception:  # noqa: BLE001 - left in the processing list for the next start
+            logger.warning("Recording a callback outcome failed", exc_info=True)
+        finally:
+            self._slots.release()
+
+    async def deliver(self, raw: str) -> None:
+        try:
+            task = json.loads(raw)
+            url = task["callback_url"]
+        except (TypeError, ValueError, KeyError):
+            await self.redis.lpush(self.dead_key, json.dumps({"raw": raw, "error": "malformed callback"}))
+            return
+
+        try:
+            response = await self.http.post(url, json={"job_id": task.get("job_id"), "payload": task.get("payload")})
+        except httpx.HTTPError as exc:
+            await self._failed(task, f"{type(exc).__name__}: {exc}", retryable=True)
+            return
+
+        if response.is_success:
+            return
+        status = response.status_code
+        await self._failed(task, f"HTTP {status}", retryable=status >= 500 or status in RETRYABLE_STATUSES)
+
+    async def _failed(self, task: Dict[str, Any], error: str, retryable: bool) -> None:
+        task["attempts"] = task.get("attempts", 0) + 1
+        task["last_error"] = error
+        if not retryable or task["attempts"] >= self.max_attempts:
+            task["failed_at"] = int(time.time())
+            await self.redis.lpush(self.dead_key, json.dumps(task))
+            logger.warning("Callback for job %s dead-lettered: %s", task.get("job_id"), error)
+            return
+        due = time.time() + retry_delay(task["attempts"], self.base_delay, self.max_delay)
+        await self.redis.zadd(self.retry_key, {json.dumps(task): due})
+
+    async def promote_due(self, now: Optional[float] = None, batch: int = 100) -> int:
+        due = await self.redis.zrangebyscore(self.retry_key, "-inf", now or time.time(), start=0, num=batch)
+        promoted = 0
+        for raw in due:
+            # Only the dispatcher whose ZREM succeeds requeues it.
+            if await self.redis.zrem(self.retry_key, raw):
+                await self.redis.lpush(self.queue, raw)
+                promoted += 1
+        return promoted
+
+    async def _promote_due(self) -> None:
+        while True:
+            try:
+                await self.promote_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - retried on the next tick
+                logger.warning("Promoting callback retries failed", exc_info=True)
+            await asyncio.sleep(0.5)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from core.contracts import JobRepositoryContract
+
+
+class JobCheckpointStore:
+    # One job's stage outputs as Parquet files under <base_dir>/<job_id>/, with their
+    # metadata ({stage: {key, path, rows, saved_at}}) in the job record's "checkpoints"
+    # field. A checkpoint is only used while its key (the stage's cache key: input,
+    # stage version, options and upstream keys) still matches.
+    def __init__(
+        self,
+        repository: JobRepositoryContract,
+        base_dir: str,
+        job_id: str,
+        saved: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        self.repository = repository
+        self.job_dir = Path(base_dir) / job_id
+        self.job_id = job_id
+        self.saved: Dict[str, Dict[str, Any]] = dict(saved or {})
+        self._lock = threading.Lock()
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        meta = self.saved.get(stage)
+        if not meta or meta.get("key") != key:
+            return None
+        try:
+            return pd.read_parquet(meta["path"])
+        except Exception:  # noqa: BLE001 - a missing or torn file just reruns the stage
+            return None
+
+    def put(self, stage: str, key: str, value: Any) -> bool:
+        if not isinstance(value, pd.DataFrame):
+            return False
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        path = self.job_dir / f"{stage}.parquet"
+        tmp_path = self.job_dir / f".{stage}.{uuid.uuid4().hex}.tmp"
+        try:
+            # The index is kept, as in the result cache.
+            value.to_parquet(tmp_path, index=None)
+            os.replace(tmp_path, path)
+        except Exception:  # noqa: BLE001 - unsupported column types are not checkpointed
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+        # The file is in place before the metadata names it.
+        with self._lock:
+            self.saved[stage] = {"key": key, "path": str(path), "rows": len(value), "saved_at": int(time.time())}
+            self.repository.update_job(self.job_id, {"checkpoints": dict(self.saved)})
+        return True
+
+    def clear(self) -> None:
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+        with self._lock:
+            self.saved = {}
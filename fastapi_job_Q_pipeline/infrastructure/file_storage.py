@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import hashlib
 import os
+import shutil
 import uuid
 from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+from core.contracts import UploadTooLargeError
+from core.encodings import ENCODING_SUFFIXES, encoded_path_for
+from core.formats import DEFAULT_OUTPUT_FORMAT, OUTPUT_SUFFIXES
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
 
 class LocalFileStorage:
@@ -10,17 +19,50 @@ class LocalFileStorage:
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
 
-    def save_upload(self, filename: str, file_content: bytes) -> str:
+    def save_upload(self, filename: str, stream: BinaryIO, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        # Chunked copy so memory stays flat; the hash is computed on the way through
+        # and the partial file never appears under its final name.
         suffix = Path(filename).suffix or ".xlsx"
-        target = self.base_dir / f"upload_{uuid.uuid4().hex}{suffix}"
-        with target.open("wb") as f:
-            f.write(file_content)
-        return str(target)
+        name = f"upload_{uuid.uuid4().hex}{suffix}"
+        target = self.base_dir / name
+        tmp_path = self.base_dir / f".{name}.tmp"
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with tmp_path.open("wb") as f:
+                for block in iter(lambda: stream.read(UPLOAD_CHUNK_BYTES), b""):
+                    size += len(block)
+                    if max_bytes is not None and size > max_bytes:
+                        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                    digest.update(block)
+                    f.write(block)
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return {"path": str(target), "size": size, "sha256": digest.hexdigest()}
+
+    def delete_upload(self, path: str) -> None:
+        Path(path).unlink(missing_ok=True)
 
-    def build_output_path(self, job_id: str) -> str:
-        target = self.base_dir / f"output_{job_id}.csv"
+    def checkpoint_dir(self) -> str:
+        return str(self.base_dir / "checkpoints")
+
+    def delete_job_files(self, job_id: str, input_path: Optional[str] = None) -> None:
+        if input_path:
+            self.delete_upload(input_path)
+        shutil.rmtree(Path(self.checkpoint_dir()) / job_id, ignore_errors=True)
+        for output_format in OUTPUT_SUFFIXES:
+            output_path = self.build_output_path(job_id, output_format)
+            for path in (output_path, *(encoded_path_for(output_path, encoding) for encoding in ENCODING_SUFFIXES)):
+                Path(path).unlink(missing_ok=True)
+
+    def build_output_path(self, job_id: str, output_format: str = DEFAULT_OUTPUT_FORMAT) -> str:
+        target = self.base_dir / f"output_{job_id}{OUTPUT_SUFFIXES[output_format]}"
         return str(target)
 
     def ensure_path(self, path: str) -> str:
         os.makedirs(os.path.dirname(path), exist_ok=True)
         return path
+
+    def free_bytes(self) -> int:
+        return shutil.disk_usage(self.base_dir).free
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "CANCELLED"}
+
+
+def status_event(job_id: str, data: Dict[str, Any]) -> str:
+    event = {"job_id": job_id, "status": data["status"], "updated_at": data.get("updated_at")}
+    if data.get("error"):
+        event["error"] = data["error"]
+    return json.dumps(event)
+
+
+class JobEventSubscription:
+    def __init__(self, hub: "JobEventHub", max_queued: int):
+        self.hub = hub
+        self.job_ids: Set[str] = set()
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queued)
+
+    def add(self, job_ids: Iterable[str]) -> None:
+        for job_id in job_ids:
+            if job_id not in self.job_ids:
+                self.job_ids.add(job_id)
+                self.hub._listeners.setdefault(job_id, set()).add(self)
+
+    def remove(self, job_ids: Iterable[str]) -> None:
+        for job_id in job_ids:
+            self.job_ids.discard(job_id)
+            listeners = self.hub._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(self)
+                if not listeners:
+                    del self.hub._listeners[job_id]
+
+    def close(self) -> None:
+        self.remove(list(self.job_ids))
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class JobEventHub(ABC):
+    # Fans status events out in memory to every SSE/WebSocket client of this process.
+    # Subclasses feed dispatch() from their event source in _run().
+    def __init__(self, max_queued: int = 100, connect_timeout: float = 5.0):
+        self.max_queued = max_queued
+        self.connect_timeout = connect_timeout
+        self._listeners: Dict[str, Set[JobEventSubscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+
+    async def subscribe(self, job_ids: Iterable[str] = ()) -> JobEventSubscription:
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        # Wait until the channel is subscribed, so a snapshot taken after this
+        # returns cannot miss a transition.
+        await asyncio.wait_for(self._ready.wait(), self.connect_timeout)
+        subscription = JobEventSubscription(self, self.max_queued)
+        subscription.add(job_ids)
+        return subscription
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def dispatch(self, raw: Any) -> None:
+        try:
+            event = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        for subscription in list(self._listeners.get(event.get("job_id"), ())):
+            if subscription.queue.full():
+                # A client that stopped reading only needs the latest status.
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(event)
+
+    @abstractmethod
+    async def _run(self) -> None:
+        # Sets self._ready once events can no longer be missed, then delivers them
+        # until cancelled.
+        raise NotImplementedError
+
+
+class RedisJobEventHub(JobEventHub):
+    # One Redis pub/sub connection per API process; clients never talk to Redis themselves.
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        channel: str,
+        max_queued: int = 100,
+        connect_timeout: float = 5.0,
+    ):
+        super().__init__(max_queued, connect_timeout)
+        self.client_factory = client_factory
+        self.channel = channel
+
+    async def _run(self) -> None:
+        delay = 0.5
+        while True:
+            client = self.client_factory()
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self._ready.set()
+                delay = 0.5
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - keep the hub alive across Redis restarts
+                logger.warning("Job event subscription lost, retrying in %.1fs", delay, exc_info=True)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from core.routing import PRIORITIES
+from infrastructure.job_events import JobEventHub, status_event
+from infrastructure.metrics import metric_updates, render_metrics
+from infrastructure.queue import weighted_queue_order
+from infrastructure.repository import SUMMARY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryTransaction:
+    # Stands in for the Redis MULTI pipeline: queued writes apply together on execute().
+    def __init__(self, lock: threading.RLock):
+        self._lock = lock
+        self._ops: List[Callable[[], None]] = []
+
+    def add(self, op: Callable[[], None]) -> None:
+        self._ops.append(op)
+
+    def execute(self) -> None:
+        with self._lock:
+            for op in self._ops:
+                op()
+        self._ops = []
+
+
+class InMemoryJobRepository:
+    # Same behaviour as RedisJobRepository, for one process and no Redis. Values are
+    # copied in and out, as serialization would, so callers never share state. Status
+    # changes go to `events` (e.g. InMemoryJobEventHub.publish) as they would to pub/sub.
+    def __init__(self, events: Optional[Callable[[str], None]] = None) -> None:
+        self.events = events
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._updated: Dict[str, float] = {}
+        self._fingerprints: Dict[str, Tuple[str, float]] = {}
+        self._cancel_requested: Set[str] = set()
+
+    def _new_job(self, data: Dict[str, Any], now: int) -> Dict[str, Any]:
+        return {"status": "QUEUED", "created_at": now, "updated_at": now, **copy.deepcopy(data)}
+
+    def create_job(self, job_id: str, data: Dict[str, Any]) -> None:
+        self.create_jobs({job_id: data})
+
+    def create_jobs(self, jobs: Dict[str, Dict[str, Any]], pipeline: Optional[Any] = None) -> None:
+        now = int(time.time())
+        records = {job_id: self._new_job(data, now) for job_id, data in jobs.items()}
+
+        def write() -> None:
+            with self._lock:
+                self._jobs.update(records)
+                self._updated.update({job_id: now for job_id in records})
+
+        if pipeline is not None:
+            pipeline.add(write)
+        else:
+            write()
+
+    def pipeline(self) -> InMemoryTransaction:
+        return InMemoryTransaction(self._lock)
+
+    def update_job(self, job_id: str, data: Dict[str, Any]) -> None:
+        now = int(time.time())
+        with self._lock:
+            self._jobs.setdefault(job_id, {}).update({"updated_at": now, **copy.deepcopy(data)})
+            self._updated[job_id] = now
+        if self.events is not None and "status" in data:
+            self.events(status_event(job_id, {"updated_at": now, **data}))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_jobs([job_id])[0]
+
+    def get_jobs(self, job_ids: List[str], summary: bool = False) -> List[Optional[Dict[str, Any]]]:
+        jobs: List[Optional[Dict[str, Any]]] = []
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is not None and summary:
+                    job = {field: job[field] for field in SUMMARY_FIELDS if job.get(field) is not None}
+                jobs.append(copy.deepcopy(job))
+        return jobs
+
+    def list_job_ids(self, offset: int = 0, limit: int = 100) -> Tuple[List[str], int]:
+        with self._lock:
+            ordered = sorted(self._updated, key=lambda job_id: (self._updated[job_id], job_id), reverse=True)
+        return ordered[offset : offset + limit], len(ordered)
+
+    def job_ids_updated_before(self, cutoff: float, offset: int = 0, limit: int = 500) -> List[str]:
+        with self._lock:
+            ordered = sorted(
+                (job_id for job_id, updated in self._updated.items() if updated <= cutoff),
+                key=lambda job_id: (self._updated[job_id], job_id),
+            )
+        return ordered[offset : offset + limit]
+
+    def delete_jobs(self, job_ids: List[str]) -> None:
+        with self._lock:
+            for job_id in job_ids:
+                self._jobs.pop(job_id, None)
+                self._updated.pop(job_id, None)
+                self._cancel_requested.discard(job_id)
+
+    def claim_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            existing = self._fingerprints.get(fingerprint)
+            if existing is not None and existing[1] > now:
+                return existing[0]
+            self._fingerprints[fingerprint] = (job_id, now + ttl_seconds)
+            return None
+
+    def set_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int) -> None:
+        with self._lock:
+            self._fingerprints[fingerprint] = (job_id, time.time() + ttl_seconds)
+
+    def request_cancel(self, job_id: str) -> None:
+        with self._lock:
+            self._cancel_requested.add(job_id)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._cancel_requested
+
+
+class InMemoryJobEventHub(JobEventHub):
+    # Fed by InMemoryJobRepository instead of Redis pub/sub. Jobs change on worker
+    # threads, so publish() hands each event over to the event loop thread-safely.
+    def __init__(self, max_queued: int = 100):
+        super().__init__(max_queued)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def publish(self, raw: str) -> None:
+        loop = self._loop
+        if loop is None:
+            return  # nobody has subscribed yet
+        try:
+            loop.call_soon_threadsafe(self.dispatch, raw)
+        except RuntimeError:  # the loop closed in between
+            pass
+
+    async def _run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._ready.set()
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            self._loop = None
+
+
+class InMemoryStageMetrics:
+    # RedisStageMetrics for one process: the same histograms, kept in a dict.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[str, Any] = {}
+
+    def record(self, stage_metrics: Dict[str, Dict[str, Any]]) -> None:
+        increments, gauges = metric_updates(stage_metrics)
+        with self._lock:
+            for field, amount in increments.items():
+                self._values[field] = self._values.get(field, 0) + amount
+            self._values.update(gauges)
+
+    def render(self) -> str:
+        with self._lock:
+            values = dict(self._values)
+        return render_metrics(values)
+
+
+class InMemoryAdmissionStore:
+    # RedisAdmissionStore for one process.
+    def __init__(self, rate_samples: int = 200):
+        self._lock = threading.Lock()
+        self._queued: Dict[str, int] = {}
+        self._rates: Deque[Tuple[int, float]] = deque(maxlen=rate_samples)
+        self._clients: Dict[str, Set[str]] = {}
+
+    def backlog_bytes(self) -> int:
+        with self._lock:
+            return sum(self._queued.values())
+
+    def add_queued(self, job_id: str, size: int) -> None:
+        with self._lock:
+            self._queued[job_id] = int(size)
+
+    def remove_queued(self, job_id: str) -> None:
+        with self._lock:
+            self._queued.pop(job_id, None)
+
+    def record_processed(self, size: int, seconds: float) -> None:
+        with self._lock:
+            self._rates.append((int(size), seconds))
+
+    def seconds_per_byte(self) -> Optional[float]:
+        with self._lock:
+            total_bytes = sum(size for size, _ in self._rates)
+            return sum(seconds for _, seconds in self._rates) / total_bytes if total_bytes else None
+
+    def acquire_client_slot(self, client_id: str, job_id: str, limit: int) -> bool:
+        with self._lock:
+            in_flight = self._clients.setdefault(client_id, set())
+            if job_id not in in_flight and len(in_flight) >= limit:
+                return False
+            in_flight.add(job_id)
+            return True
+
+    def release_client_slot(self, client_id: str, job_id: str) -> None:
+        with self._lock:
+            self._clients.get(client_id, set()).discard(job_id)
+
+
+class _Lane(deque):
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+
+
+class InMemoryJobQueue:
+    # Priority lanes drained by a pool of worker threads in this process, picked with
+    # the same weighted order as the RQ workers.
+    def __init__(self, workers: int = 4, weights: Optional[Dict[str, float]] = None):
+        self.workers = workers
+        self.weights = weights or {}
+        self._lanes: Dict[str, Deque[str]] = {priority: _Lane(priority) for priority in PRIORITIES}
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+
+    def start(self, handler: Callable[[str], None]) -> "InMemoryJobQueue":
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(handler,), name=f"memory-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def enqueue(self, job_id: str, priority: str = "default") -> None:
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown priority '{priority}'")
+        with self._cond:
+            self._lanes[priority].append(job_id)
+            self._pending += 1
+            self._cond.notify()
+
+    def enqueue_many(
+        self,
+        job_ids: List[str],
+        pipeline: Optional[Any] = None,
+        priorities: Optional[List[str]] = None,
+    ) -> None:
+        if pipeline is not None:
+            pipeline.add(lambda: self.enqueue_many(job_ids, None, priorities))
+            return
+        for job_id, priority in zip(job_ids, priorities or ["default"] * len(job_ids)):
+            self.enqueue(job_id, priority)
+
+    def depth(self) -> int:
+        with self._cond:
+            return sum(len(lane) for lane in self._lanes.values())
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        # True once every enqueued job has been processed.
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _next(self) -> Optional[str]:
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                ready = [lane for lane in self._lanes.values() if lane]
+                if ready:
+                    return weighted_queue_order(ready, self.weights)[0].popleft()
+                self._cond.wait()
+
+    def _work(self, handler: Callable[[str], None]) -> None:
+        while True:
+            job_id = self._next()
+            if job_id is None:
+                return
+            try:
+                handler(job_id)
+            except Exception:  # noqa: BLE001 - one bad job must not stop the worker
+                logger.exception("In-memory job %s failed", job_id)
+            finally:
+                with self._cond:
+                    self._pending -= 1
+                    self._cond.notify_all()
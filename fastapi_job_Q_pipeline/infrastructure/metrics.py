@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+import redis
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+ROWS_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# stage_metrics field -> (metric name, help text, buckets)
+HISTOGRAMS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    "wall_seconds": ("pipeline_stage_wall_seconds", "Wall time per stage run.", SECONDS_BUCKETS),
+    "cpu_seconds": ("pipeline_stage_cpu_seconds", "CPU time per stage run.", SECONDS_BUCKETS),
+    "queue_wait_seconds": (
+        "pipeline_stage_queue_wait_seconds",
+        "Time a stage waited between becoming ready and starting.",
+        SECONDS_BUCKETS,
+    ),
+    "rows_out": ("pipeline_stage_rows_out", "Rows produced per stage run.", ROWS_BUCKETS),
+}
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def metric_updates(stage_metrics: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    # One job's stage_metrics as (increments, gauges), keyed "<metric>|<stage>|<extra>".
+    increments: Dict[str, float] = defaultdict(int)
+    gauges: Dict[str, Any] = {}
+    for stage, stats in stage_metrics.items():
+        result = "cached" if stats.get("cached") else "restored" if stats.get("restored") else "run"
+        increments[f"pipeline_stage_runs_total|{stage}|{result}"] += 1
+        if result != "run":
+            continue
+        for field, (metric, _, buckets) in HISTOGRAMS.items():
+            value = stats.get(field)
+            if value is None:
+                continue
+            for bound in (*buckets, float("inf")):
+                if value <= bound:
+                    increments[f"{metric}_bucket|{stage}|{_format_bound(bound)}"] += 1
+            increments[f"{metric}_sum|{stage}|"] += float(value)
+            increments[f"{metric}_count|{stage}|"] += 1
+        delta = stats.get("rss_delta_bytes")
+        if delta is not None:
+            gauges[f"pipeline_stage_last_rss_delta_bytes|{stage}|"] = delta
+    return dict(increments), gauges
+
+
+def render_metrics(values: Dict[str, Any]) -> str:
+    # Prometheus text format from the "<metric>|<stage>|<extra>" -> value hash.
+    samples: Dict[str, List[Tuple[str, str, Any]]] = defaultdict(list)
+    for field, value in values.items():
+        name, stage, extra = field.split("|", 2)
+        samples[name].append((stage, extra, value))
+
+    lines: List[str] = []
+    runs = "pipeline_stage_runs_total"
+    lines += [f"# HELP {runs} Stage runs, by whether the result cache or a checkpoint served them.", f"# TYPE {runs} counter"]
+    for stage, result, value in sorted(samples[runs]):
+        lines.append(f'{runs}{{stage="{stage}",result="{result}"}} {value}')
+
+    for metric, help_text, buckets in HISTOGRAMS.values():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        counts = {(stage, bound): value for stage, bound, value in samples[f"{metric}_bucket"]}
+        sums = {stage: value for stage, _, value in samples[f"{metric}_sum"]}
+        for stage, _, count in sorted(samples[f"{metric}_count"]):
+            for bound in map(_format_bound, (*buckets, float("inf"))):
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {counts.get((stage, bound), 0)}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {sums.get(stage, 0)}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {count}')
+
+    delta = "pipeline_stage_last_rss_delta_bytes"
+    lines += [f"# HELP {delta} RSS growth over the latest run of each stage.", f"# TYPE {delta} gauge"]
+    for stage, _, value in sorted(samples[delta]):
+        lines.append(f'{delta}{{stage="{stage}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+class RedisStageMetrics:
+    # Cumulative bucket counters live in one Redis hash, so every worker adds to the
+    # same histograms and any API replica can render them.
+    def __init__(self, redis_client: redis.Redis, key: str = "metrics:pipeline_stages"):
+        self.redis = redis_client
+        self.key = key
+
+    def record(self, stage_metrics: Dict[str, Dict[str, Any]]) -> None:
+        increments, gauges = metric_updates(stage_metrics)
+        pipe = self.redis.pipeline(transaction=False)
+        for field, amount in increments.items():
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(self.key, field, amount)
+            else:
+                pipe.hincrby(self.key, field, amount)
+        for field, value in gauges.items():
+            pipe.hset(self.key, field, value)
+        pipe.execute()
+
+    def render(self) -> str:
+        return render_metrics(self.redis.hgetall(self.key))
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import json
+import logging
 from typing import Any, Dict, Optional
 
+import redis
 import requests
 
+logger = logging.getLogger(__name__)
+
+CALLBACK_MODES = ("queue", "inline")
+
 
 class HttpCallbackNotifier:
+    # Posts from the worker itself; only for setups without a callback dispatcher.
     def notify(self, callback_url: Optional[str], job_id: str, payload: Dict[str, Any]) -> None:
         if not callback_url:
             return
@@ -17,3 +25,20 @@ class HttpCallbackNotifier:
             )
         except Exception:
             return
+
+
+class QueuedCallbackNotifier:
+    # Hands the callback to callback_dispatcher.py with one LPUSH, so a slow webhook
+    # never holds a pipeline worker.
+    def __init__(self, redis_client: redis.Redis, queue: str = "callbacks"):
+        self.redis = redis_client
+        self.queue = queue
+
+    def notify(self, callback_url: Optional[str], job_id: str, payload: Dict[str, Any]) -> None:
+        if not callback_url:
+            return
+        task = {"callback_url": callback_url, "job_id": job_id, "payload": payload, "attempts": 0}
+        try:
+            self.redis.lpush(self.queue, json.dumps(task))
+        except Exception:  # noqa: BLE001 - a lost callback must not fail a finished job
+            logger.warning("Could not queue callback for job %s", job_id, exc_info=True)
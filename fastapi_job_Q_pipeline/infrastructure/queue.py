@@ -1,7 +1,18 @@
 from __future__ import annotations
 
+import random
+from typing import Any, Dict, List, Optional
+
 import redis
-from rq import Queue
+from rq import Queue, SimpleWorker, Worker
+
+from core.process_pool import shutdown_process_pool
+from core.routing import PRIORITIES
+
+
+def queue_names(base_name: str) -> Dict[str, str]:
+    # "default" keeps the original queue name so jobs queued before routing still run.
+    return {priority: base_name if priority == "default" else f"{base_name}-{priority}" for priority in PRIORITIES}
 
 
 class RQJobQueue:
@@ -9,7 +20,79 @@ class RQJobQueue:
         self.queue_name = queue_name
         self.redis_client = redis_client
         self.task_path = task_path
+        self._queues = {
+            priority: Queue(name, connection=redis_client) for priority, name in queue_names(queue_name).items()
+        }
+
+    def _queue(self, priority: str) -> Queue:
+        try:
+            return self._queues[priority]
+        except KeyError:
+            raise ValueError(f"Unknown priority '{priority}'") from None
+
+    def enqueue(self, job_id: str, priority: str = "default") -> None:
+        self._queue(priority).enqueue(self.task_path, job_id)
+
+    def enqueue_many(
+        self,
+        job_ids: List[str],
+        pipeline: Optional[Any] = None,
+        priorities: Optional[List[str]] = None,
+    ) -> None:
+        by_priority: Dict[str, List[str]] = {}
+        for job_id, priority in zip(job_ids, priorities or ["default"] * len(job_ids)):
+            by_priority.setdefault(priority, []).append(job_id)
+
+        pipe = pipeline if pipeline is not None else self.redis_client.pipeline()
+        for priority, ids in by_priority.items():
+            self._queue(priority).enqueue_many(
+                [Queue.prepare_data(self.task_path, args=(job_id,)) for job_id in ids],
+                pipeline=pipe,
+            )
+        if pipeline is None:
+            pipe.execute()
+
+    def depth(self) -> int:
+        return sum(queue.count for queue in self._queues.values())
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        priority, _, weight = item.partition("=")
+        weights[priority.strip()] = float(weight)
+    return weights
+
+
+def weighted_queue_order(queues: List[Any], weights: Dict[str, float], rng: Any = random) -> List[Any]:
+    # Weighted shuffle (Efraimidis-Spirakis): a queue leads with probability
+    # proportional to its weight, so "low" is preferred less often but never starved.
+    def key(queue: Any) -> float:
+        weight = weights.get(queue.name, 1.0)
+        return rng.random() ** (1.0 / weight) if weight > 0 else 0.0
+
+    return sorted(queues, key=key, reverse=True)
+
+
+class WeightedOrderMixin:
+    # Reordered after every dequeue; RQ then pops from the first non-empty queue.
+    def __init__(self, *args: Any, queue_weights: Optional[Dict[str, float]] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.queue_weights = queue_weights or {}
+
+    def reorder_queues(self, reference_queue: Any) -> None:
+        self._ordered_queues = weighted_queue_order(self.queues, self.queue_weights)
+
+
+class WeightedWorker(WeightedOrderMixin, Worker):
+    def perform_job(self, job: Any, queue: Queue) -> bool:
+        # Runs in the work horse, which leaves through os._exit: the process pool its
+        # job started is stopped here, as nothing else would.
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            shutdown_process_pool()
+
 
-    def enqueue(self, job_id: str) -> None:
-        queue = Queue(self.queue_name, connection=self.redis_client)
-        queue.enqueue(self.task_path, job_id)
+class WeightedSimpleWorker(WeightedOrderMixin, SimpleWorker):
+    pass
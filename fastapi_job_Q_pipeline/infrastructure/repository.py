@@ -2,34 +2,178 @@ from __future__ import annotations
 
 import json
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import redis
 
+from infrastructure.job_events import status_event
+
+JOB_ENCODINGS = ("json", "msgpack")
+
+# What a status poll needs; everything else stays on the server.
+SUMMARY_FIELDS = ("status", "created_at", "updated_at", "error")
+
+# Kept under their own keys in the msgpack layout so the job hash stays small.
+LARGE_FIELDS = ("pipeline_config", "result", "traceback")
+
+# job_id -> updated_at, written with every job write; drives listing and retention.
+JOBS_INDEX = "jobs:by_updated"
+
 
 class RedisJobRepository:
-    def __init__(self, redis_client: redis.Redis):
+    # "json": one hash of strings per job (needs a decode_responses client).
+    # "msgpack": msgpack values, large fields under job:<id>:<field> (needs a bytes client).
+    def __init__(self, redis_client: redis.Redis, encoding: str = "json", events_channel: Optional[str] = None):
+        if encoding not in JOB_ENCODINGS:
+            raise ValueError(f"Unknown job encoding '{encoding}'")
         self.redis = redis_client
+        self.encoding = encoding
+        # Status changes are published here, in the same round trip as the write.
+        self.events_channel = events_channel
+        self._msgpack: Any = None
+        if encoding == "msgpack":
+            import msgpack
+
+            self._msgpack = msgpack
+
+    def _new_job(self, data: Dict[str, Any], now: int) -> Dict[str, Any]:
+        return {"status": "QUEUED", "created_at": now, "updated_at": now, **data}
 
     def create_job(self, job_id: str, data: Dict[str, Any]) -> None:
+        self._save(job_id, self._new_job(data, int(time.time())))
+
+    def create_jobs(self, jobs: Dict[str, Dict[str, Any]], pipeline: Optional[Any] = None) -> None:
+        pipe = pipeline if pipeline is not None else self.redis.pipeline()
         now = int(time.time())
-        payload = {
-            "status": "QUEUED",
-            "created_at": now,
-            "updated_at": now,
-            **data,
-        }
-        self.redis.hset(f"job:{job_id}", mapping=self._serialize(payload))
+        for job_id, data in jobs.items():
+            self._write(pipe, job_id, self._new_job(data, now))
+            pipe.zadd(JOBS_INDEX, {job_id: now})
+        if pipeline is None:
+            pipe.execute()
+
+    def pipeline(self) -> Any:
+        return self.redis.pipeline(transaction=True)
 
     def update_job(self, job_id: str, data: Dict[str, Any]) -> None:
-        payload = {"updated_at": int(time.time()), **data}
-        self.redis.hset(f"job:{job_id}", mapping=self._serialize(payload))
+        self._save(job_id, {"updated_at": int(time.time()), **data}, publish=True)
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        raw = self.redis.hgetall(f"job:{job_id}")
-        if not raw:
-            return None
-        return self._deserialize(raw)
+        return self.get_jobs([job_id])[0]
+
+    def get_jobs(self, job_ids: List[str], summary: bool = False) -> List[Optional[Dict[str, Any]]]:
+        # One round trip for the whole list; missing jobs come back as None, in order.
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            if summary:
+                pipe.hmget(f"job:{job_id}", SUMMARY_FIELDS)
+            else:
+                pipe.hgetall(f"job:{job_id}")
+                if self.encoding == "msgpack":
+                    pipe.mget([f"job:{job_id}:{field}" for field in LARGE_FIELDS])
+        replies = iter(pipe.execute())
+
+        jobs: List[Optional[Dict[str, Any]]] = []
+        for _ in job_ids:
+            if summary:
+                values = next(replies)
+                raw = {field: value for field, value in zip(SUMMARY_FIELDS, values) if value is not None}
+            else:
+                raw = dict(next(replies))
+                if self.encoding == "msgpack":
+                    large = next(replies)
+                    raw.update(
+                        {field.encode(): value for field, value in zip(LARGE_FIELDS, large) if value is not None}
+                    )
+            jobs.append(self._deserialize(raw) if raw else None)
+        return jobs
+
+    def list_job_ids(self, offset: int = 0, limit: int = 100) -> Tuple[List[str], int]:
+        # Most recently updated first, with the total for pagination.
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrevrange(JOBS_INDEX, offset, offset + limit - 1)
+        pipe.zcard(JOBS_INDEX)
+        job_ids, total = pipe.execute()
+        return [self._text(job_id) for job_id in job_ids], total
+
+    def job_ids_updated_before(self, cutoff: float, offset: int = 0, limit: int = 500) -> List[str]:
+        # Oldest first.
+        job_ids = self.redis.zrangebyscore(JOBS_INDEX, "-inf", cutoff, start=offset, num=limit)
+        return [self._text(job_id) for job_id in job_ids]
+
+    def delete_jobs(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.delete(
+                f"job:{job_id}",
+                f"job:{job_id}:cancel",
+                *(f"job:{job_id}:{field}" for field in LARGE_FIELDS),
+            )
+        pipe.zrem(JOBS_INDEX, *job_ids)
+        pipe.execute()
+
+    def reindex(self, batch: int = 500) -> int:
+        # Backfills the index for jobs written before it existed.
+        indexed = 0
+        job_ids = []
+        for key in self.redis.scan_iter(match="job:*", count=batch):
+            parts = self._text(key).split(":")
+            if len(parts) == 2:
+                job_ids.append(parts[1])
+            if len(job_ids) >= batch:
+                indexed += self._reindex(job_ids)
+                job_ids = []
+        return indexed + self._reindex(job_ids)
+
+    def _reindex(self, job_ids: List[str]) -> int:
+        jobs = self.get_jobs(job_ids, summary=True)
+        scores = {job_id: job.get("updated_at") or 0 for job_id, job in zip(job_ids, jobs) if job}
+        if scores:
+            self.redis.zadd(JOBS_INDEX, scores, nx=True)
+        return len(scores)
+
+    def _text(self, value: Any) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def claim_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int) -> Optional[str]:
+        # SET NX GET (Redis 7+): one atomic round trip, so concurrent duplicates
+        # agree on a single job.
+        existing = self.redis.set(f"dedup:{fingerprint}", job_id, nx=True, ex=ttl_seconds, get=True)
+        return None if existing is None else self._text(existing)
+
+    def set_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int) -> None:
+        self.redis.set(f"dedup:{fingerprint}", job_id, ex=ttl_seconds)
+
+    def request_cancel(self, job_id: str) -> None:
+        # Its own key in both layouts: the worker polls it with a single EXISTS.
+        self.redis.set(f"job:{job_id}:cancel", "1")
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return bool(self.redis.exists(f"job:{job_id}:cancel"))
+
+    def _save(self, job_id: str, payload: Dict[str, Any], publish: bool = False) -> None:
+        publish = publish and self.events_channel is not None and "status" in payload
+        pipe = self.redis.pipeline()
+        self._write(pipe, job_id, payload)
+        pipe.zadd(JOBS_INDEX, {job_id: payload["updated_at"]})
+        if publish:
+            pipe.publish(self.events_channel, status_event(job_id, payload))
+        pipe.execute()
+
+    def _write(self, client: Any, job_id: str, payload: Dict[str, Any]) -> None:
+        if self.encoding == "json":
+            client.hset(f"job:{job_id}", mapping=self._serialize(payload))
+            return
+        small = {}
+        for key, value in payload.items():
+            packed = self._msgpack.packb(value, use_bin_type=True)
+            if key in LARGE_FIELDS:
+                client.set(f"job:{job_id}:{key}", packed)
+            else:
+                small[key] = packed
+        if small:
+            client.hset(f"job:{job_id}", mapping=small)
 
     def _serialize(self, data: Dict[str, Any]) -> Dict[str, str]:
         payload: Dict[str, str] = {}
@@ -42,16 +186,22 @@ class RedisJobRepository:
                 payload[key] = str(value)
         return payload
 
-    def _deserialize(self, data: Dict[str, str]) -> Dict[str, Any]:
+    def _deserialize(self, data: Dict[Any, Any]) -> Dict[str, Any]:
+        if self.encoding == "msgpack":
+            return {
+                (key.decode() if isinstance(key, bytes) else key): self._msgpack.unpackb(value, raw=False)
+                for key, value in data.items()
+            }
+
         payload: Dict[str, Any] = {}
         for key, value in data.items():
             if value == "":
                 payload[key] = None
                 continue
-            if key in {"pipeline_config", "result"}:
+            if key in {"pipeline_config", "result", "checkpoints"}:
                 payload[key] = json.loads(value)
                 continue
-            if key in {"created_at", "updated_at"}:
+            if key in {"created_at", "updated_at", "input_size", "heartbeat_at", "attempts"}:
                 payload[key] = int(value)
                 continue
             payload[key] = value
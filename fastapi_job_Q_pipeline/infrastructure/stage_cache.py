@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+
+
+class LocalStageResultCache:
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            df = pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except Exception:  # noqa: BLE001 - a corrupt entry is just a miss
+            path.unlink(missing_ok=True)
+            return None
+        # mtime doubles as the LRU clock, shared by every worker on this volume.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return df
+
+    def put(self, key: str, value: Any) -> bool:
+        if not isinstance(value, pd.DataFrame):
+            return False
+
+        path = self._path(key)
+        tmp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            # index=None: a RangeIndex is kept as metadata, any other index as columns,
+            # so a hit returns the same frame, partitions and filtered rows included.
+            value.to_parquet(tmp_path, index=None)
+            os.replace(tmp_path, path)
+        except Exception:  # noqa: BLE001 - unsupported column types are not cached
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+        self._evict()
+        return True
+
+    def _evict(self) -> None:
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith(".parquet"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import math
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.settings import settings
+
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "CANCELLED"}
+
+
+def synthetic_workbook(rows: int, columns: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    data: Dict[str, Any] = {}
+    for index in range(columns):
+        kind = index % 3
+        if kind == 0:
+            data[f"num_{index}"] = rng.normal(size=rows).round(4)
+        elif kind == 1:
+            data[f"int_{index}"] = rng.integers(0, 1_000, size=rows)
+        else:
+            data[f"text_{index}"] = rng.choice(["alpha", "beta", "gamma", "delta"], size=rows)
+    buffer = io.BytesIO()
+    pd.DataFrame(data).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    # Nearest-rank percentile.
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def in_process_client(workers: int, storage_dir: str) -> Any:
+    # The API with the in-memory backend: no Redis, no RQ, jobs run on worker threads
+    # of this process. Settings are read when the backend is first built, so this runs
+    # before any request.
+    settings.job_backend = "memory"
+    settings.memory_workers = workers
+    settings.storage_dir = storage_dir
+    # Every synthetic upload is the same file; coalescing would skip the work.
+    settings.dedup_ttl_seconds = 0
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
+
+
+def run_one(client: Any, workbook: bytes, config: Optional[Dict[str, Any]], poll_interval: float) -> Dict[str, Any]:
+    started = time.perf_counter()
+    data = {"config": json.dumps(config)} if config else {}
+    response = client.post("/upload", files={"file": ("load.xlsx", workbook)}, data=data)
+    uploaded = time.perf_counter()
+    if response.status_code != 200:
+        return {"ok": False, "error": f"upload HTTP {response.status_code}"}
+    job_id = response.json()["job_id"]
+
+    while True:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in TERMINAL_STATUSES:
+            break
+        time.sleep(poll_interval)
+    if job["status"] != "COMPLETED":
+        return {"ok": False, "error": job.get("error") or job["status"]}
+
+    result = client.get(f"/jobs/{job_id}/result")
+    finished = time.perf_counter()
+    if result.status_code != 200:
+        return {"ok": False, "error": f"result HTTP {result.status_code}"}
+    return {
+        "ok": True,
+        "upload_seconds": uploaded - started,
+        "end_to_end_seconds": finished - started,
+        "result_bytes": len(result.content),
+    }
+
+
+def run_load(
+    client: Any,
+    workbook: bytes,
+    requests: int,
+    concurrency: int,
+    config: Optional[Dict[str, Any]] = None,
+    poll_interval: float = 0.05,
+) -> Dict[str, Any]:
+    lock = threading.Lock()
+    outcomes: List[Dict[str, Any]] = []
+
+    def one(_: int) -> None:
+        try:
+            outcome = run_one(client, workbook, config, poll_interval)
+        except Exception as exc:  # noqa: BLE001 - counted as a failed request
+            outcome = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        with lock:
+            outcomes.append(outcome)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    completed = [outcome for outcome in outcomes if outcome["ok"]]
+    errors: Dict[str, int] = {}
+    for outcome in outcomes:
+        if not outcome["ok"]:
+            errors[outcome["error"]] = errors.get(outcome["error"], 0) + 1
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "workbook_bytes": len(workbook),
+        "completed": len(completed),
+        "failed": requests - len(completed),
+        "errors": errors,
+        "elapsed_seconds": elapsed,
+        "throughput_jobs_per_second": len(completed) / elapsed if elapsed else None,
+        "upload_latency_seconds": latency_summary([outcome["upload_seconds"] for outcome in completed]),
+        "end_to_end_latency_seconds": latency_summary([outcome["end_to_end_seconds"] for outcome in completed]),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"requests     {report['requests']} (concurrency {report['concurrency']}, workbook {report['workbook_bytes']} B)",
+        f"completed    {report['completed']}  failed {report['failed']}",
+        f"elapsed      {report['elapsed_seconds']:.2f}s",
+        f"throughput   {report['throughput_jobs_per_second'] or 0:.2f} jobs/s",
+    ]
+    for label, key in (("upload", "upload_latency_seconds"), ("end-to-end", "end_to_end_latency_seconds")):
+        stats = report[key]
+        cells = "  ".join(
+            f"{name} {value * 1000:.0f}ms" if value is not None else f"{name} -" for name, value in stats.items()
+        )
+        lines.append(f"{label:<12} {cells}")
+    for error, count in report["errors"].items():
+        lines.append(f"error        {count} x {error}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end load test: upload -> processing -> result download")
+    parser.add_argument("--url", help="Target a running API; by default the API runs in-process on the memory backend.")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=1_000, help="Rows per synthetic workbook.")
+    parser.add_argument("--columns", type=int, default=6, help="Columns per synthetic workbook.")
+    parser.add_argument("--workers", type=int, default=4, help="In-process worker threads (memory backend only).")
+    parser.add_argument("--config", help="Pipeline config JSON sent with every upload.")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON (for CI).")
+    args = parser.parse_args()
+
+    workbook = synthetic_workbook(args.rows, args.columns)
+    config = json.loads(args.config) if args.config else None
+    with tempfile.TemporaryDirectory() as storage_dir:
+        if args.url:
+            import httpx
+
+            # Identical uploads are coalesced unless the target runs with DEDUP_TTL_SECONDS=0.
+            client = httpx.Client(base_url=args.url, timeout=60.0)
+        else:
+            client = in_process_client(args.workers, storage_dir)
+        report = run_load(client, workbook, args.requests, args.concurrency, config, args.poll_interval)
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    if report["failed"]:
+        raise SystemExit(1)
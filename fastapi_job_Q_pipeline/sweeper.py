@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+import threading
+
+from app.dependencies import get_job_repository, get_reaper_service, get_retention_service
+from app.settings import settings
+
+logger = logging.getLogger("retention")
+
+
+def run(interval: float, once: bool) -> None:
+    service = get_retention_service()
+    reaper = get_reaper_service()
+    if reaper is None:
+        logger.info("HEARTBEAT_SECONDS is 0; stale RUNNING jobs will not be reclaimed")
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+
+    while not stopping.is_set():
+        try:
+            reclaimed = reaper.reap() if reaper is not None else 0
+            if reclaimed:
+                logger.info("Reclaimed %d stale RUNNING jobs", reclaimed)
+        except Exception:  # noqa: BLE001 - try again next interval
+            logger.warning("Reaping stale jobs failed", exc_info=True)
+        try:
+            deleted = service.sweep()
+            if deleted:
+                logger.info("Deleted %d expired jobs", deleted)
+        except Exception:  # noqa: BLE001 - try again next interval
+            logger.warning("Retention sweep failed", exc_info=True)
+        if once:
+            return
+        stopping.wait(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reclaims stale RUNNING jobs and deletes expired jobs and their files")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=settings.retention_sweep_interval_seconds,
+        help="Seconds between sweeps.",
+    )
+    parser.add_argument("--once", action="store_true", help="Sweep once and exit.")
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="First add jobs written before the retention index existed.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.reindex:
+        logger.info("Indexed %d jobs", get_job_repository().reindex())
+    run(args.interval, args.once)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import io
+import tempfile
+import unittest
+from typing import Any
+from unittest.mock import Mock, patch
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_admission_controller, get_admission_store, get_submission_service
+from app.main import app
+from app.services import JobProcessingService, JobSubmissionService
+from app.settings import settings
+from core.admission import AdmissionController, AdmissionRejected
+from core.contracts import UploadTooLargeError
+from infrastructure.admission import RedisAdmissionStore
+from infrastructure.file_storage import LocalFileStorage
+from infrastructure.memory import InMemoryAdmissionStore, InMemoryJobQueue, InMemoryJobRepository
+from tests.test_repository import FakeRedis
+
+
+def controller(store: Any = None, depth: int = 0, free: int = 10**12, **limits: Any) -> AdmissionController:
+    queue = Mock()
+    queue.depth.return_value = depth
+    storage = Mock()
+    storage.free_bytes.return_value = free
+    return AdmissionController(store or InMemoryAdmissionStore(), queue, storage, cache_seconds=0, **limits)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_queue_depth_rejects_or_defers_up_to_twice_the_limit(self) -> None:
+        self.assertFalse(controller(depth=9, max_queue_depth=10).check())
+        with self.assertRaises(AdmissionRejected) as rejected:
+            controller(depth=10, max_queue_depth=10).check()
+        self.assertEqual(rejected.exception.retry_after, 30)
+
+        self.assertTrue(controller(depth=15, max_queue_depth=10, overload="defer").check())
+        with self.assertRaises(AdmissionRejected):
+            controller(depth=20, max_queue_depth=10, overload="defer").check()
+
+    def test_backlog_seconds_come_from_recent_rates(self) -> None:
+        store = InMemoryAdmissionStore()
+        # No finished jobs yet: nothing to estimate from, so nothing is refused.
+        store.add_queued("a", 4_000)
+        self.assertFalse(controller(store, max_backlog_seconds=10).check())
+
+        store.record_processed(1_000, 5.0)
+        self.assertEqual(store.seconds_per_byte(), 0.005)
+        with self.assertRaises(AdmissionRejected) as rejected:
+            controller(store, max_backlog_seconds=10).check()
+        # 4,000 bytes at 5ms each is 20s of work, 10s over the limit.
+        self.assertEqual(rejected.exception.retry_after, 10)
+        self.assertFalse(controller(store, max_backlog_seconds=10, parallelism=2).check())
+
+    def test_low_free_storage_always_rejects(self) -> None:
+        with self.assertRaisesRegex(AdmissionRejected, "free storage"):
+            controller(free=10, min_free_bytes=100, overload="defer").check()
+
+    def test_client_quota_is_all_or_nothing(self) -> None:
+        for store in (InMemoryAdmissionStore(), RedisAdmissionStore(FakeRedis())):
+            with self.subTest(store=type(store).__name__):
+                admission = controller(store, client_quota=2)
+                admission.reserve("acme", ["a"])
+                with self.assertRaisesRegex(AdmissionRejected, "At most 2 jobs"):
+                    admission.reserve("acme", ["b", "c"])
+                admission.reserve("other", ["d", "e"])
+
+                admission.release("acme", ["a"])
+                admission.reserve("acme", ["b", "c"])
+
+    def test_nothing_is_wired_with_every_threshold_off(self) -> None:
+        get_admission_controller.cache_clear()
+        self.addCleanup(get_admission_controller.cache_clear)
+        self.assertIsNone(get_admission_store())
+        self.assertIsNone(get_admission_controller())
+
+        with patch.object(settings, "job_backend", "memory"), patch.object(settings, "client_max_jobs", 2):
+            self.assertIsInstance(get_admission_store(), InMemoryAdmissionStore)
+
+    def test_redis_store_tracks_backlog_and_rates(self) -> None:
+        store = RedisAdmissionStore(FakeRedis(), rate_samples=2)
+        store.add_queued("a", 100)
+        store.add_queued("b", 50)
+        store.remove_queued("a")
+        store.remove_queued("a")
+        self.assertEqual(store.backlog_bytes(), 50)
+
+        self.assertIsNone(store.seconds_per_byte())
+        for size, seconds in ((10, 100.0), (100, 1.0), (100, 3.0)):
+            store.record_processed(size, seconds)
+        # Only the newest rate_samples count.
+        self.assertEqual(store.seconds_per_byte(), 0.02)
+
+
+class TestAdmittedSubmissions(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = LocalFileStorage(tmp.name)
+        self.repository = InMemoryJobRepository()
+        self.store = InMemoryAdmissionStore()
+        # Never started: jobs stay in their lanes.
+        self.queue = InMemoryJobQueue()
+
+    def service(self, **limits: Any) -> JobSubmissionService:
+        admission = AdmissionController(self.store, self.queue, self.storage, cache_seconds=0, **limits)
+        return JobSubmissionService(self.repository, self.storage, self.queue, admission=admission)
+
+    def test_deferred_job_goes_to_the_low_lane_and_settles_when_done(self) -> None:
+        self.queue.enqueue_many(["earlier-1", "earlier-2"])
+        service = self.service(max_queue_depth=2, overload="defer", client_quota=1)
+
+        job_id = service.submit("a.xlsx", io.BytesIO(b"abc"), {"priority": "high"}, None, client_id="acme")
+
+        job = self.repository.get_job(job_id)
+        self.assertEqual((job["priority"], job["deferred"], job["client_id"]), ("low", True, "acme"))
+        self.assertEqual(list(self.queue._lanes["low"]), [job_id])
+        self.assertEqual(self.store.backlog_bytes(), 3)
+        with self.assertRaisesRegex(AdmissionRejected, "At most 1 jobs in flight"):
+            service.submit("b.xlsx", io.BytesIO(b"abc"), None, None, client_id="acme")
+
+        self.queue._lanes["low"].popleft()
+        storage = Mock()
+        storage.build_output_path.return_value = "/tmp/out.csv"
+        executor = Mock()
+        executor.run.return_value = {}
+        JobProcessingService(self.repository, storage, executor, Mock(), admission=self.store).process(job_id)
+
+        self.assertEqual(self.store.backlog_bytes(), 0)
+        self.assertIsNotNone(self.store.seconds_per_byte())
+        service.submit("b.xlsx", io.BytesIO(b"abc"), None, None, client_id="acme")
+
+    def test_rejected_or_failed_submission_leaves_nothing_behind(self) -> None:
+        service = self.service(client_quota=2)
+        service.max_upload_bytes = 1
+        with self.assertRaises(UploadTooLargeError):
+            service.submit_many([("a.xlsx", io.BytesIO(b"a")), ("b.xlsx", io.BytesIO(b"bb"))], None, None, "acme")
+        self.assertEqual(self.store.backlog_bytes(), 0)
+        self.assertEqual(self.repository.list_job_ids()[1], 0)
+
+        # The failed batch gave its slots back.
+        service.submit_many([("a.xlsx", io.BytesIO(b"a")), ("b.xlsx", io.BytesIO(b"b"))], None, None, "acme")
+
+    def test_upload_over_the_limit_is_429_with_retry_after(self) -> None:
+        self.queue.enqueue("earlier")
+        service = self.service(max_queue_depth=1, retry_after_seconds=12)
+        app.dependency_overrides[get_submission_service] = lambda: service
+        self.addCleanup(app.dependency_overrides.clear)
+
+        response = TestClient(app).post("/upload", files={"file": ("a.xlsx", b"abc")})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], "12")
+        self.assertEqual(response.json(), {"detail": "Too much work queued"})
+        self.assertEqual(self.repository.list_job_ids()[1], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
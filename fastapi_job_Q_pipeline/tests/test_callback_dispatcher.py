@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import unittest
+from typing import Any, Dict, List, Optional
+from unittest.mock import Mock, patch
+
+import httpx
+
+from app.dependencies import get_processing_service
+from app.settings import settings
+from infrastructure.callback_dispatcher import CallbackDispatcher
+from infrastructure.notifier import QueuedCallbackNotifier
+
+
+class FakeAsyncRedis:
+    def __init__(self) -> None:
+        self.lists: Dict[str, List[str]] = {}
+        self.zsets: Dict[str, Dict[str, float]] = {}
+
+    async def lpush(self, key: str, value: str) -> int:
+        self.lists.setdefault(key, []).insert(0, value)
+        return len(self.lists[key])
+
+    async def lmove(self, source: str, destination: str, src: str, dest: str) -> Optional[str]:
+        items = self.lists.get(source)
+        if not items:
+            return None
+        value = items.pop(0 if src == "LEFT" else -1)
+        target = self.lists.setdefault(destination, [])
+        target.insert(0 if dest == "LEFT" else len(target), value)
+        return value
+
+    async def blmove(self, source: str, destination: str, timeout: float, src: str, dest: str) -> Optional[str]:
+        value = await self.lmove(source, destination, src, dest)
+        if value is None:
+            await asyncio.sleep(0.01)
+        return value
+
+    async def lrem(self, key: str, count: int, value: str) -> int:
+        items = self.lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    async def zadd(self, key: str, mapping: Dict[str, float]) -> int:
+        self.zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def zrangebyscore(self, key: str, low: str, high: float, start: int = 0, num: int = -1) -> List[str]:
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        return [member for member, score in members if score <= high][start : start + num]
+
+    async def zrem(self, key: str, member: str) -> int:
+        return 1 if self.zsets.get(key, {}).pop(member, None) is not None else 0
+
+
+def callback(job_id: str = "job-1", attempts: int = 0) -> str:
+    return json.dumps(
+        {"callback_url": "http://hooks.test/done", "job_id": job_id, "payload": {"status": "COMPLETED"}, "attempts": attempts}
+    )
+
+
+class TestCallbackDispatcher(unittest.TestCase):
+    def dispatcher(self, handler: Any, **kwargs: Any) -> CallbackDispatcher:
+        self.redis = FakeAsyncRedis()
+        self.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return CallbackDispatcher(self.redis, self.http, "callbacks", **kwargs)
+
+    def test_successful_delivery_posts_job_and_payload(self) -> None:
+        seen: List[Any] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(json.loads(request.content))
+            return httpx.Response(204)
+
+        dispatcher = self.dispatcher(handler)
+        asyncio.run(dispatcher.deliver(callback()))
+
+        self.assertEqual(seen, [{"job_id": "job-1", "payload": {"status": "COMPLETED"}}])
+        self.assertEqual(self.redis.zsets.get("callbacks:retry", {}), {})
+        self.assertNotIn("callbacks:dead", self.redis.lists)
+
+    def test_server_error_is_scheduled_for_retry_then_promoted(self) -> None:
+        dispatcher = self.dispatcher(lambda request: httpx.Response(503), base_delay=1.0)
+
+        async def scenario() -> int:
+            await dispatcher.deliver(callback())
+            self.assertEqual(await dispatcher.promote_due(), 0)
+            return await dispatcher.promote_due(now=float("inf"))
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        retried = json.loads(self.redis.lists["callbacks"][0])
+        self.assertEqual(retried["attempts"], 1)
+        self.assertEqual(retried["last_error"], "HTTP 503")
+
+    def test_connection_errors_are_retried(self) -> None:
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused", request=request)
+
+        dispatcher = self.dispatcher(handler)
+        asyncio.run(dispatcher.deliver(callback()))
+
+        self.assertEqual(len(self.redis.zsets["callbacks:retry"]), 1)
+
+    def test_gives_up_to_dead_letter_list(self) -> None:
+        dispatcher = self.dispatcher(lambda request: httpx.Response(500), max_attempts=3)
+        asyncio.run(dispatcher.deliver(callback(attempts=2)))
+
+        dead = json.loads(self.redis.lists["callbacks:dead"][0])
+        self.assertEqual(dead["attempts"], 3)
+        self.assertIn("failed_at", dead)
+        self.assertEqual(self.redis.zsets.get("callbacks:retry", {}), {})
+
+    def test_client_errors_are_not_retried(self) -> None:
+        dispatcher = self.dispatcher(lambda request: httpx.Response(404))
+        asyncio.run(dispatcher.deliver(callback()))
+
+        self.assertEqual(json.loads(self.redis.lists["callbacks:dead"][0])["last_error"], "HTTP 404")
+
+    def test_run_bounds_concurrent_deliveries(self) -> None:
+        active = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return httpx.Response(200)
+
+        dispatcher = self.dispatcher(handler, concurrency=2)
+
+        async def scenario() -> None:
+            for index in range(6):
+                await self.redis.lpush("callbacks", callback(f"job-{index}"))
+            runner = asyncio.create_task(dispatcher.run())
+            while self.redis.lists["callbacks"]:
+                await asyncio.sleep(0.01)
+            dispatcher.stop()
+            await runner
+
+        asyncio.run(scenario())
+        self.assertEqual(peak, 2)
+        self.assertEqual(self.redis.lists["callbacks:processing:dispatcher"], [])
+
+    def test_callbacks_left_in_flight_are_redelivered_oldest_first(self) -> None:
+        delivered: List[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            delivered.append(json.loads(request.content)["job_id"])
+            return httpx.Response(200)
+
+        dispatcher = self.dispatcher(handler, name="a")
+        # A crashed run had taken job-1, then job-2; job-3 was still waiting.
+        self.redis.lists["callbacks:processing:a"] = [callback("job-2"), callback("job-1")]
+        self.redis.lists["callbacks"] = [callback("job-3")]
+
+        async def scenario() -> None:
+            runner = asyncio.create_task(dispatcher.run())
+            while len(delivered) < 3:
+                await asyncio.sleep(0.01)
+            dispatcher.stop()
+            await runner
+
+        asyncio.run(scenario())
+        self.assertEqual(delivered, ["job-1", "job-2", "job-3"])
+        self.assertEqual(self.redis.lists["callbacks:processing:a"], [])
+
+
+class TestQueuedCallbackNotifier(unittest.TestCase):
+    def test_only_queues_the_callback(self) -> None:
+        redis_client = Mock()
+        QueuedCallbackNotifier(redis_client, "callbacks").notify("http://hooks.test/done", "job-1", {"a": 1})
+
+        key, raw = redis_client.lpush.call_args.args
+        self.assertEqual(key, "callbacks")
+        self.assertEqual(json.loads(raw)["callback_url"], "http://hooks.test/done")
+
+    def test_skips_jobs_without_callback_and_swallows_redis_errors(self) -> None:
+        redis_client = Mock()
+        notifier = QueuedCallbackNotifier(redis_client)
+        notifier.notify(None, "job-1", {})
+        redis_client.lpush.assert_not_called()
+
+        redis_client.lpush.side_effect = ConnectionError("down")
+        notifier.notify("http://hooks.test/done", "job-1", {})
+
+    def test_unknown_callback_mode_is_refused(self) -> None:
+        with patch.object(settings, "callback_mode", "inlne"), self.assertRaisesRegex(ValueError, "inlne"):
+            get_processing_service()
+
+
+if __name__ == "__main__":
+    unittest.main()
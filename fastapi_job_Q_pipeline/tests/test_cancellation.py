@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import pickle
+import time
+import unittest
+from typing import Any, Dict, List, Optional
+from unittest.mock import Mock
+
+from app.services import JobCancellationService, JobNotCancellableError, JobProcessingService, JobReaperService
+from core.cancellation import CancellationToken, JobCancelled, StageTimeout, check_cancelled
+from core.interfaces import Stage
+from core.pipeline import Pipeline, PipelineError
+from infrastructure.memory import InMemoryJobRepository
+
+
+class SleepingStage(Stage):
+    # Ignores its token entirely, like a stage stuck in a C call.
+    def __init__(self, name: str, seconds: float, depends_on: Optional[List[str]] = None):
+        self.name = name
+        self.seconds = seconds
+        self.depends_on = depends_on or []
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        time.sleep(self.seconds)
+        return self.name
+
+
+class PollingStage(Stage):
+    name = "polling"
+    depends_on: List[str] = []
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        while True:
+            check_cancelled(context)
+            time.sleep(0.01)
+
+
+class ChunkStage(Stage):
+    name = "chunks"
+    depends_on: List[str] = []
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        return iter(range(5))
+
+
+class ConsumerStage(Stage):
+    name = "consumer"
+    depends_on = ["chunks"]
+
+    def __init__(self, token: CancellationToken):
+        self.token = token
+        self.seen: List[int] = []
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        for chunk in results["chunks"]:
+            self.seen.append(chunk)
+            self.token.cancel("stop")
+        return self.seen
+
+
+class TestCancellationToken(unittest.TestCase):
+    def test_children_see_parent_cancellation_and_their_own_deadline(self) -> None:
+        flag = {"set": False}
+        job = CancellationToken(poll=lambda: flag["set"], poll_seconds=0)
+        stage = job.child("stage1", timeout=0.05)
+        stage.check()
+
+        time.sleep(0.06)
+        with self.assertRaises(StageTimeout):
+            stage.check()
+
+        flag["set"] = True
+        with self.assertRaisesRegex(JobCancelled, "Job cancelled"):
+            job.child("stage2").check()
+
+    def test_pickled_token_keeps_its_deadline_but_not_its_parent(self) -> None:
+        stage = CancellationToken().child("stage2", timeout=60)
+        copy = pickle.loads(pickle.dumps(stage))
+        self.assertEqual((copy.stage, copy.deadline), ("stage2", stage.deadline))
+        self.assertIsNone(copy.parent)
+        copy.check()
+
+
+class TestPipelineCancellation(unittest.TestCase):
+    def test_thread_stage_past_its_timeout_is_abandoned(self) -> None:
+        pipeline = Pipeline({"slow": SleepingStage("slow", 2)}, abandon_grace_seconds=0)
+        self.addCleanup(pipeline.close)
+        started = time.perf_counter()
+        with self.assertRaisesRegex(StageTimeout, "'slow' exceeded its 0.2s timeout"):
+            pipeline.run({"input_path": "x"}, ["slow"], timeouts={"slow": 0.2})
+        self.assertLess(time.perf_counter() - started, 1.5)
+
+    def test_cooperative_stage_stops_when_the_job_is_cancelled(self) -> None:
+        pipeline = Pipeline({"polling": PollingStage()})
+        self.addCleanup(pipeline.close)
+        token = CancellationToken()
+        token.cancel("user asked")
+        with self.assertRaisesRegex(JobCancelled, "user asked"):
+            pipeline.run({"input_path": "x"}, ["polling"], cancellation=token)
+
+        polls = iter([False, False, True])
+        token = CancellationToken(poll=lambda: next(polls, True), poll_seconds=0)
+        with self.assertRaises(JobCancelled):
+            pipeline.run({"input_path": "x"}, ["polling"], cancellation=token)
+
+    def test_streamed_input_is_checked_between_chunks(self) -> None:
+        token = CancellationToken()
+        consumer = ConsumerStage(token)
+        pipeline = Pipeline({"chunks": ChunkStage(), "consumer": consumer})
+        self.addCleanup(pipeline.close)
+        with self.assertRaisesRegex(JobCancelled, "stop"):
+            pipeline.run({"input_path": "x"}, ["chunks", "consumer"], cancellation=token)
+        self.assertEqual(consumer.seen, [0])
+
+    def test_overrunning_process_stage_is_killed_and_the_pool_replaced(self) -> None:
+        stages = {"stuck": SleepingStage("stuck", 30), "quick": SleepingStage("quick", 0)}
+        pipeline = Pipeline(stages, abandon_grace_seconds=5)
+        self.addCleanup(pipeline.close)
+        started = time.perf_counter()
+        with self.assertRaises(StageTimeout):
+            pipeline.run({"input_path": "x"}, ["stuck"], execution_modes={"stuck": "process"}, timeouts={"stuck": 0.5})
+        self.assertLess(time.perf_counter() - started, 10)
+
+        results = pipeline.run({"input_path": "x"}, ["quick"], execution_modes={"quick": "process"})
+        self.assertEqual(results, {"quick": "quick"})
+
+    def test_unknown_or_invalid_timeouts_are_rejected(self) -> None:
+        pipeline = Pipeline({"slow": SleepingStage("slow", 0)})
+        self.addCleanup(pipeline.close)
+        for timeouts in ({"other": 1}, {"slow": 0}):
+            with self.subTest(timeouts=timeouts), self.assertRaises(PipelineError):
+                pipeline.run({"input_path": "x"}, ["slow"], timeouts=timeouts)
+
+
+class TestJobCancellation(unittest.TestCase):
+    def setUp(self) -> None:
+        self.repository = InMemoryJobRepository()
+        self.service = JobCancellationService(self.repository)
+
+    def test_queued_job_is_cancelled_and_then_skipped(self) -> None:
+        self.repository.create_job("job", {"input_path": "/in.xlsx"})
+        self.assertEqual(self.service.cancel("job"), "CANCELLED")
+
+        executor = Mock()
+        JobProcessingService(self.repository, Mock(), executor, Mock()).process("job")
+        executor.run.assert_not_called()
+        self.assertEqual(self.repository.get_job("job")["status"], "CANCELLED")
+
+        with self.assertRaises(JobNotCancellableError):
+            self.service.cancel("job")
+
+    def test_running_job_stops_at_its_next_check(self) -> None:
+        self.repository.create_job("job", {"input_path": "/in.xlsx", "callback_url": "https://x"})
+        storage = Mock()
+        storage.build_output_path.return_value = "/tmp/out.csv"
+        notifier = Mock()
+        executor = Mock()
+
+        def run(**kwargs: Any) -> Dict[str, Any]:
+            self.assertEqual(self.service.cancel("job"), "RUNNING")
+            kwargs["cancellation"].check()
+            return {}
+
+        executor.run.side_effect = run
+        JobProcessingService(self.repository, storage, executor, notifier, cancel_poll_seconds=0).process("job")
+
+        job = self.repository.get_job("job")
+        self.assertEqual((job["status"], job["error"]), ("CANCELLED", "Job cancelled"))
+        notifier.notify.assert_called_once_with("https://x", "job", {"status": "CANCELLED", "error": "Job cancelled"})
+
+    def test_reaper_cancels_instead_of_requeueing(self) -> None:
+        self.repository.create_job("job", {})
+        self.repository.update_job("job", {"status": "RUNNING"})
+        self.repository.request_cancel("job")
+        queue = Mock()
+
+        JobReaperService(self.repository, queue, stale_seconds=0).reap(now=time.time() + 10)
+
+        queue.enqueue.assert_not_called()
+        self.assertEqual(self.repository.get_job("job")["status"], "CANCELLED")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Any, Dict
+from unittest.mock import Mock, patch
+
+import pandas as pd
+
+from app.services import JobProcessingService, JobReaperService
+from infrastructure.checkpoints import JobCheckpointStore
+from infrastructure.file_storage import LocalFileStorage
+from infrastructure.memory import InMemoryJobRepository
+from infrastructure.stage_cache import LocalStageResultCache
+
+
+class TestJobCheckpointStore(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base_dir = tmp.name
+        self.repository = InMemoryJobRepository()
+        self.repository.create_job("job", {})
+
+    def test_saved_stage_is_restored_while_its_key_matches(self) -> None:
+        store = JobCheckpointStore(self.repository, self.base_dir, "job")
+        frame = pd.DataFrame({"a": [1, 2, 3]})
+
+        self.assertTrue(store.put("stage1", "key-1", frame))
+        self.assertFalse(store.put("stage3", "key-3", "/out.csv"))
+
+        saved = self.repository.get_job("job")["checkpoints"]
+        self.assertEqual((saved["stage1"]["key"], saved["stage1"]["rows"]), ("key-1", 3))
+
+        resumed = JobCheckpointStore(self.repository, self.base_dir, "job", saved)
+        pd.testing.assert_frame_equal(resumed.get("stage1", "key-1"), frame)
+        self.assertIsNone(resumed.get("stage1", "key-2"))
+
+        Path(saved["stage1"]["path"]).write_bytes(b"torn")
+        self.assertIsNone(resumed.get("stage1", "key-1"))
+
+        resumed.clear()
+        self.assertFalse((Path(self.base_dir) / "job").exists())
+
+    def test_saved_frames_keep_their_index(self) -> None:
+        frame = pd.DataFrame({"a": [1, 2, 3]}, index=[5, 7, 9])
+        store = JobCheckpointStore(self.repository, self.base_dir, "job")
+        cache = LocalStageResultCache(str(Path(self.base_dir) / "cache"), max_bytes=10**9)
+
+        store.put("stage2", "key", frame)
+        cache.put("key", frame)
+
+        pd.testing.assert_frame_equal(store.get("stage2", "key"), frame)
+        pd.testing.assert_frame_equal(cache.get("key"), frame)
+
+
+class TestCheckpointedProcessing(unittest.TestCase):
+    def test_completed_job_drops_checkpoints_and_reports_restored_stages(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            repository = InMemoryJobRepository()
+            repository.create_job("job", {"input_path": "/in.xlsx", "checkpoints": {"stage1": {"key": "k"}}})
+            storage = LocalFileStorage(tmp)
+            executor = Mock()
+
+            def run(context: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+                self.assertEqual(kwargs["checkpoint"].saved, {"stage1": {"key": "k"}})
+                context["restored_stages"] = ["stage1"]
+                return {"stage1": None, "stage2": None, "stage3": context["output_path"]}
+
+            executor.run.side_effect = run
+            stores = []
+
+            def checkpoints(job_id: str, saved: Any) -> JobCheckpointStore:
+                stores.append(JobCheckpointStore(repository, storage.checkpoint_dir(), job_id, saved))
+                return stores[-1]
+
+            service = JobProcessingService(repository, storage, executor, Mock(), checkpoints=checkpoints)
+            service.process("job")
+
+            job = repository.get_job("job")
+            self.assertEqual(job["status"], "COMPLETED")
+            self.assertEqual(job["result"]["restored_stages"], ["stage1"])
+            self.assertIsNone(job["checkpoints"])
+            self.assertEqual(stores[0].saved, {})
+
+            # A second delivery of the same job is a no-op.
+            service.process("job")
+            self.assertEqual(executor.run.call_count, 1)
+
+    def test_heartbeat_refreshes_running_jobs(self) -> None:
+        repository = InMemoryJobRepository()
+        repository.create_job("job", {"input_path": "/in.xlsx"})
+        executor = Mock()
+        beats = []
+        update_job = repository.update_job
+
+        def record(job_id: str, data: Dict[str, Any]) -> None:
+            if "heartbeat_at" in data and "status" not in data:
+                beats.append(data["heartbeat_at"])
+            update_job(job_id, data)
+
+        repository.update_job = record  # type: ignore[method-assign]
+        executor.run.side_effect = lambda **kwargs: time.sleep(0.1) or {}
+        storage = Mock()
+        storage.build_output_path.return_value = "/tmp/out.csv"
+
+        JobProcessingService(repository, storage, executor, Mock(), heartbeat_seconds=0.02).process("job")
+
+        self.assertGreaterEqual(len(beats), 2)
+        self.assertEqual(repository.get_job("job")["status"], "COMPLETED")
+
+    def test_job_with_a_fresh_heartbeat_is_left_to_its_worker(self) -> None:
+        repository = InMemoryJobRepository()
+        repository.create_job("job", {"input_path": "/in.xlsx"})
+        repository.update_job("job", {"status": "RUNNING", "heartbeat_at": int(time.time())})
+        executor = Mock()
+
+        service = JobProcessingService(repository, Mock(), executor, Mock(), heartbeat_seconds=30, stale_seconds=300)
+        service.process("job")
+        executor.run.assert_not_called()
+
+        repository.update_job("job", {"heartbeat_at": int(time.time()) - 600})
+        executor.run.return_value = {}
+        service.process("job")
+        executor.run.assert_called_once()
+
+
+class TestJobReaperService(unittest.TestCase):
+    def test_stale_running_jobs_are_requeued_then_failed(self) -> None:
+        repository = InMemoryJobRepository()
+        queue = Mock()
+        with patch("infrastructure.memory.time.time", return_value=100):
+            repository.create_jobs({"stale": {"priority": "low"}, "queued": {}, "fresh": {}})
+            repository.update_job("stale", {"status": "RUNNING"})
+        with patch("infrastructure.memory.time.time", return_value=950):
+            repository.update_job("fresh", {"status": "RUNNING"})
+
+        reaper = JobReaperService(repository, queue, stale_seconds=300, max_attempts=1, batch_size=1)
+        with patch("infrastructure.memory.time.time", return_value=1000):
+            self.assertEqual(reaper.reap(now=1000), 1)
+
+        queue.enqueue.assert_called_once_with("stale", "low")
+        stale = repository.get_job("stale")
+        self.assertEqual((stale["status"], stale["attempts"]), ("QUEUED", 1))
+        self.assertEqual(repository.get_job("queued")["status"], "QUEUED")
+
+        repository.update_job("stale", {"status": "RUNNING"})
+        self.assertEqual(reaper.reap(now=time.time() + 1000), 2)
+        self.assertEqual(repository.get_job("stale")["status"], "FAILED")
+        self.assertEqual(queue.enqueue.call_args.args[0], "fresh")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import gzip
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_query_service
+from app.main import app
+from app.responses import RangeNotSatisfiable, parse_range
+from app.services import JobQueryService
+from core.encodings import compress_output, negotiate_encoding
+from infrastructure.memory import InMemoryJobRepository
+
+
+class TestEncodings(unittest.TestCase):
+    def test_negotiation_honours_q_values_and_server_preference(self) -> None:
+        with patch("core.encodings.available_encodings", return_value=["zstd", "gzip"]):
+            self.assertEqual(negotiate_encoding("gzip, zstd"), "zstd")
+            self.assertEqual(negotiate_encoding("zstd;q=0.5, gzip"), "gzip")
+            self.assertEqual(negotiate_encoding("*, zstd;q=0"), "gzip")
+        with patch("core.encodings.available_encodings", return_value=["gzip"]):
+            self.assertIsNone(negotiate_encoding("zstd, br"))
+        self.assertIsNone(negotiate_encoding(None))
+        self.assertIsNone(negotiate_encoding("identity"))
+
+    def test_compressed_copy_is_made_once_and_refreshed_when_stale(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "output.csv")
+            with open(path, "w") as f:
+                f.write("a,b\n" * 1000)
+
+            target = compress_output(path, "gzip")
+            with gzip.open(target, "rt") as f:
+                self.assertEqual(f.read(), "a,b\n" * 1000)
+            self.assertLess(os.path.getsize(target), os.path.getsize(path))
+
+            os.utime(target, (0, os.path.getmtime(path) + 10))
+            stamp = os.path.getmtime(target)
+            compress_output(path, "gzip")
+            self.assertEqual(os.path.getmtime(target), stamp)
+
+            os.utime(target, (0, 0))
+            compress_output(path, "gzip")
+            self.assertGreater(os.path.getmtime(target), 0)
+
+    def test_parse_range(self) -> None:
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=95-200", 100), (95, 99))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertIsNone(parse_range("items=0-1", 100))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=100-", 100)
+
+
+class TestResultDownload(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "output_job.csv")
+        self.body = b"".join(f"{i},{i * 2}\n".encode() for i in range(2000))
+        with open(self.path, "wb") as f:
+            f.write(self.body)
+        repository = InMemoryJobRepository()
+        repository.create_job("job", {})
+        repository.update_job("job", {"status": "COMPLETED", "result": {"output_path": self.path, "output_format": "csv"}})
+        app.dependency_overrides[get_query_service] = lambda: JobQueryService(repository)
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+
+    def get(self, **headers: str):
+        return self.client.get("/jobs/job/result", headers={"Accept-Encoding": "identity", **headers})
+
+    def test_full_download_advertises_ranges(self) -> None:
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.body)
+        self.assertEqual(response.headers["accept-ranges"], "bytes")
+        self.assertIn("etag", response.headers)
+
+    def test_range_resumes_a_download(self) -> None:
+        etag = self.get().headers["etag"]
+
+        response = self.get(Range="bytes=100-199", **{"If-Range": etag})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.body[100:200])
+        self.assertEqual(response.headers["content-range"], f"bytes 100-199/{len(self.body)}")
+
+        stale = self.get(Range="bytes=100-199", **{"If-Range": '"old"'})
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.content, self.body)
+
+        self.assertEqual(self.get(Range=f"bytes={len(self.body)}-").status_code, 416)
+
+    def test_gzip_variant_is_served_and_cached(self) -> None:
+        response = self.client.get("/jobs/job/result", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.content, self.body)
+        self.assertTrue(os.path.exists(self.path + ".gz"))
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+
+        raw = self.client.get(
+            "/jobs/job/result", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-1"}
+        )
+        self.assertEqual(raw.status_code, 206)
+        self.assertEqual(raw.headers["content-range"].split("/")[1], str(os.path.getsize(self.path + ".gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from benchmark_readers import recommended_order, write_synthetic_workbook
+from core import excel_readers
+from core.excel_readers import UnknownReaderError, parse_readers, read_excel, readers_for
+
+
+class TestExcelReaders(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_preferences_are_validated_and_end_with_pandas(self) -> None:
+        self.assertEqual(parse_readers(" openpyxl_stream, PANDAS "), ("openpyxl_stream", "pandas"))
+        self.assertEqual(parse_readers(""), excel_readers.DEFAULT_READERS)
+        with self.assertRaises(UnknownReaderError):
+            parse_readers("fastest")
+
+        self.assertEqual(readers_for("a.xlsx", ["openpyxl_stream"]), ["openpyxl_stream", "pandas"])
+        # The streaming reader cannot open legacy .xls files.
+        self.assertEqual(readers_for("a.xls", ["openpyxl_stream"]), ["pandas"])
+
+    def test_streaming_reader_matches_pandas(self) -> None:
+        path = self.dir / "synthetic.xlsx"
+        self.assertEqual(write_synthetic_workbook(path, rows=300, columns=4), 1)
+
+        streamed = read_excel(str(path), 0, ["openpyxl_stream"])
+        pd.testing.assert_frame_equal(streamed, pd.read_excel(path), check_dtype=False)
+        self.assertEqual(list(streamed.columns), ["num_0", "int_1", "text_2", "date_3"])
+
+    def test_failing_reader_falls_back_to_the_next(self) -> None:
+        path = self.dir / "book.xlsx"
+        pd.DataFrame({"a": [1, 2]}).to_excel(path, index=False)
+
+        def broken(path: str, sheet: object) -> pd.DataFrame:
+            raise RuntimeError("engine quirk")
+
+        readers = dict(excel_readers.READERS)
+        readers["openpyxl_stream"] = (broken, {".xlsx"}, lambda: True)
+        with patch.object(excel_readers, "READERS", readers):
+            with self.assertLogs("core.excel_readers", "WARNING"):
+                df = read_excel(str(path), 0, ["openpyxl_stream"])
+        self.assertEqual(df["a"].tolist(), [1, 2])
+
+    def test_recommended_order_ranks_by_total_time(self) -> None:
+        results = [
+            {"rows": 10, "reader": "pandas", "seconds": 2.0},
+            {"rows": 10, "reader": "openpyxl_stream", "seconds": 1.5},
+            {"rows": 10, "reader": "calamine", "error": "ImportError"},
+            {"rows": 20, "reader": "pandas", "seconds": 4.0},
+            {"rows": 20, "reader": "openpyxl_stream", "seconds": 3.0},
+        ]
+        self.assertEqual(recommended_order(results), ["openpyxl_stream", "pandas"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import unittest
+
+import pandas as pd
+
+from core.expressions import ExpressionError, apply_transforms, compile_expression
+
+
+class TestExpressions(unittest.TestCase):
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "price": [10.0, 2.5, None],
+                "qty": [3, 0, 4],
+                "name": [" apple ", "Pear", "fig"],
+                "region": ["EU", "US", "APAC"],
+            }
+        )
+
+    def test_transforms_run_in_order_over_whole_columns(self) -> None:
+        df = apply_transforms(
+            self.frame(),
+            [
+                {"column": "total", "expression": "coalesce(price, 0) * qty"},
+                {"column": "band", "expression": "'big' if total >= 10 else 'small'"},
+                {"column": "label", "expression": "concat(upper(strip(name)), '-', str(qty))"},
+                {"column": "local", "expression": "region in ['EU', 'US'] and not isnull(price)"},
+                {"column": "qty_f", "expression": "float(qty) / 2"},
+            ],
+        )
+
+        self.assertEqual(df["total"].tolist(), [30.0, 0.0, 0.0])
+        self.assertEqual(df["band"].tolist(), ["big", "small", "small"])
+        self.assertEqual(df["label"].tolist(), ["APPLE-3", "PEAR-0", "FIG-4"])
+        self.assertEqual(df["local"].tolist(), [True, True, False])
+        self.assertEqual(df["qty_f"].tolist(), [1.5, 0.0, 2.0])
+
+    def test_chained_comparison_and_functions(self) -> None:
+        df = self.frame()
+
+        self.assertEqual(compile_expression("0 < qty <= 3")(df).tolist(), [True, False, False])
+        self.assertEqual(compile_expression("greatest(qty, 2)")(df).tolist(), [3, 2, 4])
+        self.assertEqual(compile_expression("substr(col('region'), 0, 1)")(df).tolist(), ["E", "U", "A"])
+
+    def test_unsupported_syntax_is_rejected_at_compile_time(self) -> None:
+        for source in ["__import__('os')", "price.__class__", "[x for x in qty]", "lambda: 1", "qty +"]:
+            with self.subTest(source=source), self.assertRaises(ExpressionError):
+                compile_expression(source)
+
+    def test_oversized_constant_arithmetic_is_refused_at_compile_time(self) -> None:
+        for source in ("9 ** 9 ** 8", "'a' * 10 ** 9", "qty + 2 ** 100000", "10 ** 4000 * 10 ** 4000"):
+            with self.subTest(source=source), self.assertRaises(ExpressionError):
+                compile_expression(source)
+
+        df = apply_transforms(self.frame(), [{"column": "scaled", "expression": "qty * 2 ** 10 - -1"}])
+        self.assertEqual(df["scaled"].tolist(), [3073, 1, 4097])
+        with self.assertRaises(ExpressionError):
+            apply_transforms(self.frame(), [{"column": "long", "expression": "region * 10 ** 6"}])
+
+    def test_column_arithmetic_is_capped_against_the_data(self) -> None:
+        df = self.frame().assign(
+            times=[2, 1, 10**6],
+            boxed=pd.Series([2, 3, 4], dtype=object),
+        )
+
+        repeated = apply_transforms(df.head(2).copy(), [{"column": "r", "expression": "region * times"}])
+        self.assertEqual(repeated["r"].tolist(), ["EUEU", "US"])
+        # One row repeated a million times is refused, whichever side the column is on.
+        for source in ("region * times", "times * region", "'ab' * times"):
+            with self.subTest(source=source), self.assertRaisesRegex(ExpressionError, "Repeated string"):
+                apply_transforms(df.copy(), [{"column": "r", "expression": source}])
+
+        # Object columns are raised to a power as numpy numbers, not Python bigints.
+        powered = apply_transforms(df.copy(), [{"column": "p", "expression": "boxed ** 50"}])
+        self.assertNotEqual(powered["p"].dtype, object)
+
+    def test_type_errors_against_the_data_are_expression_errors(self) -> None:
+        for source in ("'x' * qty", "region ** 2", "region - qty"):
+            with self.subTest(source=source), self.assertRaisesRegex(ExpressionError, "Transform for 'r' failed"):
+                apply_transforms(self.frame(), [{"column": "r", "expression": source}])
+
+    def test_unknown_column_names_the_transform(self) -> None:
+        with self.assertRaisesRegex(ExpressionError, "missing"):
+            apply_transforms(self.frame(), [{"column": "x", "expression": "missing + 1"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_submission_service
+from app.main import app
+from app.settings import settings
+from core.contracts import UploadTooLargeError
+from infrastructure.file_storage import LocalFileStorage
+
+
+class TestLocalFileStorage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.storage = LocalFileStorage(self.tmp.name)
+
+    def test_save_upload_streams_and_hashes(self) -> None:
+        content = os.urandom(3 * 1024 * 1024 + 17)
+
+        upload = self.storage.save_upload("book.xlsx", io.BytesIO(content), max_bytes=len(content))
+
+        self.assertTrue(upload["path"].endswith(".xlsx"))
+        self.assertEqual(upload["size"], len(content))
+        self.assertEqual(upload["sha256"], hashlib.sha256(content).hexdigest())
+        with open(upload["path"], "rb") as f:
+            self.assertEqual(f.read(), content)
+
+    def test_oversized_upload_is_aborted_and_removed(self) -> None:
+        with self.assertRaises(UploadTooLargeError):
+            self.storage.save_upload("book.xlsx", io.BytesIO(b"x" * 2048), max_bytes=1024)
+
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+
+class TestUploadSizeLimits(unittest.TestCase):
+    def setUp(self) -> None:
+        self.service = Mock()
+        app.dependency_overrides[get_submission_service] = lambda: self.service
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+
+    def test_declared_oversized_batches_are_refused_before_the_body_is_read(self) -> None:
+        files = [("files", (f"{i}.xlsx", b"x" * 50 * 1024)) for i in range(3)]
+        with patch.object(settings, "max_batch_upload_bytes", 64 * 1024), patch.object(settings, "max_upload_bytes", 1):
+            batch = self.client.post("/upload/batch", files=files)
+            single = self.client.post("/upload", files={"file": ("a.xlsx", b"x" * 70 * 1024)})
+
+        self.assertEqual(batch.status_code, 413)
+        self.assertEqual(single.status_code, 413)
+        self.service.submit_many.assert_not_called()
+        self.service.submit.assert_not_called()
+
+        self.service.submit_many.return_value = ["a", "b"]
+        with patch.object(settings, "max_batch_upload_bytes", 64 * 1024):
+            accepted = self.client.post("/upload/batch", files=files[:2])
+        self.assertEqual(accepted.status_code, 200)
+        self.assertEqual(accepted.json()["job_ids"], ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
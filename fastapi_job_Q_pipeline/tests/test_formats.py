@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from core.formats import OutputFormatError, negotiate_format, read_frame, write_chunks
+from core.stages import Stage3WriteOutput
+
+
+class TestOutputFormats(unittest.TestCase):
+    def test_stage3_writes_streamed_chunks_in_each_format(self) -> None:
+        chunks = [pd.DataFrame({"n": [i, i + 1], "s": ["a", "b"]}) for i in (0, 2)]
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt in ("csv", "parquet", "arrow"):
+                with self.subTest(fmt=fmt):
+                    path = os.path.join(tmp, f"out.{fmt}")
+                    context = {"output_path": path, "output_format": fmt}
+                    Stage3WriteOutput().run(context, {"stage2": iter(chunks)})
+
+                    df = read_frame(path, fmt)
+                    self.assertEqual(df["n"].tolist(), [0, 1, 2, 3])
+                    self.assertEqual(df["s"].tolist(), ["a", "b", "a", "b"])
+
+    def test_columnar_formats_widen_the_schema_across_uneven_chunks(self) -> None:
+        chunks = [
+            pd.DataFrame({"late": [None, None], "count": [1, 2], "mixed": [1, 2]}),
+            pd.DataFrame({"late": ["x", None], "count": [3, None], "mixed": ["a", "b"]}),
+            pd.DataFrame({"late": [None, "y"], "count": [5, 6], "mixed": [3, 4]}),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt in ("parquet", "arrow"):
+                with self.subTest(fmt=fmt):
+                    path = os.path.join(tmp, f"out.{fmt}")
+                    write_chunks(iter(chunks), path, fmt)
+
+                    df = read_frame(path, fmt)
+                    self.assertEqual(df["late"].tolist(), [None, None, "x", None, None, "y"])
+                    self.assertEqual(df["count"].tolist()[:3], [1.0, 2.0, 3.0])
+                    self.assertTrue(pd.isna(df["count"][3]))
+                    self.assertEqual(df["count"].dtype, "float64")
+                    self.assertEqual(df["mixed"].tolist(), ["1", "2", "a", "b", "3", "4"])
+                    self.assertEqual(os.listdir(tmp).count(f"out.{fmt}"), 1)
+                    self.assertFalse([name for name in os.listdir(tmp) if name.endswith(".prev")])
+
+    def test_accept_header_negotiation(self) -> None:
+        self.assertIsNone(negotiate_format(None))
+        self.assertIsNone(negotiate_format("*/*"))
+        self.assertEqual(negotiate_format("application/vnd.apache.parquet"), "parquet")
+        self.assertEqual(negotiate_format("text/csv;q=0.5, application/vnd.apache.arrow.file"), "arrow")
+        self.assertEqual(negotiate_format("image/png, text/csv;q=0.1"), "csv")
+        with self.assertRaises(OutputFormatError):
+            negotiate_format("application/json, text/csv;q=0")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+import pandas as pd
+from openpyxl import Workbook
+
+from core.excel_readers import sheet_names
+from core.ingest import extract_workbooks, list_sources
+from core.stages import Stage1LoadAndNormalize
+
+
+def write_workbook(path: Path, sheets: Dict[str, pd.DataFrame]) -> str:
+    with pd.ExcelWriter(path) as writer:
+        for name, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=name, index=False)
+    return str(path)
+
+
+# Run in a fresh interpreter standing in for the worker supervisor: it forks a child,
+# as supervise() does, and the child reads the sheets.
+FORKED_READ = """
+import json, multiprocessing, sys
+from unittest import mock
+from core import ingest
+from core.process_pool import shutdown_process_pool
+
+def read(sources, conn):
+    used_pool = []
+    real_pool = ingest.shared_process_pool
+
+    def recording_pool(*args, **kwargs):
+        used_pool.append(True)
+        return real_pool(*args, **kwargs)
+
+    try:
+        with mock.patch.object(ingest, "shared_process_pool", recording_pool):
+            read = ingest.read_sources(sources)
+    finally:
+        # Pool workers are non-daemon children: the child cannot exit while they run.
+        shutdown_process_pool()
+    conn.send({"used_pool": bool(used_pool), "names": [name for _, name in read]})
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context("fork")
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=read, args=(json.loads(sys.argv[1]), child))
+    process.start()
+    child.close()
+    print(json.dumps(parent.recv() if parent.poll(60) else None))
+    process.join(30)
+"""
+
+
+class TestStage1Ingest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.workbook = write_workbook(
+            self.dir / "book.xlsx",
+            {"north": pd.DataFrame({"a": [1, 2]}), "south": pd.DataFrame({"a": [3, 4, 5]})},
+        )
+        self.stage = Stage1LoadAndNormalize()
+
+    def test_default_mode_reads_the_first_sheet_untagged(self) -> None:
+        df = self.stage.run({"input_path": self.workbook}, {})
+        self.assertEqual(list(df.columns), ["a", "_row_id"])
+        self.assertEqual(df["a"].tolist(), [1, 2])
+
+    def test_all_sheets_are_concatenated_and_tagged(self) -> None:
+        df = self.stage.run({"input_path": self.workbook, "ingest": "all_sheets"}, {})
+        self.assertEqual(df["a"].tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(df["_source_sheet"].tolist(), ["north"] * 2 + ["south"] * 3)
+        self.assertEqual(df["_row_id"].tolist(), [1, 2, 3, 4, 5])
+        self.assertNotIn("_source_file", df.columns)
+
+        chunks = list(self.stage.run({"input_path": self.workbook, "ingest": "all_sheets", "chunk_size": 2}, {}))
+        streamed = pd.concat(chunks, ignore_index=True)
+        self.assertEqual(streamed["_source_sheet"].tolist(), df["_source_sheet"].tolist())
+        # The same categorical in every chunk as in the whole read, so they concat as one.
+        self.assertEqual({chunk["_source_sheet"].dtype for chunk in chunks}, {df["_source_sheet"].dtype})
+        self.assertEqual(streamed["_source_sheet"].dtype, df["_source_sheet"].dtype)
+        self.assertEqual(streamed["_row_id"].tolist(), [1, 2, 3, 4, 5])
+
+    def test_streamed_chunks_match_a_whole_read(self) -> None:
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["id", "amount", "amount", "note", "ratio"])
+        for i in range(7):
+            # Later chunks see a column only blank, or only whole numbers, where the
+            # first chunk saw decimals.
+            sheet.append([i, i * 10, i * 2.5, f"n{i}", 0.5 if i < 2 else (None if i < 4 else i)])
+        path = str(self.dir / "typed.xlsx")
+        workbook.save(path)
+
+        whole = self.stage.run({"input_path": path}, {})
+        chunks = list(self.stage.run({"input_path": path, "chunk_size": 2}, {}))
+
+        self.assertEqual(list(whole.columns[:3]), ["id", "amount", "amount.1"])
+        for chunk in chunks:
+            self.assertEqual(chunk.dtypes.to_dict(), whole.dtypes.to_dict())
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole)
+
+    def test_zip_reads_every_workbook(self) -> None:
+        other = write_workbook(self.dir / "other.xlsx", {"only": pd.DataFrame({"a": [9]})})
+        archive = self.dir / "batch.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.write(self.workbook, "q1/book.xlsx")
+            zf.write(other, "../other.xlsx")
+            zf.writestr("notes.txt", "ignored")
+
+        df = self.stage.run({"input_path": str(archive)}, {})
+        self.assertEqual(df["a"].tolist(), [1, 2, 9])
+        self.assertEqual(df["_source_file"].tolist(), ["q1/book.xlsx"] * 2 + ["../other.xlsx"])
+        self.assertEqual(df["_source_sheet"].tolist(), ["north", "north", "only"])
+
+        df = self.stage.run({"input_path": str(archive), "ingest": "all_sheets"}, {})
+        self.assertEqual(df["a"].tolist(), [1, 2, 3, 4, 5, 9])
+
+        target = self.dir / "extracted"
+        target.mkdir()
+        extracted = extract_workbooks(str(archive), str(target))
+        self.assertTrue(all(Path(path).parent == target for _, path in extracted))
+
+    def test_a_forked_worker_child_still_reads_on_the_pool(self) -> None:
+        sources = list_sources([("book.xlsx", self.workbook)], "all_sheets")
+        completed = subprocess.run(
+            [sys.executable, "-c", FORKED_READ, json.dumps(sources)],
+            cwd=Path(__file__).resolve().parents[1],
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(
+            json.loads(completed.stdout),
+            {"used_pool": True, "names": ["north", "south"]},
+        )
+
+    def test_sheet_names_come_from_the_workbook_part(self) -> None:
+        self.assertEqual(sheet_names(self.workbook), ["north", "south"])
+        with pd.ExcelFile(self.workbook) as workbook:
+            self.assertEqual(sheet_names(self.workbook), workbook.sheet_names)
+
+    def test_ingest_mode_only_enters_the_cache_key_when_set(self) -> None:
+        self.assertEqual(self.stage.cache_key_parts({"chunk_size": None}), {"chunk_size": None})
+        self.assertEqual(
+            self.stage.cache_key_parts({"ingest": "all_sheets"}),
+            {"chunk_size": None, "ingest": "all_sheets"},
+        )
+        self.assertEqual(
+            self.stage.cache_key_parts({"excel_readers": ("openpyxl",)}),
+            {"chunk_size": None, "excel_readers": ["openpyxl"]},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import unittest
+from typing import Any, List
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_job_event_hub, get_query_service
+from app.main import app
+from app.services import JobQueryService
+from infrastructure.job_events import JobEventHub, RedisJobEventHub
+from infrastructure.memory import InMemoryJobEventHub, InMemoryJobRepository
+from infrastructure.repository import RedisJobRepository
+from tests.test_repository import FakeRedis
+
+
+class FakePubSub:
+    def __init__(self, messages: List[Any]) -> None:
+        self.messages = messages
+
+    async def subscribe(self, channel: str) -> None:
+        self.channel = channel
+
+    async def listen(self) -> Any:
+        for message in self.messages:
+            await asyncio.sleep(0.01)
+            yield {"type": "message", "data": json.dumps(message)}
+        await asyncio.Event().wait()
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeAsyncRedis:
+    def __init__(self, messages: List[Any]) -> None:
+        self.messages = messages
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self.messages)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class TestJobEventHub(unittest.TestCase):
+    def test_events_fan_out_to_subscribers_of_that_job(self) -> None:
+        async def scenario() -> None:
+            hub = RedisJobEventHub(lambda: FakeAsyncRedis([]), "job-events", max_queued=2)
+            first = await hub.subscribe(["a"])
+            second = await hub.subscribe(["a", "b"])
+
+            hub.dispatch(json.dumps({"job_id": "a", "status": "RUNNING"}))
+            hub.dispatch(json.dumps({"job_id": "b", "status": "RUNNING"}))
+            first.close()
+            hub.dispatch(json.dumps({"job_id": "a", "status": "COMPLETED"}))
+            await hub.close()
+
+            self.assertEqual((await first.get(0))["status"], "RUNNING")
+            self.assertIsNone(await first.get(0))
+            # Queue of two: the oldest event was dropped for the newest.
+            self.assertEqual([(await second.get(0))["job_id"] for _ in range(2)], ["b", "a"])
+            second.close()
+            self.assertEqual(hub._listeners, {})
+
+        asyncio.run(scenario())
+
+    def test_the_base_hub_has_no_event_source(self) -> None:
+        with self.assertRaises(TypeError):
+            JobEventHub()
+
+
+class TestJobEventsEndpoint(unittest.TestCase):
+    def test_sse_streams_snapshot_then_transitions_until_terminal(self) -> None:
+        repository = RedisJobRepository(FakeRedis())
+        repository.create_job("a", {"input_path": "/a"})
+        hub = RedisJobEventHub(
+            lambda: FakeAsyncRedis(
+                [
+                    {"job_id": "other", "status": "RUNNING"},
+                    {"job_id": "a", "status": "RUNNING"},
+                    {"job_id": "a", "status": "COMPLETED"},
+                ]
+            ),
+            "job-events",
+        )
+        app.dependency_overrides[get_query_service] = lambda: JobQueryService(repository)
+        app.dependency_overrides[get_job_event_hub] = lambda: hub
+        self.addCleanup(app.dependency_overrides.clear)
+
+        with TestClient(app) as client:
+            response = client.get("/jobs/a/events")
+            missing = client.get("/jobs/missing/events")
+
+        events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+        self.assertEqual(response.headers["content-type"], "text/event-stream; charset=utf-8")
+        self.assertEqual([event["status"] for event in events], ["QUEUED", "RUNNING", "COMPLETED"])
+        self.assertEqual(missing.status_code, 404)
+
+    def test_socket_answers_malformed_messages_and_stays_open(self) -> None:
+        repository = InMemoryJobRepository()
+        repository.create_job("a", {"input_path": "/a"})
+        app.dependency_overrides[get_query_service] = lambda: JobQueryService(repository)
+        app.dependency_overrides[get_job_event_hub] = InMemoryJobEventHub
+        self.addCleanup(app.dependency_overrides.clear)
+
+        with TestClient(app) as client, client.websocket_connect("/jobs/events") as socket:
+            for message in ("not json", "[1, 2]", '{"subscribe": "a"}', '{"unsubscribe": [{"id": 1}]}'):
+                socket.send_text(message)
+                self.assertIn("Invalid message", socket.receive_json()["error"])
+            socket.send_json({"subscribe": ["a", "missing"]})
+            self.assertEqual(socket.receive_json()["status"], "QUEUED")
+            self.assertEqual(socket.receive_json(), {"job_id": "missing", "status": "NOT_FOUND"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import threading
+import unittest
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_query_service, get_submission_service
+from app.main import app
+from app.services import JobProcessingService, JobQueryService, JobSubmissionService
+from core.executors import PipelineExecutor
+from infrastructure.file_storage import LocalFileStorage
+from infrastructure.memory import InMemoryJobEventHub, InMemoryJobQueue, InMemoryJobRepository, InMemoryStageMetrics
+from infrastructure.metrics import RedisStageMetrics
+from infrastructure.notifier import HttpCallbackNotifier
+from loadtest import percentile, run_load, synthetic_workbook
+from tests.test_metrics import FakeRedis as FakeMetricsRedis
+
+
+class TestInMemoryJobRepository(unittest.TestCase):
+    def test_transaction_applies_jobs_and_queue_together(self) -> None:
+        repository = InMemoryJobRepository()
+        queue = InMemoryJobQueue()
+        transaction = repository.pipeline()
+        repository.create_jobs({"a": {"input_path": "/a"}, "b": {"input_path": "/b"}}, transaction)
+        queue.enqueue_many(["a", "b"], transaction, ["high", "low"])
+
+        self.assertEqual(repository.get_jobs(["a", "b"]), [None, None])
+        transaction.execute()
+
+        summaries = repository.get_jobs(["a", "missing"], summary=True)
+        self.assertEqual(summaries[0]["status"], "QUEUED")
+        self.assertNotIn("input_path", summaries[0])
+        self.assertIsNone(summaries[1])
+        self.assertEqual([list(lane) for lane in queue._lanes.values()], [["a"], [], ["b"]])
+
+    def test_reads_are_copies(self) -> None:
+        repository = InMemoryJobRepository()
+        repository.create_job("a", {"pipeline_config": {"order": ["stage1"]}})
+        repository.get_job("a")["pipeline_config"]["order"].append("stage2")
+
+        self.assertEqual(repository.get_job("a")["pipeline_config"], {"order": ["stage1"]})
+
+    def test_fingerprints_and_index(self) -> None:
+        repository = InMemoryJobRepository()
+        self.assertIsNone(repository.claim_fingerprint("fp", "a", 60))
+        self.assertEqual(repository.claim_fingerprint("fp", "b", 60), "a")
+        self.assertIsNone(repository.claim_fingerprint("expired", "a", -1))
+        self.assertIsNone(repository.claim_fingerprint("expired", "b", 60))
+
+        repository.create_jobs({"a": {}, "b": {}})
+        repository.delete_jobs(["a"])
+        self.assertEqual(repository.list_job_ids(), (["b"], 1))
+
+
+class TestInMemoryEventsAndMetrics(unittest.TestCase):
+    def test_status_changes_on_worker_threads_reach_subscribers(self) -> None:
+        async def scenario() -> None:
+            hub = InMemoryJobEventHub()
+            repository = InMemoryJobRepository(events=hub.publish)
+            repository.create_job("a", {"input_path": "/a"})
+            subscription = await hub.subscribe(["a"])
+
+            worker = threading.Thread(target=repository.update_job, args=("a", {"status": "RUNNING"}))
+            worker.start()
+            worker.join()
+            repository.update_job("a", {"heartbeat_at": 1})
+
+            self.assertEqual((await subscription.get(1))["status"], "RUNNING")
+            self.assertIsNone(await subscription.get(0.05))
+            subscription.close()
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_stage_metrics_render_like_the_redis_ones(self) -> None:
+        runs = [
+            {"stage2": {"wall_seconds": 0.3, "cpu_seconds": 0.2, "rows_out": 500, "rss_delta_bytes": 10}},
+            {"stage2": {"cached": True, "rows_out": 500}},
+        ]
+        memory, shared = InMemoryStageMetrics(), RedisStageMetrics(FakeMetricsRedis())
+        for stage_metrics in runs:
+            memory.record(stage_metrics)
+            shared.record(stage_metrics)
+
+        self.assertEqual(memory.render(), shared.render())
+        self.assertIn('pipeline_stage_runs_total{stage="stage2",result="cached"} 1', memory.render())
+
+
+class TestInMemoryJobQueue(unittest.TestCase):
+    def test_worker_threads_drain_every_lane(self) -> None:
+        seen = []
+        lock = threading.Lock()
+
+        def handler(job_id: str) -> None:
+            with lock:
+                seen.append(job_id)
+            if job_id == "boom":
+                raise RuntimeError("bad job")
+
+        queue = InMemoryJobQueue(workers=3, weights={"high": 6, "default": 3, "low": 1}).start(handler)
+        self.addCleanup(queue.close)
+        for index in range(20):
+            queue.enqueue(f"job-{index}", ("high", "default", "low")[index % 3])
+        queue.enqueue("boom")
+
+        self.assertTrue(queue.join(timeout=5))
+        self.assertEqual(sorted(seen), sorted([f"job-{index}" for index in range(20)] + ["boom"]))
+        with self.assertRaises(ValueError):
+            queue.enqueue("x", "urgent")
+
+
+class TestLoadHarness(unittest.TestCase):
+    def test_end_to_end_on_the_memory_backend(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        storage = LocalFileStorage(tmp.name)
+        repository = InMemoryJobRepository()
+        processing = JobProcessingService(repository, storage, PipelineExecutor(), HttpCallbackNotifier())
+        queue = InMemoryJobQueue(workers=2).start(processing.process)
+        self.addCleanup(queue.close)
+        app.dependency_overrides[get_submission_service] = lambda: JobSubmissionService(repository, storage, queue)
+        app.dependency_overrides[get_query_service] = lambda: JobQueryService(repository)
+        self.addCleanup(app.dependency_overrides.clear)
+
+        report = run_load(TestClient(app), synthetic_workbook(20, 4), requests=3, concurrency=3, poll_interval=0.01)
+
+        self.assertEqual((report["completed"], report["failed"]), (3, 0))
+        self.assertGreater(report["throughput_jobs_per_second"], 0)
+        self.assertLessEqual(
+            report["upload_latency_seconds"]["p50"], report["end_to_end_latency_seconds"]["p50"]
+        )
+
+    def test_percentile_is_nearest_rank(self) -> None:
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertIsNone(percentile([], 50))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import unittest
+from typing import Any, Dict, List
+
+from infrastructure.metrics import RedisStageMetrics
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.hashes: Dict[str, Dict[str, str]] = {}
+        self.calls: List[Any] = []
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        return self
+
+    def hincrby(self, key: str, field: str, amount: int) -> None:
+        values = self.hashes.setdefault(key, {})
+        values[field] = str(int(values.get(field, "0")) + amount)
+
+    def hincrbyfloat(self, key: str, field: str, amount: float) -> None:
+        values = self.hashes.setdefault(key, {})
+        values[field] = str(float(values.get(field, "0")) + amount)
+
+    def hset(self, key: str, field: str, value: Any) -> None:
+        self.hashes.setdefault(key, {})[field] = str(value)
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        return dict(self.hashes.get(key, {}))
+
+    def execute(self) -> None:
+        self.calls.append("execute")
+
+
+class TestRedisStageMetrics(unittest.TestCase):
+    def test_histograms_render_in_prometheus_text_format(self) -> None:
+        redis_client = FakeRedis()
+        metrics = RedisStageMetrics(redis_client)
+
+        metrics.record({"stage2": {"wall_seconds": 0.3, "cpu_seconds": 0.2, "queue_wait_seconds": 0.0, "rows_out": 500}})
+        metrics.record({"stage2": {"wall_seconds": 3.0, "rows_out": None, "rss_delta_bytes": 2048}})
+        metrics.record({"stage2": {"cached": True, "rows_out": 500}})
+        text = metrics.render()
+
+        self.assertEqual(redis_client.calls, ["execute"] * 3)
+        self.assertIn('pipeline_stage_runs_total{stage="stage2",result="run"} 2', text)
+        self.assertIn('pipeline_stage_runs_total{stage="stage2",result="cached"} 1', text)
+        self.assertIn("# TYPE pipeline_stage_wall_seconds histogram", text)
+        self.assertIn('pipeline_stage_wall_seconds_bucket{stage="stage2",le="0.25"} 0', text)
+        self.assertIn('pipeline_stage_wall_seconds_bucket{stage="stage2",le="0.5"} 1', text)
+        self.assertIn('pipeline_stage_wall_seconds_bucket{stage="stage2",le="+Inf"} 2', text)
+        self.assertIn('pipeline_stage_wall_seconds_sum{stage="stage2"} 3.3', text)
+        self.assertIn('pipeline_stage_wall_seconds_count{stage="stage2"} 2', text)
+        self.assertIn('pipeline_stage_rows_out_count{stage="stage2"} 1', text)
+        self.assertIn('pipeline_stage_last_rss_delta_bytes{stage="stage2"} 2048', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
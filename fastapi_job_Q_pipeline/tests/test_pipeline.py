@@ -0,0 +1,465 @@
+from __future__ import annotations
+
+import errno
+import os
+import threading
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from core.interfaces import RowWiseStage, Stage
+from core import transport
+from core.partitioning import partition_count
+from core.pipeline import Pipeline, PipelineError
+
+
+class RecordingStage(Stage):
+    def __init__(self, name: str, depends_on: List[str], log: List[str], barrier: Any = None):
+        self.name = name
+        self.depends_on = depends_on
+        self.log = log
+        self.barrier = barrier
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        for dep in self.depends_on:
+            assert dep in results, f"{self.name} started before {dep}"
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        self.log.append(self.name)
+        return self.name
+
+
+class FailingStage(RecordingStage):
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        raise RuntimeError("boom")
+
+
+class PayloadStage(Stage):
+    name = "payload"
+    depends_on: List[str] = []
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        return np.arange(1024)
+
+
+class BallastStage(Stage):
+    name = "ballast"
+    depends_on: List[str] = []
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        return np.ones(8 * 1024 * 1024)  # 64 MiB, every page touched
+
+
+class SumStage(Stage):
+    name = "sum"
+    depends_on = ["ballast"]
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        return float(results["ballast"].sum())
+
+
+class PidStage(Stage):
+    name = "pid"
+    depends_on = ["payload"]
+    execution_mode = "process"
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        return {"pid": os.getpid(), "size": len(results["payload"]), "job_id": context["job_id"]}
+
+
+class ChunkSourceStage(Stage):
+    name = "source"
+    depends_on: List[str] = []
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        return (np.arange(start, start + 10) for start in range(0, 50, 10))
+
+
+class DoubleStage(RowWiseStage):
+    name = "double"
+    depends_on = ["source"]
+    execution_mode = "process"
+
+    def transform(self, df: Any, context: Dict[str, Any]) -> Any:
+        return df * 2
+
+
+class FrameSourceStage(Stage):
+    name = "frame"
+    depends_on: List[str] = []
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        return pd.DataFrame({"value": range(1000)}, index=range(5000, 6000))
+
+
+class TagPidStage(RowWiseStage):
+    name = "tag"
+    depends_on = ["frame"]
+    execution_mode = "process"
+    partitionable = True
+
+    def transform(self, df: Any, context: Dict[str, Any]) -> Any:
+        return df.assign(doubled=df["value"] * 2, pid=os.getpid(), rows=len(df))
+
+
+class SinkStage(Stage):
+    name = "sink"
+    depends_on = ["double"]
+
+    def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+        return [int(value) for chunk in results["double"] for value in chunk]
+
+
+class DictResultCache:
+    def __init__(self) -> None:
+        self.entries: Dict[str, Any] = {}
+
+    def get(self, key: str) -> Any:
+        return self.entries.get(key)
+
+    def put(self, key: str, value: Any) -> bool:
+        self.entries[key] = value
+        return True
+
+
+class DictCheckpoint:
+    def __init__(self) -> None:
+        self.saved: Dict[str, Any] = {}
+
+    def get(self, stage: str, key: str) -> Any:
+        saved = self.saved.get(stage)
+        return saved[1] if saved and saved[0] == key else None
+
+    def put(self, stage: str, key: str, value: Any) -> bool:
+        self.saved[stage] = (key, value)
+        return True
+
+    def clear(self) -> None:
+        self.saved = {}
+
+
+class TestPipelineScheduler(unittest.TestCase):
+    def test_independent_stages_run_concurrently(self) -> None:
+        log: List[str] = []
+        barrier = threading.Barrier(2)
+        pipeline = Pipeline(
+            {
+                "load": RecordingStage("load", [], log),
+                "left": RecordingStage("left", ["load"], log, barrier),
+                "right": RecordingStage("right", ["load"], log, barrier),
+                "merge": RecordingStage("merge", ["left", "right"], log),
+            }
+        )
+        self.addCleanup(pipeline.close)
+
+        results = pipeline.run({}, ["load", "left", "right", "merge"])
+
+        self.assertEqual(list(results), ["load", "left", "right", "merge"])
+        self.assertEqual(log[0], "load")
+        self.assertEqual(log[-1], "merge")
+        self.assertFalse(barrier.broken)
+
+    def test_stage_starts_before_unrelated_slow_stage_finishes(self) -> None:
+        log: List[str] = []
+        slow_release = threading.Event()
+
+        class SlowStage(RecordingStage):
+            def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+                slow_release.wait(timeout=5)
+                return super().run(context, results)
+
+        class ReleasingStage(RecordingStage):
+            def run(self, context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+                value = super().run(context, results)
+                slow_release.set()
+                return value
+
+        pipeline = Pipeline(
+            {
+                "slow": SlowStage("slow", [], log),
+                "fast": RecordingStage("fast", [], log),
+                "after_fast": ReleasingStage("after_fast", ["fast"], log),
+            }
+        )
+        self.addCleanup(pipeline.close)
+
+        pipeline.run({}, ["slow", "fast", "after_fast"])
+
+        self.assertEqual(log, ["fast", "after_fast", "slow"])
+
+    def test_order_and_parallel_groups_are_constraints(self) -> None:
+        stages = {
+            "a": RecordingStage("a", [], []),
+            "b": RecordingStage("b", [], []),
+            "c": RecordingStage("c", [], []),
+        }
+        pipeline = Pipeline(stages)
+
+        self.assertEqual(
+            pipeline.build_graph(["a", "b", "c"], order=["c", "a", "b"]),
+            {"c": (), "a": ("c",), "b": ("a",)},
+        )
+        self.assertEqual(
+            pipeline.build_graph(["a", "b", "c"], parallel_groups=[["a", "b"], ["c"]]),
+            {"a": (), "b": (), "c": ("a", "b")},
+        )
+        self.assertEqual(pipeline.build_graph(["a", "b", "c"]), {"a": (), "b": (), "c": ()})
+
+    def test_order_must_respect_dependencies(self) -> None:
+        pipeline = Pipeline({"a": RecordingStage("a", [], []), "b": RecordingStage("b", ["a"], [])})
+
+        with self.assertRaises(PipelineError):
+            pipeline.build_plan(["a", "b"], order=["b", "a"])
+
+    def test_cycle_is_detected(self) -> None:
+        pipeline = Pipeline({"a": RecordingStage("a", ["b"], []), "b": RecordingStage("b", ["a"], [])})
+
+        with self.assertRaises(PipelineError):
+            pipeline.build_plan(["a", "b"])
+
+    def test_plans_are_cached_per_config_shape(self) -> None:
+        pipeline = Pipeline({"a": RecordingStage("a", [], []), "b": RecordingStage("b", ["a"], [])}, plan_cache_size=1)
+
+        pipeline.build_graph(["a", "b"])
+        pipeline.build_graph(["a", "b"], order=None, parallel_groups=[])
+        pipeline.build_graph(["a", "b"], order=["a", "b"])
+        pipeline.build_graph(["b", "a"])
+
+        self.assertEqual(pipeline.plan_cache_info(), {"hits": 1, "misses": 3, "size": 1, "max_size": 1})
+        self.assertEqual(list(pipeline.build_graph(["b", "a"])), ["a", "b"])
+        with self.assertRaises(PipelineError):
+            pipeline.build_graph(["a", "b", "a"])
+
+        pipeline.register_stage(RecordingStage("c", ["b"], []))
+        self.assertEqual(list(pipeline.build_graph(["a", "b", "c"])), ["a", "b", "c"])
+        self.assertEqual(pipeline.plan_cache_info()["size"], 1)
+
+    def test_failure_propagates_and_pool_is_reused(self) -> None:
+        log: List[str] = []
+        pipeline = Pipeline(
+            {
+                "a": RecordingStage("a", [], log),
+                "b": FailingStage("b", [], log),
+            }
+        )
+        self.addCleanup(pipeline.close)
+
+        with self.assertRaises(RuntimeError):
+            pipeline.run({}, ["a", "b"])
+        pool = pipeline._thread_pool()
+        pipeline.run({}, ["a"])
+
+        self.assertIs(pipeline._thread_pool(), pool)
+
+    def test_process_stage_runs_out_of_process(self) -> None:
+        pipeline = Pipeline({"payload": PayloadStage(), "pid": PidStage()})
+        self.addCleanup(pipeline.close)
+
+        results = pipeline.run({"job_id": "job-1"}, ["payload", "pid"])
+
+        self.assertNotEqual(results["pid"]["pid"], os.getpid())
+        self.assertEqual(results["pid"]["size"], 1024)
+        self.assertEqual(results["pid"]["job_id"], "job-1")
+
+    def test_streamed_chunks_flow_through_process_stage_in_order(self) -> None:
+        pipeline = Pipeline({"source": ChunkSourceStage(), "double": DoubleStage(), "sink": SinkStage()})
+        self.addCleanup(pipeline.close)
+
+        results = pipeline.run({}, ["source", "double", "sink"])
+
+        self.assertEqual(results["sink"], [value * 2 for value in range(50)])
+
+    def test_partitionable_stage_is_split_across_the_pool_and_rejoined_in_order(self) -> None:
+        pipeline = Pipeline(
+            {"frame": FrameSourceStage(), "tag": TagPidStage()}, process_workers=4, min_partition_rows=200
+        )
+        self.addCleanup(pipeline.close)
+        context: Dict[str, Any] = {}
+
+        df = pipeline.run(context, ["frame", "tag"])["tag"]
+
+        self.assertEqual(list(df.index), list(range(5000, 6000)))
+        self.assertEqual(df["doubled"].tolist(), [value * 2 for value in range(1000)])
+        self.assertEqual(sorted(df["rows"].unique()), [250])
+        self.assertNotIn(os.getpid(), set(df["pid"]))
+        self.assertEqual(context["stage_metrics"]["tag"]["partitions"], 4)
+        self.assertEqual(context["stage_metrics"]["tag"]["rows_out"], 1000)
+
+        # Thread mode, or too few rows, runs the stage in one piece on its own thread.
+        for modes, min_rows in (({"tag": "thread"}, 200), (None, 600)):
+            pipeline.min_partition_rows = min_rows
+            context = {}
+            df = pipeline.run(context, ["frame", "tag"], execution_modes=modes)["tag"]
+            self.assertEqual(df["rows"].unique().tolist(), [1000])
+            self.assertEqual(df["pid"].unique().tolist(), [os.getpid()])
+            self.assertEqual(context["stage_metrics"]["tag"]["mode"], "thread")
+            self.assertNotIn("partitions", context["stage_metrics"]["tag"])
+
+    def test_partition_count_follows_rows_and_cores(self) -> None:
+        self.assertEqual(partition_count(1_000_000, workers=8, min_rows=50_000), 8)
+        self.assertEqual(partition_count(120_000, workers=8, min_rows=50_000), 2)
+        self.assertEqual(partition_count(49_999, workers=8, min_rows=50_000), 1)
+        self.assertEqual(partition_count(0, workers=8, min_rows=50_000), 1)
+
+    def test_streamed_output_cannot_feed_two_stages(self) -> None:
+        log: List[str] = []
+        pipeline = Pipeline(
+            {
+                "source": ChunkSourceStage(),
+                "a": RecordingStage("a", ["source"], log),
+                "b": RecordingStage("b", ["source"], log),
+            }
+        )
+
+        with self.assertRaises(PipelineError):
+            pipeline.run({}, ["source", "a", "b"])
+
+    def test_execution_mode_overrides_are_validated(self) -> None:
+        pipeline = Pipeline({"payload": PayloadStage(), "pid": PidStage()})
+
+        with self.assertRaises(PipelineError):
+            pipeline.run({}, ["payload", "pid"], execution_modes={"pid": "gpu"})
+        with self.assertRaises(PipelineError):
+            pipeline.run({}, ["payload"], execution_modes={"pid": "inline"})
+
+    def test_shared_payload_round_trip(self) -> None:
+        payload = transport.pack({"data": np.arange(100), "meta": "m"})
+        try:
+            self.assertIsNotNone(payload.block_name)
+            value = transport.unpack(payload)
+            self.assertEqual(value["meta"], "m")
+            np.testing.assert_array_equal(value["data"], np.arange(100))
+            # Mapped in place rather than copied, and still writable.
+            self.assertFalse(value["data"].flags.owndata)
+            value["data"][0] = -1
+        finally:
+            transport.release(payload)
+        # The name is gone, but the mapping lives as long as the arrays on it.
+        self.assertEqual(value["data"][:3].tolist(), [-1, 1, 2])
+
+    def test_shared_payload_falls_back_to_the_pipe_without_shared_memory(self) -> None:
+        no_space = OSError(errno.ENOSPC, "No space left on device")
+        created: List[str] = []
+        real_reserve = transport._reserve
+
+        def reserve(name: str, size: int) -> None:
+            created.append(name)
+            real_reserve(name, size)
+            raise no_space
+
+        for patch in (
+            mock.patch.object(transport.shared_memory, "SharedMemory", side_effect=no_space),
+            mock.patch.object(transport, "_reserve", side_effect=reserve),
+        ):
+            with self.subTest(patch=patch.attribute), patch:
+                payload = transport.pack({"data": np.arange(100)})
+                self.assertIsNone(payload.block_name)
+                np.testing.assert_array_equal(transport.unpack(payload)["data"], np.arange(100))
+        # The segment that could not be filled is unlinked, not leaked.
+        self.assertEqual(len(created), 1)
+        self.assertFalse(os.path.exists(os.path.join(transport.SHM_DIR, created[0])))
+
+    def test_result_cache_skips_stages_with_matching_keys(self) -> None:
+        log: List[str] = []
+        side_effect = RecordingStage("write", ["load"], log)
+        side_effect.cacheable = False
+        cache = DictResultCache()
+        pipeline = Pipeline({"load": RecordingStage("load", [], log), "write": side_effect}, result_cache=cache)
+
+        first_context: Dict[str, Any] = {"input_hash": "abc"}
+        pipeline.run(first_context, ["load", "write"])
+        second_context: Dict[str, Any] = {"input_hash": "abc"}
+        pipeline.run(second_context, ["load", "write"])
+        pipeline.run({"input_hash": "other"}, ["load", "write"])
+
+        self.assertEqual(log, ["load", "write", "write", "load", "write"])
+        self.assertEqual(first_context["cached_stages"], [])
+        self.assertEqual(second_context["cached_stages"], ["load"])
+        self.assertEqual(len(cache.entries), 2)
+
+    def test_checkpoint_resumes_a_job_after_its_last_saved_stage(self) -> None:
+        log: List[str] = []
+        crash = RecordingStage("write", ["transform"], log)
+        crash.cacheable = False
+        stages = {
+            "load": RecordingStage("load", [], log),
+            "transform": RecordingStage("transform", ["load"], log),
+            "write": crash,
+        }
+        checkpoint = DictCheckpoint()
+
+        def failing_write(context: Dict[str, Any], results: Dict[str, Any]) -> Any:
+            raise RuntimeError("worker died")
+
+        crash.run = failing_write  # type: ignore[method-assign]
+        with self.assertRaises(RuntimeError):
+            Pipeline(stages).run({"input_hash": "abc"}, ["load", "transform", "write"], checkpoint=checkpoint)
+        self.assertEqual(sorted(checkpoint.saved), ["load", "transform"])
+
+        del crash.run
+        log.clear()
+        context: Dict[str, Any] = {"input_hash": "abc"}
+        results = Pipeline(stages).run(context, ["load", "transform", "write"], checkpoint=checkpoint)
+
+        self.assertEqual(log, ["write"])
+        self.assertEqual(results["transform"], "transform")
+        self.assertEqual(context["restored_stages"], ["load", "transform"])
+        self.assertTrue(context["stage_metrics"]["transform"]["restored"])
+
+        log.clear()
+        Pipeline(stages).run({"input_hash": "changed"}, ["load", "transform", "write"], checkpoint=checkpoint)
+        self.assertEqual(log, ["load", "transform", "write"])
+
+    def test_stage_metrics_are_recorded(self) -> None:
+        pipeline = Pipeline({"source": ChunkSourceStage(), "double": DoubleStage(), "sink": SinkStage()})
+        self.addCleanup(pipeline.close)
+        context: Dict[str, Any] = {}
+
+        pipeline.run(context, ["source", "double", "sink"], execution_modes={"double": "inline"})
+
+        metrics = context["stage_metrics"]
+        self.assertEqual(list(metrics), ["source", "double", "sink"])
+        self.assertEqual(metrics["double"]["mode"], "inline")
+        self.assertTrue(metrics["double"]["streamed"])
+        self.assertEqual(metrics["double"]["rows_in"], 50)
+        self.assertEqual(metrics["double"]["rows_out"], 50)
+        self.assertIsNone(metrics["source"]["rows_in"])
+        for stats in metrics.values():
+            self.assertGreaterEqual(stats["wall_seconds"], 0)
+            self.assertGreaterEqual(stats["cpu_seconds"], 0)
+            self.assertGreaterEqual(stats["queue_wait_seconds"], 0)
+
+    def test_process_stage_metrics_include_child_usage(self) -> None:
+        pipeline = Pipeline({"payload": PayloadStage(), "pid": PidStage()})
+        self.addCleanup(pipeline.close)
+        context: Dict[str, Any] = {"job_id": "job-2"}
+
+        pipeline.run(context, ["payload", "pid"])
+
+        self.assertEqual(context["stage_metrics"]["payload"]["rows_out"], 1024)
+        self.assertEqual(context["stage_metrics"]["pid"]["rows_in"], 1024)
+        self.assertIsInstance(context["stage_metrics"]["pid"]["rss_delta_bytes"], int)
+
+    @unittest.skipUnless(os.path.exists("/proc/self/statm"), "RSS is read from /proc")
+    def test_memory_is_attributed_to_the_stage_that_grew_it(self) -> None:
+        context: Dict[str, Any] = {}
+
+        Pipeline({"ballast": BallastStage(), "sum": SumStage()}).run(context, ["ballast", "sum"])
+
+        metrics = context["stage_metrics"]
+        self.assertGreater(metrics["ballast"]["rss_delta_bytes"], 32 * 1024 * 1024)
+        # A lifetime peak would have charged the ballast to this stage as well.
+        self.assertLess(metrics["sum"]["rss_delta_bytes"], 32 * 1024 * 1024)
+
+    def test_missing_dependency_is_rejected(self) -> None:
+        pipeline = Pipeline({"a": RecordingStage("a", [], []), "b": RecordingStage("b", ["a"], [])})
+
+        with self.assertRaises(PipelineError):
+            pipeline.run({}, ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import json
+import unittest
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+from infrastructure.repository import RedisJobRepository
+
+
+class FakeRedis:
+    # Just enough of redis-py for the repository; every pipeline is one round trip.
+    def __init__(self, decode_responses: bool = True) -> None:
+        self.decode = decode_responses
+        self.hashes: Dict[str, Dict[Any, Any]] = {}
+        self.strings: Dict[str, Any] = {}
+        self.zsets: Dict[str, Dict[Any, float]] = {}
+        self.lists: Dict[str, List[Any]] = {}
+        self.published: List[Any] = []
+        self.round_trips = 0
+
+    def _key(self, value: str) -> Any:
+        return value if self.decode else value.encode()
+
+    def hset(self, key: str, mapping: Dict[str, Any]) -> None:
+        self.hashes.setdefault(key, {}).update({self._key(k): v for k, v in mapping.items()})
+
+    def hgetall(self, key: str) -> Dict[Any, Any]:
+        return dict(self.hashes.get(key, {}))
+
+    def hvals(self, key: str) -> List[Any]:
+        return list(self.hashes.get(key, {}).values())
+
+    def hdel(self, key: str, *fields: str) -> None:
+        for field in fields:
+            self.hashes.get(key, {}).pop(self._key(field), None)
+
+    def hmget(self, key: str, fields: List[str]) -> List[Optional[Any]]:
+        values = self.hashes.get(key, {})
+        return [values.get(self._key(field)) for field in fields]
+
+    def set(self, key: str, value: Any, nx: bool = False, ex: Optional[int] = None, get: bool = False) -> Any:
+        previous = self.strings.get(key)
+        if not (nx and previous is not None):
+            self.strings[key] = value if self.decode or isinstance(value, bytes) else value.encode()
+        if get:
+            return previous
+        return None if nx and previous is not None else True
+
+    def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        return [self.strings.get(key) for key in keys]
+
+    def exists(self, *keys: str) -> int:
+        return sum(key in self.hashes or key in self.strings for key in keys)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.hashes.pop(key, None)
+            self.strings.pop(key, None)
+
+    def scan_iter(self, match: str, count: int = 10) -> Any:
+        prefix = match.rstrip("*")
+        return iter([self._key(key) for key in [*self.hashes, *self.strings] if key.startswith(prefix)])
+
+    def zadd(self, key: str, mapping: Dict[str, float], nx: bool = False) -> None:
+        members = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if not (nx and self._key(member) in members):
+                members[self._key(member)] = score
+
+    def _ordered(self, key: str) -> List[Any]:
+        return [member for member, _ in sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]))]
+
+    def zrevrange(self, key: str, start: int, end: int) -> List[Any]:
+        return self._ordered(key)[::-1][start : end + 1]
+
+    def zrangebyscore(self, key: str, low: str, high: float, start: int = 0, num: int = -1) -> List[Any]:
+        members = [member for member in self._ordered(key) if self.zsets[key][member] <= high]
+        return members[start : start + num]
+
+    def zremrangebyscore(self, key: str, low: str, high: float) -> None:
+        members = self.zsets.get(key, {})
+        for member in [member for member, score in members.items() if score <= high]:
+            del members[member]
+
+    def lpush(self, key: str, value: str) -> None:
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def ltrim(self, key: str, start: int, end: int) -> None:
+        self.lists[key] = self.lists.get(key, [])[start : end + 1]
+
+    def lrange(self, key: str, start: int, end: int) -> List[Any]:
+        values = self.lists.get(key, [])
+        return values[start:] if end == -1 else values[start : end + 1]
+
+    def expire(self, key: str, seconds: int) -> None:
+        pass
+
+    def zcard(self, key: str) -> int:
+        return len(self.zsets.get(key, {}))
+
+    def zrem(self, key: str, *members: str) -> None:
+        for member in members:
+            self.zsets.get(key, {}).pop(self._key(member), None)
+
+    def publish(self, channel: str, message: str) -> None:
+        self.published.append((channel, json.loads(message)))
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis) -> None:
+        self.client = client
+        self.commands: List[Any] = []
+
+    def __getattr__(self, name: str) -> Any:
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self) -> List[Any]:
+        self.client.round_trips += 1
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class TestRedisJobRepository(unittest.TestCase):
+    def check_round_trip(self, repository: RedisJobRepository) -> None:
+        repository.create_job("a", {"input_path": "/in.xlsx", "input_size": 7, "pipeline_config": {"order": None}})
+        repository.update_job("a", {"status": "COMPLETED", "result": {"output_path": "/out.csv"}, "error": None})
+
+        job = repository.get_job("a")
+        self.assertEqual(job["status"], "COMPLETED")
+        self.assertEqual(job["input_size"], 7)
+        self.assertEqual(job["pipeline_config"], {"order": None})
+        self.assertEqual(job["result"], {"output_path": "/out.csv"})
+        self.assertIsNone(job["error"])
+        self.assertIsNone(repository.get_job("missing"))
+
+    def test_json_round_trip(self) -> None:
+        self.check_round_trip(RedisJobRepository(FakeRedis()))
+
+    def test_msgpack_round_trip_keeps_large_fields_out_of_the_hash(self) -> None:
+        redis_client = FakeRedis(decode_responses=False)
+        self.check_round_trip(RedisJobRepository(redis_client, encoding="msgpack"))
+
+        self.assertNotIn(b"result", redis_client.hashes["job:a"])
+        self.assertIn("job:a:result", redis_client.strings)
+
+    def test_get_jobs_is_one_round_trip_and_summaries_skip_large_fields(self) -> None:
+        for encoding, redis_client in (("json", FakeRedis()), ("msgpack", FakeRedis(decode_responses=False))):
+            with self.subTest(encoding=encoding):
+                repository = RedisJobRepository(redis_client, encoding=encoding)
+                repository.create_jobs({"a": {"input_path": "/a"}, "b": {"input_path": "/b"}})
+                repository.update_job("b", {"status": "FAILED", "error": "boom", "traceback": "long"})
+                redis_client.round_trips = 0
+
+                summaries = repository.get_jobs(["b", "missing", "a"], summary=True)
+
+                self.assertEqual(redis_client.round_trips, 1)
+                self.assertEqual([job and job["status"] for job in summaries], ["FAILED", None, "QUEUED"])
+                self.assertEqual(summaries[0]["error"], "boom")
+                self.assertNotIn("traceback", summaries[0])
+                self.assertNotIn("input_path", summaries[2])
+
+    def test_status_updates_are_published(self) -> None:
+        redis_client = FakeRedis()
+        repository = RedisJobRepository(redis_client, events_channel="job-events")
+
+        repository.create_job("a", {"input_path": "/a"})
+        repository.update_job("a", {"result": {"rows": 1}})
+        repository.update_job("a", {"status": "FAILED", "error": "boom"})
+
+        self.assertEqual(len(redis_client.published), 1)
+        channel, event = redis_client.published[0]
+        self.assertEqual(channel, "job-events")
+        self.assertEqual((event["job_id"], event["status"], event["error"]), ("a", "FAILED", "boom"))
+
+    def test_claim_fingerprint_returns_the_job_already_holding_it(self) -> None:
+        for decode in (True, False):
+            with self.subTest(decode_responses=decode):
+                repository = RedisJobRepository(FakeRedis(decode_responses=decode), "json" if decode else "msgpack")
+
+                self.assertIsNone(repository.claim_fingerprint("fp", "a", 60))
+                self.assertEqual(repository.claim_fingerprint("fp", "b", 60), "a")
+                repository.set_fingerprint("fp", "b", 60)
+                self.assertEqual(repository.claim_fingerprint("fp", "c", 60), "b")
+
+    def test_writes_index_jobs_by_update_time_for_listing(self) -> None:
+        for decode in (True, False):
+            with self.subTest(decode_responses=decode):
+                redis_client = FakeRedis(decode_responses=decode)
+                repository = RedisJobRepository(redis_client, "json" if decode else "msgpack")
+                with patch("infrastructure.repository.time.time", side_effect=[100, 200, 300]):
+                    repository.create_job("a", {"input_path": "/a"})
+                    repository.create_jobs({"b": {"input_path": "/b"}})
+                    repository.update_job("a", {"status": "RUNNING"})
+
+                self.assertEqual(repository.list_job_ids(0, 1), (["a"], 2))
+                self.assertEqual(repository.list_job_ids(1, 5), (["b"], 2))
+                self.assertEqual(repository.job_ids_updated_before(250), ["b"])
+
+                repository.delete_jobs(["a"])
+                self.assertIsNone(repository.get_job("a"))
+                self.assertEqual(repository.list_job_ids(), (["b"], 1))
+                self.assertNotIn("job:a:pipeline_config", redis_client.strings)
+
+    def test_reindex_backfills_jobs_missing_from_the_index(self) -> None:
+        redis_client = FakeRedis()
+        repository = RedisJobRepository(redis_client)
+        redis_client.hset("job:old", mapping={"status": "COMPLETED", "updated_at": "50"})
+        repository.create_job("new", {"input_path": "/new"})
+
+        self.assertEqual(repository.reindex(batch=1), 2)
+        self.assertEqual(repository.job_ids_updated_before(60), ["old"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import gzip
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_query_service
+from app.main import app
+from app.responses import RangeNotSatisfiable, parse_range
+from app.services import JobQueryService
+from infrastructure.memory import InMemoryJobRepository
+
+
+class TestParseRange(unittest.TestCase):
+    def test_suffix_and_open_ended_ranges(self) -> None:
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-500", 100), (0, 99))
+        self.assertEqual(parse_range("bytes=40-", 100), (40, 99))
+        self.assertEqual(parse_range("bytes=99-99", 100), (99, 99))
+
+    def test_malformed_or_multiple_ranges_serve_the_whole_file(self) -> None:
+        for header in (None, "", "bytes=", "bytes=abc-", "bytes=5", "bytes=9-3", "bytes=0-1,4-5", "lines=0-1"):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 100))
+
+    def test_unsatisfiable_ranges(self) -> None:
+        for header, size in (("bytes=100-", 100), ("bytes=150-200", 100), ("bytes=-0", 100), ("bytes=-5", 0)):
+            with self.subTest(header=header, size=size), self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, size)
+
+
+class TestRangedFileResponse(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "output_job.csv")
+        self.body = b"".join(f"{i},{i * 3}\n".encode() for i in range(3000))
+        with open(self.path, "wb") as f:
+            f.write(self.body)
+        repository = InMemoryJobRepository()
+        repository.create_job("job", {})
+        repository.update_job("job", {"status": "COMPLETED", "result": {"output_path": self.path, "output_format": "csv"}})
+        app.dependency_overrides[get_query_service] = lambda: JobQueryService(repository)
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+        self.size = len(self.body)
+
+    def get(self, encoding: str = "identity", **headers: str):
+        return self.client.get("/jobs/job/result", headers={"Accept-Encoding": encoding, **headers})
+
+    def test_single_range_is_a_206_with_its_content_range(self) -> None:
+        response = self.get(Range="bytes=10-49")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.body[10:50])
+        self.assertEqual(response.headers["content-range"], f"bytes 10-49/{self.size}")
+        self.assertEqual(response.headers["content-length"], "40")
+        self.assertEqual(response.headers["accept-ranges"], "bytes")
+        self.assertIn("etag", response.headers)
+
+    def test_suffix_and_open_ended_ranges(self) -> None:
+        suffix = self.get(Range="bytes=-25")
+        self.assertEqual(suffix.status_code, 206)
+        self.assertEqual(suffix.content, self.body[-25:])
+        self.assertEqual(suffix.headers["content-range"], f"bytes {self.size - 25}-{self.size - 1}/{self.size}")
+
+        open_ended = self.get(Range=f"bytes={self.size - 100}-")
+        self.assertEqual(open_ended.status_code, 206)
+        self.assertEqual(open_ended.content, self.body[-100:])
+        self.assertEqual(open_ended.headers["content-range"], f"bytes {self.size - 100}-{self.size - 1}/{self.size}")
+
+    def test_unsatisfiable_range_is_a_416(self) -> None:
+        response = self.get(Range=f"bytes={self.size}-{self.size + 10}")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["content-range"], f"bytes */{self.size}")
+        self.assertEqual(response.content, b"")
+
+    def test_if_range_only_resumes_the_same_file(self) -> None:
+        full = self.get()
+        for validator in (full.headers["etag"], full.headers["last-modified"]):
+            with self.subTest(validator=validator):
+                response = self.get(Range="bytes=0-9", **{"If-Range": validator})
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.content, self.body[:10])
+
+        stale = self.get(Range="bytes=0-9", **{"If-Range": '"not-this-file"'})
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.content, self.body)
+        self.assertNotIn("content-range", stale.headers)
+
+    def test_ranges_apply_to_the_gzip_copy(self) -> None:
+        self.get("gzip")
+        with open(self.path + ".gz", "rb") as f:
+            compressed = f.read()
+
+        # Fetched in two pieces, the compressed bytes join back into the whole result.
+        # The raw stream is read so the client does not decode each piece on its own.
+        pieces = []
+        for header in ("bytes=0-99", "bytes=100-"):
+            with self.client.stream(
+                "GET", "/jobs/job/result", headers={"Accept-Encoding": "gzip", "Range": header}
+            ) as response:
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.headers["content-encoding"], "gzip")
+                self.assertTrue(response.headers["content-range"].endswith(f"/{len(compressed)}"))
+                pieces.append(b"".join(response.iter_raw()))
+        self.assertEqual(pieces[0], compressed[:100])
+        self.assertEqual(gzip.decompress(b"".join(pieces)), self.body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_query_service, parse_retention
+from app.main import app
+from app.services import JobQueryService, JobRetentionService
+from infrastructure.file_storage import LocalFileStorage
+from infrastructure.repository import RedisJobRepository
+from tests.test_repository import FakeRedis
+
+
+class TestJobRetentionService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.storage = LocalFileStorage(self.tmp.name)
+        self.repository = RedisJobRepository(FakeRedis())
+
+    def add_job(self, job_id: str, status: str, updated_at: int) -> Path:
+        upload = Path(self.tmp.name) / f"upload_{job_id}.xlsx"
+        upload.write_bytes(b"x")
+        for output_format in ("csv", "parquet"):
+            Path(self.storage.build_output_path(job_id, output_format)).write_bytes(b"y")
+        Path(self.storage.build_output_path(job_id, "csv") + ".gz").write_bytes(b"z")
+        with patch("infrastructure.repository.time.time", return_value=updated_at):
+            self.repository.create_job(job_id, {"input_path": str(upload)})
+            self.repository.update_job(job_id, {"status": status})
+        return upload
+
+    def test_sweep_deletes_expired_jobs_and_their_files_in_batches(self) -> None:
+        old_done = self.add_job("old-done", "COMPLETED", 100)
+        old_running = self.add_job("old-running", "RUNNING", 100)
+        old_failed = self.add_job("old-failed", "FAILED", 150)
+        self.add_job("young-failed", "FAILED", 950)
+        self.add_job("new-done", "COMPLETED", 990)
+
+        service = JobRetentionService(self.repository, self.storage, {"COMPLETED": 500, "FAILED": 100}, batch_size=1)
+
+        self.assertEqual(service.sweep(now=1000), 2)
+        self.assertIsNone(self.repository.get_job("old-done"))
+        self.assertIsNone(self.repository.get_job("old-failed"))
+        self.assertFalse(old_done.exists() or old_failed.exists())
+        self.assertFalse(Path(self.storage.build_output_path("old-done", "parquet")).exists())
+        self.assertFalse(Path(self.storage.build_output_path("old-done", "csv") + ".gz").exists())
+        self.assertTrue(old_running.exists())
+        self.assertEqual(
+            sorted(self.repository.list_job_ids()[0]),
+            ["new-done", "old-running", "young-failed"],
+        )
+        self.assertEqual(service.sweep(now=1000), 0)
+
+    def test_parse_retention(self) -> None:
+        self.assertEqual(parse_retention("completed=60, FAILED=120,"), {"COMPLETED": 60, "FAILED": 120})
+
+
+class TestJobListing(unittest.TestCase):
+    def test_lists_newest_first_with_pagination(self) -> None:
+        repository = RedisJobRepository(FakeRedis())
+        for index, job_id in enumerate(["a", "b", "c"]):
+            with patch("infrastructure.repository.time.time", return_value=100 + index):
+                repository.create_job(job_id, {"input_path": f"/{job_id}"})
+        app.dependency_overrides[get_query_service] = lambda: JobQueryService(repository)
+        self.addCleanup(app.dependency_overrides.clear)
+
+        client = TestClient(app)
+        first = client.get("/jobs", params={"limit": 2}).json()
+        last = client.get("/jobs", params={"offset": 2, "limit": 2}).json()
+
+        self.assertEqual([job["job_id"] for job in first["jobs"]], ["c", "b"])
+        self.assertEqual((first["total"], first["next_offset"]), (3, 2))
+        self.assertEqual([job["job_id"] for job in last["jobs"]], ["a"])
+        self.assertIsNone(last["next_offset"])
+
+
+if __name__ == "__main__":
+    unittest.main()
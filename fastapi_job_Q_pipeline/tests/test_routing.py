@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import random
+import unittest
+from collections import Counter
+from types import SimpleNamespace
+
+from core.routing import QueueRouter, estimate_cost
+from infrastructure.queue import queue_names, weighted_queue_order
+
+MB = 1024**2
+
+
+class TestQueueRouter(unittest.TestCase):
+    def test_size_policy(self) -> None:
+        router = QueueRouter("size", small_bytes=5 * MB, large_bytes=100 * MB)
+
+        self.assertEqual(router.route({"input_size": MB}), "high")
+        self.assertEqual(router.route({"input_size": 20 * MB}), "default")
+        self.assertEqual(router.route({"input_size": 2048 * MB}), "low")
+        self.assertEqual(router.route({"input_size": 2048 * MB, "pipeline_config": {"priority": "high"}}), "high")
+
+    def test_cost_policy_scales_size_by_pipeline_work(self) -> None:
+        router = QueueRouter("cost", small_bytes=5 * MB, large_bytes=100 * MB)
+        heavy = {"enabled_stages": ["stage1", "stage2", "stage3"], "transforms": [{}] * 8}
+
+        self.assertEqual(estimate_cost({"input_size": 3 * MB}), 3 * MB)
+        self.assertEqual(router.route({"input_size": 4 * MB}), "high")
+        self.assertEqual(router.route({"input_size": 4 * MB, "pipeline_config": heavy}), "default")
+        self.assertEqual(router.route({"input_size": 60 * MB, "pipeline_config": heavy}), "low")
+
+    def test_priority_policy_only_uses_explicit_priority(self) -> None:
+        router = QueueRouter("priority")
+
+        self.assertEqual(router.route({"input_size": 1}), "default")
+        self.assertEqual(router.route({"pipeline_config": {"priority": "low"}}), "low")
+
+
+class TestWeightedQueueOrder(unittest.TestCase):
+    def test_default_priority_keeps_the_original_queue_name(self) -> None:
+        self.assertEqual(queue_names("jobs"), {"high": "jobs-high", "default": "jobs", "low": "jobs-low"})
+
+    def test_leading_queue_follows_weights(self) -> None:
+        queues = [SimpleNamespace(name=name) for name in ("high", "default", "low")]
+        rng = random.Random(7)
+
+        leaders = Counter(
+            weighted_queue_order(queues, {"high": 6, "default": 3, "low": 1}, rng)[0].name for _ in range(10000)
+        )
+
+        self.assertAlmostEqual(leaders["high"] / 10000, 0.6, delta=0.03)
+        self.assertAlmostEqual(leaders["low"] / 10000, 0.1, delta=0.03)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import io
+import os
+import tempfile
 import unittest
-from unittest.mock import Mock, call
+from unittest.mock import ANY, Mock, call
+
+import pandas as pd
 
 from app.services import (
     JobNotCompletedError,
@@ -10,7 +15,9 @@ from app.services import (
     JobProcessingService,
     JobQueryService,
     JobSubmissionService,
+    submission_fingerprint,
 )
+from core.routing import QueueRouter
 
 
 class TestJobSubmissionService(unittest.TestCase):
@@ -19,32 +26,132 @@ class TestJobSubmissionService(unittest.TestCase):
         storage = Mock()
         queue = Mock()
 
-        storage.save_upload.return_value = "/tmp/input.xlsx"
+        storage.save_upload.return_value = {"path": "/tmp/input.xlsx", "size": 5, "sha256": "abc"}
+        stream = io.BytesIO(b"bytes")
         service = JobSubmissionService(
             repository=repository,
             storage=storage,
             queue=queue,
             job_id_provider=lambda: "job-123",
+            max_upload_bytes=1024,
+            router=QueueRouter("size", small_bytes=10, large_bytes=100),
         )
 
         job_id = service.submit(
             filename="input.xlsx",
-            file_content=b"bytes",
+            file_stream=stream,
             pipeline_config={"enabled_stages": ["stage1", "stage2"]},
             callback_url="https://example.com/callback",
         )
 
         self.assertEqual(job_id, "job-123")
-        storage.save_upload.assert_called_once_with("input.xlsx", b"bytes")
+        storage.save_upload.assert_called_once_with("input.xlsx", stream, 1024)
         repository.create_job.assert_called_once_with(
             "job-123",
             {
                 "input_path": "/tmp/input.xlsx",
+                "input_hash": "abc",
+                "input_size": 5,
                 "pipeline_config": {"enabled_stages": ["stage1", "stage2"]},
                 "callback_url": "https://example.com/callback",
+                "priority": "high",
+            },
+        )
+        queue.enqueue.assert_called_once_with("job-123", "high")
+
+    def coalescing_service(self, existing_id, existing_job):
+        repository = Mock()
+        storage = Mock()
+        queue = Mock()
+        storage.save_upload.return_value = {"path": "/tmp/dup.xlsx", "size": 5, "sha256": "abc"}
+        repository.claim_fingerprint.return_value = existing_id
+        repository.get_jobs.return_value = [existing_job]
+        service = JobSubmissionService(
+            repository, storage, queue, job_id_provider=lambda: "job-new", dedup_ttl_seconds=600
+        )
+        return service, repository, storage, queue
+
+    def test_duplicate_of_in_flight_job_is_attached_not_enqueued(self) -> None:
+        service, repository, storage, queue = self.coalescing_service("job-old", {"status": "RUNNING"})
+
+        result = service.submit_coalesced("a.xlsx", io.BytesIO(b"x"), {"order": None}, None)
+
+        self.assertEqual(result, ("job-old", "RUNNING"))
+        fingerprint = submission_fingerprint("abc", {"order": None}, None)
+        repository.claim_fingerprint.assert_called_once_with(fingerprint, "job-new", 600)
+        storage.delete_upload.assert_called_once_with("/tmp/dup.xlsx")
+        repository.delete_jobs.assert_called_once_with(["job-new"])
+        queue.enqueue.assert_not_called()
+
+    def test_job_exists_before_its_fingerprint_is_published(self) -> None:
+        service, repository, _, _ = self.coalescing_service(None, None)
+
+        service.submit("a.xlsx", io.BytesIO(b"x"), None, None)
+
+        calls = [name for name, _, _ in repository.mock_calls]
+        self.assertLess(calls.index("create_job"), calls.index("claim_fingerprint"))
+
+    def test_duplicate_of_failed_job_runs_again_and_takes_the_fingerprint(self) -> None:
+        service, repository, storage, queue = self.coalescing_service("job-old", {"status": "FAILED"})
+
+        self.assertEqual(service.submit("a.xlsx", io.BytesIO(b"x"), None, None), "job-new")
+
+        repository.set_fingerprint.assert_called_once_with(submission_fingerprint("abc", None, None), "job-new", 600)
+        storage.delete_upload.assert_not_called()
+        queue.enqueue.assert_called_once_with("job-new", "default")
+
+    def test_fingerprint_depends_on_config_and_callback(self) -> None:
+        base = submission_fingerprint("abc", {"order": None, "chunk_size": 10}, None)
+        self.assertEqual(base, submission_fingerprint("abc", {"chunk_size": 10, "order": None}, None))
+        self.assertNotEqual(base, submission_fingerprint("abc", {"order": None, "chunk_size": 20}, None))
+        self.assertNotEqual(base, submission_fingerprint("abc", {"order": None, "chunk_size": 10}, "https://x"))
+
+    def test_submit_many_writes_jobs_and_queue_in_one_transaction(self) -> None:
+        repository = Mock()
+        storage = Mock()
+        queue = Mock()
+        transaction = repository.pipeline.return_value
+        storage.save_upload.side_effect = [
+            {"path": "/tmp/a.xlsx", "size": 1, "sha256": "h1"},
+            {"path": "/tmp/b.xlsx", "size": 2, "sha256": "h2"},
+        ]
+        ids = iter(["job-a", "job-b"])
+        service = JobSubmissionService(repository, storage, queue, job_id_provider=lambda: next(ids))
+        streams = [io.BytesIO(b"a"), io.BytesIO(b"bb")]
+
+        job_ids = service.submit_many(
+            [("a.xlsx", streams[0]), ("b.xlsx", streams[1])],
+            pipeline_config=None,
+            callback_url=None,
+        )
+
+        self.assertEqual(job_ids, ["job-a", "job-b"])
+        storage.save_upload.assert_has_calls([call("a.xlsx", streams[0], None), call("b.xlsx", streams[1], None)])
+        repository.create_jobs.assert_called_once_with(
+            {
+                "job-a": {
+                    "input_path": "/tmp/a.xlsx",
+                    "input_hash": "h1",
+                    "input_size": 1,
+                    "pipeline_config": None,
+                    "callback_url": None,
+                    "priority": "default",
+                },
+                "job-b": {
+                    "input_path": "/tmp/b.xlsx",
+                    "input_hash": "h2",
+                    "input_size": 2,
+                    "pipeline_config": None,
+                    "callback_url": None,
+                    "priority": "default",
+                },
             },
+            transaction,
         )
-        queue.enqueue.assert_called_once_with("job-123")
+        queue.enqueue_many.assert_called_once_with(["job-a", "job-b"], transaction, ["default", "default"])
+        transaction.execute.assert_called_once_with()
+        repository.create_job.assert_not_called()
+        queue.enqueue.assert_not_called()
 
 
 class TestJobQueryService(unittest.TestCase):
@@ -100,6 +207,28 @@ class TestJobQueryService(unittest.TestCase):
 
         self.assertEqual(output_path, "/tmp/output.csv")
 
+    def test_get_result_converts_once_and_reuses_conversion(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            stored = os.path.join(tmp, "output_job.parquet")
+            pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}).to_parquet(stored, index=False)
+            repository = Mock()
+            repository.get_job.return_value = {
+                "status": "COMPLETED",
+                "result": {"output_path": stored, "output_format": "parquet"},
+            }
+            service = JobQueryService(repository)
+
+            self.assertEqual(service.get_result("job-6"), (stored, "parquet"))
+            csv_path, output_format = service.get_result("job-6", "csv")
+            converted_at = os.path.getmtime(csv_path)
+            again, _ = service.get_result("job-6", "csv")
+
+            self.assertEqual(output_format, "csv")
+            self.assertEqual(csv_path, os.path.join(tmp, "output_job.csv"))
+            self.assertEqual(again, csv_path)
+            self.assertEqual(os.path.getmtime(again), converted_at)
+            self.assertEqual(pd.read_csv(csv_path).to_dict("list"), {"a": [1, 2], "b": ["x", "y"]})
+
 
 class TestJobProcessingService(unittest.TestCase):
     def test_process_returns_when_job_missing(self) -> None:
@@ -151,28 +280,48 @@ class TestJobProcessingService(unittest.TestCase):
                         "status": "COMPLETED",
                         "result": {
                             "output_path": "/tmp/output.csv",
+                            "output_format": "csv",
                             "stages": ["stage1", "stage2", "stage3"],
+                            "cached_stages": [],
+                            "restored_stages": [],
+                            "stage_metrics": {},
                         },
                     },
                 ),
             ]
         )
-        storage.build_output_path.assert_called_once_with("job-5")
+        storage.build_output_path.assert_called_once_with("job-5", "csv")
         storage.ensure_path.assert_called_once_with("/tmp/output.csv")
         executor.run.assert_called_once_with(
             context={
                 "job_id": "job-5",
                 "input_path": "/tmp/input.xlsx",
+                "input_hash": None,
                 "output_path": "/tmp/output.csv",
+                "chunk_size": None,
+                "ingest": "first_sheet",
+                "excel_readers": ("calamine", "pandas"),
+                "transforms": None,
+                "output_format": "csv",
+                "precompress": (),
             },
             enabled=["stage1", "stage2", "stage3"],
             order=["stage1", "stage2", "stage3"],
             parallel_groups=None,
+            execution_modes=None,
+            cancellation=ANY,
         )
         notifier.notify.assert_called_once_with(
             "https://example.com/callback",
             "job-5",
-            {"output_path": "/tmp/output.csv", "stages": ["stage1", "stage2", "stage3"]},
+            {
+                "output_path": "/tmp/output.csv",
+                "output_format": "csv",
+                "stages": ["stage1", "stage2", "stage3"],
+                "cached_stages": [],
+                "restored_stages": [],
+                "stage_metrics": {},
+            },
         )
 
     def test_process_failure_marks_failed_and_notifies(self) -> None:
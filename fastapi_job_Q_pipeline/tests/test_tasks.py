@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import Mock, patch
+
+from app import tasks
+
+
+class TestRunPipelineJob(unittest.TestCase):
+    def setUp(self) -> None:
+        tasks.processing_service.cache_clear()
+        self.addCleanup(tasks.processing_service.cache_clear)
+
+    def test_service_is_built_once_per_process(self) -> None:
+        service = Mock()
+        with patch.object(tasks, "get_processing_service", return_value=service) as factory:
+            tasks.run_pipeline_job("job-1")
+            tasks.run_pipeline_job("job-2")
+
+        factory.assert_called_once_with()
+        self.assertEqual([c.args for c in service.process.call_args_list], [("job-1",), ("job-2",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import re
+import signal
+import sys
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+import worker
+
+
+def crash(fork_per_job: bool) -> None:
+    sys.exit(3)
+
+
+class TestRunWorker(unittest.TestCase):
+    def test_the_process_pool_is_shut_down_when_the_worker_stops(self) -> None:
+        rq_worker = Mock()
+        rq_worker.work.side_effect = KeyboardInterrupt
+        with patch.object(worker, "get_redis"), patch.object(worker, "WeightedSimpleWorker", return_value=rq_worker):
+            with patch.object(worker, "shutdown_process_pool") as shutdown, self.assertRaises(KeyboardInterrupt):
+                worker.run_worker(fork_per_job=False)
+
+        shutdown.assert_called_once_with()
+
+
+class TestSupervise(unittest.TestCase):
+    def supervise(self, seconds: float) -> None:
+        # SIGTERM, as a container stop would send, ends supervise() after `seconds`.
+        timer = threading.Timer(seconds, os.kill, (os.getpid(), signal.SIGTERM))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        worker.supervise(1, fork_per_job=False)
+
+    def test_crashing_workers_are_restarted_with_backoff(self) -> None:
+        handler = signal.getsignal(signal.SIGTERM)
+        backoff = patch.multiple(
+            worker,
+            SUPERVISE_POLL_SECONDS=0.01,
+            RESTART_DELAY_SECONDS=0.1,
+            MAX_RESTART_DELAY_SECONDS=0.4,
+            CRASH_LOOP_RESTARTS=3,
+        )
+        with patch.object(worker, "run_worker", crash), backoff, self.assertLogs("worker", "WARNING") as logs:
+            self.supervise(1.2)
+
+        output = "\n".join(logs.output)
+        delays = [float(delay) for delay in re.findall(r"exited with code 3 after [\d.]+s; restarting in ([\d.]+)s", output)]
+        # Without backoff the slot would have been re-forked about every 10 ms.
+        self.assertTrue(3 <= len(delays) <= 6, delays)
+        self.assertEqual(delays[:3], [0.1, 0.2, 0.4])
+        self.assertIn("crash-looping", output)
+        # The previous handler is back once supervise() returns.
+        self.assertIs(signal.getsignal(signal.SIGTERM), handler)
+
+    def test_long_running_worker_is_restarted_at_once(self) -> None:
+        crashes = {0: 4}
+        with self.assertLogs("worker", "WARNING"):
+            self.assertEqual(worker._restart_delay(0, 1, worker.RESTART_RESET_SECONDS, crashes), 0.0)
+        self.assertEqual(crashes, {0: 0})
+
+
+class TestPreload(unittest.TestCase):
+    def test_preload_builds_the_processing_service_before_forking(self) -> None:
+        from app import tasks
+
+        tasks.processing_service.cache_clear()
+        self.addCleanup(tasks.processing_service.cache_clear)
+        service = Mock()
+        with patch.object(tasks, "get_processing_service", return_value=service) as factory:
+            worker.preload()
+            # Forked children reuse the cached service instead of building their own.
+            self.assertIs(tasks.processing_service(), service)
+
+        factory.assert_called_once_with()
+        self.assertIn("core.stages", sys.modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,136 @@
-from rq import Connection, Queue, Worker
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import signal
+import time
+from typing import Any, Dict
+
+from rq import Queue
 
 from app.database import get_redis
 from app.settings import settings
+from core.process_pool import shutdown_process_pool
+from core.routing import PRIORITIES
+from infrastructure.queue import WeightedSimpleWorker, WeightedWorker, parse_weights, queue_names
 
+logger = logging.getLogger("worker")
 
-if __name__ == "__main__":
+SUPERVISE_POLL_SECONDS = 1.0
+# A child that dies sooner than this after starting counts as a crash: its slot waits
+# RESTART_DELAY_SECONDS, doubling per crash in a row up to MAX_RESTART_DELAY_SECONDS,
+# so a worker that cannot import or reach Redis is not re-forked in a tight loop.
+RESTART_RESET_SECONDS = 60.0
+RESTART_DELAY_SECONDS = 1.0
+MAX_RESTART_DELAY_SECONDS = 60.0
+CRASH_LOOP_RESTARTS = 5
+
+
+def preload() -> None:
+    # Imported and built before forking so every worker process starts warm and
+    # shares these pages copy-on-write.
+    import pandas  # noqa: F401
+
+    import core.stages  # noqa: F401
+    from app.tasks import processing_service
+
+    processing_service()
+
+
+def run_worker(fork_per_job: bool) -> None:
     redis_client = get_redis()
-    with Connection(redis_client):
-        worker = Worker([Queue(settings.queue_name)])
+    # SimpleWorker runs jobs in this process, keeping the warm service across jobs;
+    # the classic Worker forks a fresh work horse per job.
+    worker_class = WeightedWorker if fork_per_job else WeightedSimpleWorker
+    names = queue_names(settings.queue_name)
+    weights = parse_weights(settings.queue_weights)
+    worker = worker_class(
+        [Queue(names[priority], connection=redis_client) for priority in PRIORITIES],
+        connection=redis_client,
+        queue_weights={names[priority]: weight for priority, weight in weights.items() if priority in names},
+    )
+    try:
         worker.work()
+    finally:
+        # Process-mode stages leave a pool of non-daemon workers behind; a supervised
+        # child cannot exit until they stop.
+        shutdown_process_pool()
+
+
+def supervise(processes: int, fork_per_job: bool) -> None:
+    context = multiprocessing.get_context("fork")
+    children: Dict[int, Any] = {}
+    started: Dict[int, float] = {}
+    crashes: Dict[int, int] = {}
+    restart_at: Dict[int, float] = {}
+    stopping = False
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for child in children.values():
+            if child.is_alive():
+                child.terminate()
+
+    previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        while True:
+            now = time.monotonic()
+            for slot in range(processes):
+                child = children.get(slot)
+                if stopping or (child is not None and child.is_alive()):
+                    continue
+                if child is not None and slot not in restart_at:
+                    restart_at[slot] = now + _restart_delay(slot, child.exitcode, now - started[slot], crashes)
+                if restart_at.get(slot, now) > now:
+                    continue
+                restart_at.pop(slot, None)
+                child = context.Process(target=run_worker, args=(fork_per_job,), name=f"pipeline-worker-{slot}")
+                child.start()
+                children[slot] = child
+                started[slot] = now
+            if stopping and not any(child.is_alive() for child in children.values()):
+                return
+            time.sleep(SUPERVISE_POLL_SECONDS)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+def _restart_delay(slot: int, exitcode: Any, ran_for: float, crashes: Dict[int, int]) -> float:
+    if ran_for >= RESTART_RESET_SECONDS:
+        crashes[slot] = 0
+        logger.warning("Worker %d exited with code %s after %.0fs; restarting", slot, exitcode, ran_for)
+        return 0.0
+    crashes[slot] = crashes.get(slot, 0) + 1
+    delay = min(RESTART_DELAY_SECONDS * 2 ** (crashes[slot] - 1), MAX_RESTART_DELAY_SECONDS)
+    logger.warning(
+        "Worker %d exited with code %s after %.1fs; restarting in %.1fs", slot, exitcode, ran_for, delay
+    )
+    if crashes[slot] >= CRASH_LOOP_RESTARTS:
+        logger.error("Worker %d is crash-looping: %d quick exits in a row", slot, crashes[slot])
+    return delay
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline RQ worker")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=settings.worker_processes,
+        help="Worker processes to prefork and supervise.",
+    )
+    parser.add_argument(
+        "--fork-per-job",
+        action="store_true",
+        default=settings.worker_fork_per_job,
+        help="Run each job in a freshly forked work horse (classic RQ worker).",
+    )
+    args = parser.parse_args()
+
+    preload()
+    if args.processes <= 1:
+        run_worker(args.fork_per_job)
+    else:
+        supervise(args.processes, args.fork_per_job)